@@ -0,0 +1,169 @@
+"""
+Benchmarks de src/features: tempo e pico de memória de cada create_* e de
+build_all_features (engines pandas e columnar) em dados sintéticos.
+
+Uso:
+    python -m benchmarks.bench_features --rows 1000 10000 100000 --assets 4 16
+    python -m benchmarks.bench_features --compare antigo.json novo.json
+
+Os resultados vão para benchmarks/results/<data>_<commit>.json.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.features.engineering import (
+    create_lags, create_logreturns, create_temp_features,
+    create_volume_features, create_dynamic_corr,
+    create_vol_features, create_market_regimes,
+    create_moving_averages, create_diffs
+)
+
+
+def _cases(df, kwargs):
+    '''(nome, frame de entrada, função) para cada etapa, com a entrada já preparada.'''
+    target = kwargs['target_price_col']
+    exog = kwargs['exog_price_cols']
+    windows, lags = kwargs['windows'], kwargs['lags']
+    logret_cols = [f'{col}_logreturns' for col in exog]
+
+    staged = create_logreturns(df, [target] + exog).rename(columns={f'{target}_logreturns': 'log_return'})
+    staged = staged[staged['Volume'] > 0].copy()
+    staged['log_volume'] = np.log(staged['Volume'])
+    staged = staged.drop(columns='Volume')
+
+    return [
+        ('create_logreturns', df, lambda d: create_logreturns(d, [target] + exog)),
+        ('create_lags', staged, lambda d: create_lags(d, logret_cols + ['log_volume'], lags)),
+        ('create_temp_features', staged, create_temp_features),
+        ('create_volume_features', staged, lambda d: create_volume_features(d, 'log_volume')),
+        ('create_vol_features', staged, lambda d: create_vol_features(d, 'log_return', logret_cols, windows)),
+        ('create_dynamic_corr', staged, lambda d: create_dynamic_corr(d, 'log_return', logret_cols, windows)),
+        ('create_moving_averages', staged,
+         lambda d: create_moving_averages(d, ['log_return'] + logret_cols, windows)),
+        ('create_market_regimes', staged, lambda d: create_market_regimes(d, kwargs['vix_col'])),
+        ('create_diffs', staged, lambda d: create_diffs(d, kwargs['econ_ind'], lags)),
+        ('build_all_features[pandas]', df, lambda d: build_all_features(d, **kwargs)),
+        ('build_all_features[columnar]', df, lambda d: build_all_features(d, engine='columnar', **kwargs)),
+    ]
+
+
+def _measure(func, frame, repeat):
+    times = []
+    for _ in range(repeat):
+        data = frame.copy()
+        t0 = time.perf_counter()
+        func(data)
+        times.append(time.perf_counter() - t0)
+
+    # pico de memória numa execução separada (tracemalloc deixa a execução mais lenta)
+    data = frame.copy()
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds_min': min(times), 'seconds_median': statistics.median(times),
+            'repeat': repeat, 'peak_bytes': peak}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(rows=(1_000, 10_000, 100_000), assets=(4,), repeat=3, only=None, seed=0):
+    '''
+    Roda os benchmarks em todas as combinações de linhas × ativos.
+    only: lista de nomes de casos (padrão: todos)
+
+    Retorna:
+    --------
+    dict com 'meta' (versões, máquina, commit) e 'results' (uma entrada por caso).
+    '''
+    results = []
+    for n_assets in assets:
+        for n_rows in rows:
+            df, kwargs = make_market(n_rows, n_assets, seed=seed)
+            for name, frame, func in _cases(df, kwargs):
+                if only and name not in only:
+                    continue
+                entry = {'case': name, 'rows': n_rows, 'assets': n_assets}
+                entry.update(_measure(func, frame, repeat))
+                results.append(entry)
+                print(f"{name:32s} rows={n_rows:>9,} assets={n_assets:>3} "
+                      f"{entry['seconds_min']:9.4f}s  pico {entry['peak_bytes'] / 2**20:9.1f} MiB")
+
+    meta = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': _git_commit(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count()}
+    return {'meta': meta, 'results': results}
+
+
+def compare(base_path, new_path, threshold=0.10):
+    '''
+    Compara dois arquivos de resultado. Regressão: tempo mínimo (ou pico de
+    memória) mais de `threshold` acima da base no mesmo caso/linhas/ativos.
+
+    Retorna:
+    --------
+    DataFrame com as razões novo/base e a coluna regression.
+    '''
+    def load(path):
+        with open(path) as f:
+            return pd.DataFrame(json.load(f)['results']).set_index(['case', 'rows', 'assets'])
+
+    base, new = load(base_path), load(new_path)
+    joined = base.join(new, how='inner', lsuffix='_base', rsuffix='_new')
+    out = pd.DataFrame({
+        'time_ratio': joined['seconds_min_new'] / joined['seconds_min_base'],
+        'memory_ratio': joined['peak_bytes_new'] / joined['peak_bytes_base'],
+    })
+    out['regression'] = (out['time_ratio'] > 1 + threshold) | (out['memory_ratio'] > 1 + threshold)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--assets', type=int, nargs='+', default=[4])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', default=None)
+    parser.add_argument('--out', default=None)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.compare:
+        out = compare(*args.compare, threshold=args.threshold)
+        print(out.to_string())
+        if out['regression'].any():
+            raise SystemExit(f"{int(out['regression'].sum())} regressão(ões) acima de {args.threshold:.0%}")
+        return
+
+    report = run(args.rows, args.assets, args.repeat, args.only)
+    path = args.out
+    if path is None:
+        os.makedirs('benchmarks/results', exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = f"benchmarks/results/{stamp}_{report['meta']['commit'] or 'local'}.json"
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Resultados salvos em {path}")
+
+
+if __name__ == '__main__':
+    main()
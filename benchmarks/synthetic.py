@@ -0,0 +1,67 @@
+import pandas as pd
+import numpy as np
+
+
+def make_market(n_rows: int, n_assets: int = 4, seed: int = 0, start: str = '2000-01-03'):
+    '''
+    Mercado sintético (offline) para benchmarks: GBM com troca de regime.
+
+    Um regime calmo/turbulento segue uma cadeia de Markov; no regime
+    turbulento a volatilidade dos ativos sobe e o VIX vai para um patamar
+    mais alto. Os ativos compartilham um fator comum (correlação) e o volume
+    é log-normal, com alguns dias de volume zero (filtrados pelo pipeline).
+
+    Parâmetros:
+    -----------
+    n_rows: int
+        Número de linhas. Até 50 mil usa dias úteis; acima disso, minutos
+        (o calendário diário passaria do ano 2262)
+    n_assets: int
+        Número de exógenas de preço (asset_1, ..., asset_n) além do alvo
+
+    Retorna:
+    --------
+    (df, kwargs): DataFrame indexado por 'Date' e os argumentos de
+    build_all_features para ele.
+    '''
+    rng = np.random.default_rng(seed)
+    freq = 'B' if n_rows <= 50_000 else 'min'
+    index = pd.DatetimeIndex(pd.date_range(start, periods=n_rows, freq=freq).to_numpy(), name='Date')
+
+    # regimes: 0 calmo, 1 turbulento
+    stay = np.array([0.99, 0.95])
+    regime = np.empty(n_rows, dtype=np.int8)
+    regime[0] = 0
+    switch = rng.random(n_rows)
+    for t in range(1, n_rows):
+        prev = regime[t - 1]
+        regime[t] = prev if switch[t] < stay[prev] else 1 - prev
+
+    sigma = np.where(regime == 1, 0.03, 0.01)
+    factor = rng.standard_normal(n_rows)
+    names = ['petr4'] + [f'asset_{i}' for i in range(1, n_assets + 1)] + ['VIX']
+    data = {}
+    for name in names[:-1]:
+        beta = rng.uniform(0.3, 0.8)
+        shocks = beta * factor + np.sqrt(1 - beta ** 2) * rng.standard_normal(n_rows)
+        data[name] = 50 * np.exp(np.cumsum(-0.5 * sigma ** 2 + sigma * shocks))
+
+    # VIX: média-reversão para 15 (calmo) ou 30 (turbulento)
+    level = np.where(regime == 1, 30.0, 15.0)
+    vix = np.empty(n_rows)
+    vix[0] = 15.0
+    noise = rng.standard_normal(n_rows)
+    for t in range(1, n_rows):
+        vix[t] = max(vix[t - 1] + 0.1 * (level[t] - vix[t - 1]) + noise[t], 9.0)
+    data['VIX'] = vix
+    data['^VIX'] = vix
+
+    volume = np.exp(rng.normal(15, 0.5, n_rows) + regime)
+    volume[rng.random(n_rows) < 0.005] = 0
+    data['Volume'] = volume
+    data['selic'] = np.repeat(rng.choice([10.0, 11.0, 12.25, 13.75], n_rows // 40 + 1), 40)[:n_rows]
+
+    df = pd.DataFrame(data, index=index)
+    kwargs = dict(target_price_col='petr4', exog_price_cols=names[1:], volume_col='Volume',
+                  vix_col='^VIX', econ_ind=['selic'], windows=[5, 22, 63], lags=[1, 5, 22])
+    return df, kwargs
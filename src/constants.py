@@ -5,13 +5,22 @@ TICKERS = ["PETR4.SA", "^BVSP", "CL=F", "BRL=X"]
 START_DATE = "2015-01-01"
 END_DATE = "2025-11-13"
 
+# ==== FREQUÊNCIA ====
+# Barras por ano por intervalo do yfinance, para anualizar e dimensionar janelas.
+# Intradiário: pregão regular da B3 (10h-17h) = 420 minutos.
+SESSION_MINUTES = 420
+BARS_PER_YEAR = {'1d': 252, '1h': 252 * 7}
+BARS_PER_YEAR.update({f'{m}m': 252 * -(-SESSION_MINUTES // m) for m in (1, 2, 5, 15, 30, 60, 90)})
+
 # ==== FEATURES ====
 USE_LOG_RETURNS = True
 LAGS = [1, 5, 22]  # lags para variáveis exógenas
 
 # ==== MODELO ARIMAX ====
 PMDARIMA_AUTO = True  # <--- AQUI É O QUE VOCÊ QUER!
-# Se False, usa: ARIMAX_ORDER = (2, 0, 1)
+# Se False, usa:
+ARIMAX_ORDER = (2, 0, 1)
+REFIT_EVERY = 21  # walk-forward: reajuste completo a cada N passos (entre eles só atualiza o filtro)
 
 # ==== MODELO XGBoost ====
 XGB_PARAMS = {
@@ -21,5 +30,10 @@ XGB_PARAMS = {
     "random_state": 42
 }
 
+# ==== BACKTEST ====
+# Custos por lado sobre o valor negociado (B3, pessoa física): emolumentos +
+# liquidação ~0.03%; corretagem zero; slippage estimado. Aluguel (short) ao ano.
+B3_COSTS = {"fee_bps": 3.0, "brokerage_bps": 0.0, "slippage_bps": 5.0, "borrow_rate": 0.01}
+
 # ==== VALIDAÇÃO ====
 TRAIN_SIZE = 0.8
\ No newline at end of file
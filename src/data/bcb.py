@@ -0,0 +1,100 @@
+import pandas as pd
+import numpy as np
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from src.constants import START_DATE, END_DATE
+from src.data.sources import SGSSource
+from src.data.store import MarketDataStore
+from src.utils.profiling import stage
+
+
+def load_bcb_series(indicadores: Dict[str, int],
+                    start: Optional[str] = None,
+                    end: Optional[str] = None,
+                    dir: str = 'data/raw/bcb',
+                    source=None,
+                    max_workers: int = 4,
+                    format: str = 'csv') -> Dict[str, pd.Series]:
+    '''
+    Lê séries do SGS/BCB com cache local incremental.
+
+    Cada código fica em um arquivo próprio no MarketDataStore ({codigo}_sgs):
+    execuções seguintes só buscam as datas que faltam, e as últimas
+    observações salvas são buscadas de novo para pegar revisões e meses
+    recém-publicados. Quando a fonte responde, o trecho pedido fica coberto
+    até end (ou até o momento da busca): uma série mensal não é buscada de
+    novo a cada execução só porque o último valor é anterior a end.
+
+    Parâmetros:
+    -----------
+    indicadores: dict
+        {nome: código SGS}, ex: {'selic': 432, 'ipca': 433}
+    source: backend com método fetch(code, start, end). Padrão SGSSource();
+        CSVSGSSource(dir) lê arquivos locais (offline).
+    max_workers: número de séries buscadas em paralelo
+
+    Retorna:
+    --------
+    dict {nome: Series}. Séries com erro são avisadas e ficam de fora.
+    '''
+    start = start or START_DATE
+    end = end or END_DATE
+    source = source or SGSSource()
+    store = MarketDataStore(dir, format=format)
+
+    def load(item):
+        with stage(f'sgs[{item[0]}]') as s:
+            nome, series = _load(item)
+            s.out(series)
+        return nome, series
+
+    def _load(item):
+        nome, codigo = item
+        try:
+            store.update(str(codigo), start, end,
+                         lambda s, e: source.fetch(codigo, s, e), interval='sgs',
+                         cover_requested=True)
+            data = store.get(str(codigo), start, end, interval='sgs')
+            if data is None or data.empty:
+                raise ValueError("Nenhum dado retornado")
+            return nome, data['value'].rename(nome)
+        except Exception as e:
+            print(f"Erro BCB {nome}: {e}")
+            return nome, None
+
+    items = list(indicadores.items())
+    if max_workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(load, items))
+    else:
+        results = [load(item) for item in items]
+
+    return {nome: series for nome, series in results if series is not None}
+
+
+def align_bcb(index: pd.DatetimeIndex, series: Dict[str, pd.Series]) -> pd.DataFrame:
+    '''
+    Alinha as séries do BCB ao índice de pregões com um único as-of join.
+
+    A selic (diária) vale a partir da própria data. As demais são mensais:
+    o último valor de cada mês só passa a valer no fim do mês, como no
+    resample('ME').last() original.
+    '''
+    columns = {}
+    for nome, s in series.items():
+        s = s.dropna()
+        if nome.lower() != 'selic':
+            s = s.resample('ME').last().dropna()
+        columns[nome] = s
+
+    if not columns:
+        return pd.DataFrame(index=index)
+
+    # todas as datas de publicação numa grade só; ffill deixa cada linha
+    # com o último valor conhecido de cada série até aquela data
+    wide = pd.concat(columns, axis=1).sort_index().ffill()
+    pos = wide.index.searchsorted(index, side='right') - 1
+    values = wide.to_numpy()[np.clip(pos, 0, None)]
+    values[pos < 0] = np.nan
+    return pd.DataFrame(values, index=index, columns=wide.columns)
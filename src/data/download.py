@@ -1,55 +1,149 @@
-import yfinance as yf
 import pandas as pd
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from src.constants import TICKERS, START_DATE, END_DATE
+from src.data.sources import YFinanceSource
+from src.data.store import MarketDataStore
+from src.utils.profiling import stage, profiled
 
+
+def _fetch_with_retry(source, ticker, start, end, interval, auto_adjust, progress,
+                      retries, backoff, allow_empty=False):
+    '''
+    Chama source.fetch com até `retries` novas tentativas e backoff exponencial.
+    Retorna (data, tentativas); relança o último erro se todas falharem.
+    allow_empty: aceita retorno vazio (trechos curtos de atualização incremental).
+    '''
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            with stage('fetch') as s:
+                data = s.out(source.fetch(ticker, start, end, interval=interval,
+                                          auto_adjust=auto_adjust, progress=progress))
+            if data is None or data.empty:
+                if allow_empty:
+                    return data, attempt
+                raise ValueError("Nenhum dado retornado")
+            return data, attempt
+        except Exception as e:
+            if attempt > retries:
+                e.attempts = attempt
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+
+@profiled('download_data')
 def download_data(tickers: List[str],
                   start: Optional[str] = None,
                   end: Optional[str] = None,
                   interval: str = '1d',
                   dir: str = 'data/raw',
                   auto_adjust: bool = False,
-                  progress: bool = False) -> Dict[str, pd.DataFrame]:
+                  progress: bool = False,
+                  source=None,
+                  max_workers: int = 1,
+                  retries: int = 2,
+                  backoff: float = 1.0,
+                  return_report: bool = False,
+                  format: str = 'csv'):
     '''
     Baixa os dados do yfinance para vários tickers.
-    Salva em data/raw/ se dir for informado.
+    Salva em data/raw/ se dir for informado, em um store incremental por
+    (ticker, intervalo): pedidos seguintes só buscam as datas que faltam.
+
+    source: backend com método fetch(ticker, start, end, interval, ...).
+        Padrão YFinanceSource(); CSVSource(dir) lê fixtures locais (offline/testes).
+    max_workers: número máximo de tickers baixados em paralelo (threads, I/O-bound).
+    retries / backoff: novas tentativas por ticker, esperando backoff * 2**k segundos.
+    return_report: se True, retorna (dados, relatório) onde o relatório é um
+        DataFrame com status, tentativas, linhas, tempo e erro de cada ticker.
+    format: formato do cache ('csv', 'npy', 'parquet', 'feather').
     '''
 
     start = start or START_DATE
     end = end or END_DATE
+    source = source or YFinanceSource()
 
     if isinstance(tickers, str):
         tickers = [tickers]
 
     os.makedirs(dir, exist_ok=True)
-    result_dfs = {}
 
-    for ticker in tickers:
-        file_name = f"{ticker}_{start}_{end}.csv".replace('^', '').replace('=', '_')
-        file_path = os.path.join(dir, file_name)
+    store = MarketDataStore(dir, format=format)
+
+    def load(ticker):
+        with stage(f'ticker[{ticker}]') as s:
+            data, record = _load(ticker)
+            s.out(data)
+        return data, record
+
+    def _load(ticker):
+        record = {'ticker': ticker, 'status': None, 'attempts': 0, 'rows': 0,
+                  'rows_fetched': 0, 'revised': 0, 'seconds': 0.0, 'error': None}
+        t0 = time.perf_counter()
+        data = None
+
+        def fetch(s, e):
+            part, attempts = _fetch_with_retry(
+                source, ticker, s, e, interval, auto_adjust, progress,
+                retries, backoff, allow_empty=True
+            )
+            record['attempts'] += attempts
+            return part
 
         try:
-            if os.path.exists(file_path):
-                print(f"Carregando {ticker} de {file_path}")
-                data = pd.read_csv(file_path, parse_dates=['Date'])
-                data.set_index('Date', inplace=True)
+            store.migrate_legacy(ticker, interval)
+            is_new = not store.covered(ticker, interval)
+            missing = store.missing_spans(ticker, start, end, interval)
+            if missing:
+                print(f"Baixando {ticker} ({len(missing)} trecho(s) faltando)...")
             else:
-                print(f"Baixando {ticker}...")
-                data = yf.download(
-                    ticker, start=start, end=end, interval=interval,
-                    auto_adjust=auto_adjust, progress=progress
-                )
-                if data.empty:
-                    raise ValueError("Nenhum dado retornado")
-                if isinstance(data.columns, pd.MultiIndex):
-                    data.columns = data.columns.get_level_values(0)
-                data.to_csv(file_path)
-                print(f"Salvou em {file_path}")
+                print(f"Carregando {ticker} de {store.path(ticker, interval)}")
 
-            result_dfs[ticker] = data
+            info = store.update(ticker, start, end, fetch, interval)
+            data = store.get(ticker, start, end, interval)
+            if data is None or data.empty:
+                raise ValueError("Nenhum dado retornado")
+
+            if not info['fetched_spans']:
+                record['status'] = 'cache'
+            else:
+                record['status'] = 'download' if is_new or info['full_refresh'] else 'delta'
+                print(f"Salvou em {store.path(ticker, interval)} (+{info['rows_fetched']} linhas)")
+            record['rows'] = len(data)
+            record['rows_fetched'] = info['rows_fetched']
+            record['revised'] = info['revised']
 
         except Exception as e:
             print(f"Erro em {ticker}: {e}")
+            record['status'] = 'error'
+            record['attempts'] = getattr(e, 'attempts', record['attempts'])
+            record['error'] = f"{type(e).__name__}: {e}"
+            data = None
+
+        record['seconds'] = time.perf_counter() - t0
+        return data, record
+
+    if max_workers > 1 and len(tickers) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(load, tickers))
+    else:
+        results = [load(ticker) for ticker in tickers]
+
+    result_dfs = {}
+    for ticker, (data, record) in zip(tickers, results):
+        if data is not None:
+            result_dfs[ticker] = data
+
+    failed = [record['ticker'] for _, record in results if record['status'] == 'error']
+    if failed:
+        print(f"Tickers sem dados ({len(failed)}): {failed}")
+
+    if return_report:
+        report = pd.DataFrame([record for _, record in results]).set_index('ticker')
+        return result_dfs, report
 
-    return result_dfs
\ No newline at end of file
+    return result_dfs
@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+HOWS = ('inner', 'ffill', 'mask')
+
+
+class Panel:
+    """
+    Painel datas × tickers × campos alinhado num calendário comum.
+
+    Cada campo fica num array próprio (tickers com o campo, datas) em ordem C,
+    com o dtype das colunas de origem (Volume continua int64; vira float64 só
+    se precisar de NaN), de modo que a série de um (ticker, campo) é contígua:
+    series() e to_frame() devolvem views sem cópia. Só os campos pedidos para
+    cada ticker são alocados.
+
+    Use Panel.from_frames para montar a partir dos DataFrames de download_data.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers: List[str], data: Dict[str, Tuple[List[str], np.ndarray]],
+                 present: np.ndarray):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.fields = list(data)
+        self._data = {field: values for field, (_, values) in data.items()}   # campo -> (tickers do campo, datas)
+        self._rows = {field: {t: j for j, t in enumerate(owners)} for field, (owners, _) in data.items()}
+        self._present = present    # (tickers, datas): a data existe no frame original
+        self._ticker_pos = {t: j for j, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame],
+                    fields: Union[Sequence[str], Dict[str, Sequence[str]]] = ('Adj Close',),
+                    calendar: Optional[pd.DatetimeIndex] = None, how: str = 'inner') -> 'Panel':
+        """
+        Alinha todos os tickers de uma vez: cada frame é espalhado por posição
+        (get_indexer) em arrays pré-alocados, em vez de um join por ticker.
+
+        Parâmetros:
+        -----------
+        frames: dict
+            {ticker: DataFrame indexado por data}
+        fields: list ou dict
+            Colunas lidas de cada frame, ou {ticker: colunas} para pedir campos
+            diferentes por ticker (campo ausente num ticker fica NaN)
+        calendar: DatetimeIndex
+            Calendário do painel. Padrão: união das datas de todos os frames
+        how: str
+            Política para datas que faltam em algum ticker:
+            'inner' mantém só as datas presentes em todos (como join inner);
+            'ffill' repete a última barra conhecida (descarta o início, antes
+            de todos os tickers terem alguma barra);
+            'mask' mantém todas as datas com NaN (ver `present`)
+        """
+        if how not in HOWS:
+            raise ValueError(f"how='{how}' inválido. Use um de {HOWS}.")
+        if not frames:
+            raise ValueError("Nenhum frame para montar o painel.")
+
+        tickers = list(frames)
+        ticker_pos = {t: j for j, t in enumerate(tickers)}
+        if isinstance(fields, dict):
+            wanted = {t: list(fields.get(t, ())) for t in tickers}
+        else:
+            wanted = {t: list(fields) for t in tickers}
+        owners = {}
+        for t in tickers:
+            for field in wanted[t]:
+                owners.setdefault(field, []).append(t)
+
+        if calendar is None:
+            dates = pd.DatetimeIndex(np.unique(np.concatenate([f.index.to_numpy() for f in frames.values()])))
+        else:
+            dates = pd.DatetimeIndex(calendar)
+        dates = dates.rename('Date')
+
+        present = np.zeros((len(tickers), len(dates)), dtype=bool)
+        # ffill: posição da última barra de cada ticker até cada data do calendário (as-of)
+        last = np.full((len(tickers), len(dates)), -1)
+        moves = []
+        for j, ticker in enumerate(tickers):
+            frame = frames[ticker]
+            pos = dates.get_indexer(frame.index)
+            on_calendar = pos >= 0
+            present[j, pos[on_calendar]] = True
+            if how == 'ffill':
+                last[j] = frame.index.searchsorted(dates, side='right') - 1
+                src, dst = last[j][last[j] >= 0], last[j] >= 0
+            else:
+                src, dst = np.flatnonzero(on_calendar), pos[on_calendar]
+            moves.append((src, dst))
+
+        if how == 'inner':
+            keep = present.all(axis=0)
+        elif how == 'ffill':
+            # descarta o início, antes de todos os tickers terem alguma barra
+            keep = (last >= 0).all(axis=0)
+        else:
+            keep = np.ones(len(dates), dtype=bool)
+
+        data = {}
+        for field, names in owners.items():
+            columns = {t: frames[t][field].to_numpy() for t in names if field in frames[t].columns}
+            dtype = np.result_type(*columns.values()) if columns else np.dtype(float)
+            # inteiros só continuam inteiros se nenhuma data mantida ficar sem barra
+            gaps = len(columns) < len(names) or (
+                how == 'mask' and not present[[ticker_pos[t] for t in names]][:, keep].all())
+            if dtype.kind not in 'fc' and (dtype.kind not in 'iub' or gaps):
+                dtype = np.dtype(float)
+            values = np.full((len(names), len(dates)), np.nan if dtype.kind in 'fc' else 0, dtype=dtype)
+            for i, t in enumerate(names):
+                if t in columns:
+                    src, dst = moves[ticker_pos[t]]
+                    values[i, dst] = columns[t][src]
+            data[field] = (names, np.ascontiguousarray(values[:, keep]))
+
+        return cls(dates[keep], tickers, data, present[:, keep])
+
+    @property
+    def values(self) -> np.ndarray:
+        """Cópia float64 datas × tickers × campos (NaN onde o campo não foi pedido)."""
+        out = np.full((len(self.dates), len(self.tickers), len(self.fields)), np.nan)
+        for k, field in enumerate(self.fields):
+            for ticker, i in self._rows[field].items():
+                out[:, self._ticker_pos[ticker], k] = self._data[field][i]
+        return out
+
+    @property
+    def present(self) -> pd.DataFrame:
+        """True onde a data existia no frame original do ticker."""
+        return pd.DataFrame(self._present.T, index=self.dates, columns=self.tickers)
+
+    def _row(self, ticker: str, field: str) -> np.ndarray:
+        rows = self._rows.get(field, {})
+        if ticker not in rows:
+            raise KeyError(f"Campo '{field}' não foi carregado para {ticker}.")
+        return self._data[field][rows[ticker]]
+
+    def series(self, ticker: str, field: str = 'Adj Close') -> pd.Series:
+        """Série de um (ticker, campo) sem cópia."""
+        return pd.Series(self._row(ticker, field), index=self.dates, name=ticker, copy=False)
+
+    def field(self, field: str) -> pd.DataFrame:
+        """DataFrame datas × tickers (os que têm o campo) de um campo (view sem cópia)."""
+        return pd.DataFrame(self._data[field].T, index=self.dates, columns=list(self._rows[field]), copy=False)
+
+    def to_frame(self, columns: Dict[str, Tuple[str, str]]) -> pd.DataFrame:
+        """
+        DataFrame com as colunas pedidas, cada uma uma view do painel.
+
+        columns: {nome da coluna: (ticker, campo)}
+        """
+        data = {name: self._row(ticker, field) for name, (ticker, field) in columns.items()}
+        return pd.DataFrame(data, index=self.dates, copy=False)
@@ -1,10 +1,15 @@
 import pandas as pd
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from src.data.download import download_data
+from src.data.bcb import load_bcb_series, align_bcb
+from src.data.panel import Panel
+from src.utils.profiling import stage, profiled
+from src.data.storage import save_frame, load_frame
 from src.constants import TICKERS
 
 
+@profiled('build_main_dataset')
 def build_main_dataset(
     target_ticker: str,
     target_name: str,
@@ -12,50 +17,75 @@ def build_main_dataset(
     start: Optional[str] = None,
     end: Optional[str] = None,
     dir: str = 'data/raw',
-    indicadores_bcb: Optional[Dict[str, int]] = None
+    indicadores_bcb: Optional[Dict[str, int]] = None,
+    format: str = 'csv',
+    bcb_source=None,
+    how: str = 'inner'
 ) -> pd.DataFrame:
     """
     Junta ativo principal + exógenas + BCB.
     Salva em data/processed/
+
+    format: formato dos caches brutos e do dataset final
+        ('csv', 'npy', 'parquet' ou 'feather'; ver src/data/storage.py)
+    bcb_source: backend das séries do BCB (padrão SGSSource; CSVSGSSource
+        para rodar offline). As séries ficam em cache em {dir}/bcb.
+    how: como alinhar as exógenas aos pregões do ativo principal
+        ('inner', 'ffill' ou 'mask'; ver src/data/panel.py)
     """
     all_tickers = [target_ticker] + list(aux_tickers.keys())
-    data_dict = download_data(all_tickers, start, end, dir=dir)
+    data_dict = download_data(all_tickers, start, end, dir=dir, format=format)
 
     # Ativo principal
-    df = data_dict[target_ticker][['Adj Close', 'Volume']].copy()
-    df = df[df['Volume'] > 0]
-    df = df.rename(columns={'Adj Close': target_name})
+    target = data_dict[target_ticker]
+    frames = {target_ticker: target[target['Volume'] > 0]}
+    columns = {target_name: (target_ticker, 'Adj Close'), 'Volume': (target_ticker, 'Volume')}
 
     # Exógenas
     for ticker, name in aux_tickers.items():
-        try:
-            series = data_dict[ticker]['Adj Close'].rename(name)
-            df = df.join(series, how='inner')
-        except Exception as e:
-            print(f"Erro com {ticker}: {e}")
+        if ticker not in data_dict or 'Adj Close' not in data_dict[ticker].columns:
+            print(f"Erro com {ticker}: sem 'Adj Close'")
+            continue
+        frames[ticker] = data_dict[ticker]
+        columns[name] = (ticker, 'Adj Close')
+
+    # Alinha tudo de uma vez no calendário do ativo principal
+    with stage('align') as s:
+        fields = {ticker: ['Adj Close'] for ticker in frames}
+        fields[target_ticker] = ['Adj Close', 'Volume']
+        panel = Panel.from_frames(frames, fields=fields,
+                                  calendar=frames[target_ticker].index, how=how)
+        df = s.out(panel.to_frame(columns))
 
     # BCB (se tiver)
     if indicadores_bcb:
-        from bcb import sgs
-        for nome, codigo in indicadores_bcb.items():
-            try:
-                series = sgs.get({nome: codigo}, start=start, end=end)
-                if nome.lower() == 'selic':
-                    series_aligned = series.reindex(df.index, method='ffill')
-                else:
-                    series_monthly = series.resample('ME').last()
-                    series_aligned = series_monthly.reindex(df.index, method='ffill')
-                df = df.join(series_aligned, how='left')
-            except Exception as e:
-                print(f"Erro BCB {nome}: {e}")
+        with stage('bcb', df) as s:
+            series = load_bcb_series(indicadores_bcb, start, end, dir=os.path.join(dir, 'bcb'),
+                                     source=bcb_source, format=format)
+            df = s.out(df.join(align_bcb(df.index, series), how='left'))
 
     df = df.dropna()
     df.index.name = 'Date'
 
     # Salvar
     os.makedirs('data/processed', exist_ok=True)
-    file_path = f"data/processed/{target_name}_completo.csv"
-    df.to_csv(file_path)
+    with stage('save', df):
+        file_path = save_frame(df, f"data/processed/{target_name}_completo", format)
     print(f"Dataset final salvo em {file_path}")
 
-    return df
\ No newline at end of file
+    return df
+
+
+def load_main_dataset(
+    target_name: str,
+    columns: Optional[List[str]] = None,
+    format: str = 'csv'
+) -> Optional[pd.DataFrame]:
+    """
+    Lê o dataset salvo por build_main_dataset (warm start, sem baixar nada).
+
+    columns: só essas colunas são lidas (no formato npy via memory-map, sem cópia).
+    Um {target_name}_completo.csv antigo é convertido automaticamente para o
+    formato binário pedido.
+    """
+    return load_frame(f"data/processed/{target_name}_completo", format, columns=columns)
\ No newline at end of file
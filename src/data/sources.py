@@ -0,0 +1,104 @@
+import pandas as pd
+import os
+from typing import Optional
+
+
+class YFinanceSource:
+    """
+    Backend padrão: baixa os dados com yf.download.
+    """
+    name = 'yfinance'
+
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str],
+              interval: str = '1d', auto_adjust: bool = False,
+              progress: bool = False) -> pd.DataFrame:
+        import yfinance as yf
+
+        # threads=False: o paralelismo é controlado por download_data (um ticker por worker)
+        data = yf.download(
+            ticker, start=start, end=end, interval=interval,
+            auto_adjust=auto_adjust, progress=progress, threads=False
+        )
+        if isinstance(data.columns, pd.MultiIndex):
+            data.columns = data.columns.get_level_values(0)
+        return data
+
+
+class CSVSource:
+    """
+    Backend local: lê fixtures {dir}/{ticker}.csv (mesmo formato salvo por
+    download_data). Serve para testes e execuções offline.
+
+    Parâmetros:
+    -----------
+    dir: str
+        Pasta com os arquivos de fixture
+    """
+    name = 'csv'
+
+    def __init__(self, dir: str):
+        self.dir = dir
+
+    def path(self, ticker: str) -> str:
+        file_name = f"{ticker}.csv".replace('^', '').replace('=', '_')
+        return os.path.join(self.dir, file_name)
+
+    def fetch(self, ticker: str, start: Optional[str], end: Optional[str],
+              interval: str = '1d', auto_adjust: bool = False,
+              progress: bool = False) -> pd.DataFrame:
+        data = pd.read_csv(self.path(ticker), parse_dates=['Date'])
+        data.set_index('Date', inplace=True)
+
+        def bound(ts):
+            # como o yfinance: horário sem fuso vale como hora local das barras
+            ts = pd.Timestamp(ts)
+            if data.index.tz is not None and ts.tz is None:
+                return ts.tz_localize(data.index.tz)
+            return ts
+
+        # mesma convenção do yfinance: start inclusivo, end exclusivo
+        if start is not None:
+            data = data[data.index >= bound(start)]
+        if end is not None:
+            data = data[data.index < bound(end)]
+        return data
+
+
+class SGSSource:
+    """
+    Backend padrão das séries do BCB: sgs.get do python-bcb.
+    Retorna um DataFrame indexado por data com uma coluna 'value'.
+    """
+    name = 'sgs'
+
+    def fetch(self, code: int, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        from bcb import sgs
+
+        data = sgs.get({'value': code}, start=start, end=end)
+        data.index.name = 'Date'
+        # o SGS trata end como inclusivo; o store trabalha com [start, end)
+        if end is not None:
+            data = data[data.index < pd.Timestamp(end)]
+        return data
+
+
+class CSVSGSSource:
+    """
+    Backend local das séries do BCB: lê {dir}/{code}.csv com colunas
+    Date e value. Serve para execuções offline.
+    """
+    name = 'csv_sgs'
+
+    def __init__(self, dir: str):
+        self.dir = dir
+
+    def path(self, code: int) -> str:
+        return os.path.join(self.dir, f"{code}.csv")
+
+    def fetch(self, code: int, start: Optional[str], end: Optional[str]) -> pd.DataFrame:
+        data = pd.read_csv(self.path(code), parse_dates=['Date']).set_index('Date')
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        if end is not None:
+            data = data[data.index < pd.Timestamp(end)]
+        return data[['value']]
@@ -0,0 +1,211 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import shutil
+from typing import List, Optional
+
+FORMATS = ('csv', 'npy', 'parquet', 'feather')
+
+_EXT = {'csv': '.csv', 'npy': '.npy.d', 'parquet': '.parquet', 'feather': '.feather'}
+
+
+def frame_path(base: str, fmt: str = 'csv') -> str:
+    """Caminho do arquivo (ou pasta, no formato npy) para o caminho-base sem extensão."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato '{fmt}' inválido. Use um de {FORMATS}.")
+    return base + _EXT[fmt]
+
+
+def exists(base: str, fmt: str = 'csv') -> bool:
+    return os.path.exists(frame_path(base, fmt))
+
+
+def save_frame(df: pd.DataFrame, base: str, fmt: str = 'csv') -> str:
+    """
+    Salva um DataFrame com índice de datas no formato pedido.
+
+    Formatos:
+    ---------
+    csv: texto (formato original do projeto)
+    npy: uma pasta com um .npy por coluna + index.npy + meta.json. Preserva
+        dtypes e permite abrir colunas isoladas por memory-map (sem cópia).
+        O índice vai como int64 (UTC) com unidade e fuso no meta.json
+    parquet / feather: colunar via pyarrow (dependência opcional)
+
+    Retorna:
+    --------
+    Caminho escrito.
+    """
+    path = frame_path(base, fmt)
+    index_name = df.index.name or 'Date'
+
+    if fmt == 'csv':
+        df.to_csv(path)
+
+    elif fmt == 'npy':
+        # escreve numa pasta temporária e troca no final: quem lê nunca vê meia escrita
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        columns = []
+        for i, col in enumerate(df.columns):
+            values = df[col].to_numpy()
+            np.save(os.path.join(tmp, f'c{i}.npy'), values, allow_pickle=values.dtype == object)
+            columns.append({'name': col, 'file': f'c{i}.npy', 'dtype': str(values.dtype)})
+        # índice com fuso viraria array de objetos (exige pickle e perde o fuso)
+        index = pd.DatetimeIndex(df.index)
+        np.save(os.path.join(tmp, 'index.npy'), index.asi8)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'index_name': index_name, 'index_unit': index.unit,
+                       'index_tz': None if index.tz is None else str(index.tz),
+                       'columns': columns}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    elif fmt == 'parquet':
+        df.to_parquet(path)
+
+    elif fmt == 'feather':
+        df.rename_axis(index_name).reset_index().to_feather(path)
+
+    return path
+
+
+def _migrate(df: pd.DataFrame, base: str, fmt: str) -> bool:
+    """Salva df no formato fmt e confere relendo; se falhar, apaga o arquivo novo."""
+    path = frame_path(base, fmt)
+    try:
+        save_frame(df, base, fmt)
+        back = load_frame(base, fmt, migrate=False)
+        if back.shape != df.shape or not back.index.equals(df.index):
+            raise ValueError("arquivo relido difere do CSV")
+        return True
+    except Exception as e:
+        print(f"Erro ao migrar {frame_path(base, 'csv')} para {fmt} ({e}); mantendo o CSV")
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+        return False
+
+
+def _load_index(file_path: str, meta: dict) -> pd.DatetimeIndex:
+    values = np.load(file_path)
+    if 'index_unit' not in meta:
+        # pastas antigas: índice salvo direto como datetime64
+        return pd.DatetimeIndex(values, name=meta['index_name'])
+    index = pd.DatetimeIndex(values.view(f"M8[{meta['index_unit']}]"), name=meta['index_name'])
+    if meta['index_tz'] is not None:
+        index = index.tz_localize('UTC').tz_convert(meta['index_tz'])
+    return index
+
+
+def load_frame(base: str, fmt: str = 'csv', columns: Optional[List[str]] = None,
+               mmap: bool = True, migrate: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Lê um DataFrame salvo por save_frame.
+
+    columns: lê só essas colunas (nos formatos binários as demais nem são abertas)
+    mmap: no formato npy as colunas são memory-maps somente-leitura (sem cópia);
+        no feather a tabela é lida com memory_map=True
+    migrate: se o formato binário não existir mas houver o .csv antigo, converte
+        o CSV para o formato pedido (e remove o CSV depois de reler o arquivo novo)
+
+    Retorna:
+    --------
+    DataFrame indexado por data, ou None se não houver arquivo.
+    """
+    path = frame_path(base, fmt)
+
+    if not os.path.exists(path):
+        csv_path = frame_path(base, 'csv')
+        if fmt != 'csv' and migrate and os.path.exists(csv_path):
+            df = load_frame(base, 'csv')
+            if not _migrate(df, base, fmt):
+                return df if columns is None else df[columns]
+            os.remove(csv_path)
+            print(f"Migrou {csv_path} para {path}")
+        else:
+            return None
+
+    if fmt == 'csv':
+        df = pd.read_csv(path, parse_dates=[0], index_col=0)
+        return df if columns is None else df[columns]
+
+    if fmt == 'npy':
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        by_name = {c['name']: c for c in meta['columns']}
+        wanted = [c['name'] for c in meta['columns']] if columns is None else columns
+        missing = [c for c in wanted if c not in by_name]
+        if missing:
+            raise KeyError(f'Colunas não encontradas em {path}: {missing}')
+
+        index = _load_index(os.path.join(path, 'index.npy'), meta)
+        data = {}
+        for name in wanted:
+            info = by_name[name]
+            file_path = os.path.join(path, info['file'])
+            if info['dtype'] == 'object':
+                data[name] = np.load(file_path, allow_pickle=True)
+            else:
+                # np.asarray: view ndarray comum sobre o mmap (sem cópia, sem subclasse memmap)
+                data[name] = np.asarray(np.load(file_path, mmap_mode='r' if mmap else None))
+        return pd.DataFrame(data, index=index, columns=wanted, copy=False)
+
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+
+    if fmt == 'feather':
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=mmap)
+        index_name = table.column_names[0]
+        if columns is not None:
+            table = table.select([index_name] + list(columns))
+        return table.to_pandas().set_index(index_name)
+
+
+def iter_frame(base: str, fmt: str = 'csv', chunk_rows: int = 100_000,
+               columns: Optional[List[str]] = None):
+    """
+    Lê um DataFrame salvo por save_frame em blocos de até chunk_rows linhas,
+    sem carregar o arquivo inteiro: csv com read_csv(chunksize), npy e
+    feather por memory-map (cada bloco é copiado só quando lido), parquet
+    por lotes do pyarrow.
+
+    Retorna:
+    --------
+    Gerador de DataFrames indexados por data (nenhum, se não houver arquivo).
+    """
+    path = frame_path(base, fmt)
+    if not os.path.exists(path):
+        if fmt != 'csv' and os.path.exists(frame_path(base, 'csv')):
+            yield from iter_frame(base, 'csv', chunk_rows, columns)
+        return
+
+    if fmt == 'csv':
+        for chunk in pd.read_csv(path, parse_dates=[0], index_col=0, chunksize=chunk_rows):
+            yield chunk if columns is None else chunk[columns]
+
+    elif fmt == 'npy':
+        data = load_frame(base, 'npy', columns=columns, mmap=True, migrate=False)
+        for i in range(0, len(data), chunk_rows):
+            yield data.iloc[i:i + chunk_rows].copy()
+
+    elif fmt == 'parquet':
+        from pyarrow import parquet
+        file = parquet.ParquetFile(path)
+        index_name = file.schema_arrow.pandas_metadata['index_columns'][0]
+        read = None if columns is None else list(columns) + [index_name]
+        for batch in file.iter_batches(batch_size=chunk_rows, columns=read):
+            yield batch.to_pandas()
+
+    elif fmt == 'feather':
+        from pyarrow import feather
+        table = feather.read_table(path, memory_map=True)
+        index_name = table.column_names[0]
+        if columns is not None:
+            table = table.select([index_name] + list(columns))
+        for i in range(0, table.num_rows, chunk_rows):
+            yield table.slice(i, chunk_rows).to_pandas().set_index(index_name)
@@ -0,0 +1,320 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import re
+import glob
+from typing import List, Tuple, Optional, Callable
+from src.data.storage import frame_path, load_frame, save_frame, iter_frame
+from src.utils.profiling import stage
+
+
+def _safe_name(ticker: str) -> str:
+    return ticker.replace('^', '').replace('=', '_')
+
+
+def _interval_delta(interval: str):
+    """Duração de uma barra do intervalo do yfinance ('5m', '1h', '1d', '1wk', '1mo'...); outros = 1 dia."""
+    m = re.fullmatch(r'(\d+)(m|h|d|wk|mo)', interval)
+    if m is None:
+        return pd.Timedelta(days=1)
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == 'mo':
+        return pd.DateOffset(months=n)
+    return pd.Timedelta(**{{'m': 'minutes', 'h': 'hours', 'd': 'days', 'wk': 'weeks'}[unit]: n})
+
+
+def _to_tz(ts, tz) -> pd.Timestamp:
+    """
+    Timestamp no fuso tz do índice salvo. Horário sem fuso é lido como hora
+    local de tz (mesma convenção do yfinance para datas sem fuso); com tz=None
+    o fuso é descartado mantendo a hora local.
+    """
+    ts = pd.Timestamp(ts)
+    if tz is None:
+        return ts if ts.tz is None else ts.tz_localize(None)
+    if ts.tz is None:
+        return ts.tz_localize(tz, ambiguous=False, nonexistent='shift_forward')
+    return ts.tz_convert(tz)
+
+
+def _fetch_arg(ts: pd.Timestamp):
+    """Argumento de fetch: 'YYYY-MM-DD' quando isso não perde nada, senão o próprio Timestamp."""
+    return ts.strftime('%Y-%m-%d') if ts.tz is None and ts == ts.normalize() else ts
+
+
+def _merge_spans(spans: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Une intervalos [início, fim) sobrepostos ou encostados."""
+    merged = []
+    for s, e in sorted(spans):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def _subtract_spans(start, end, covered):
+    """Partes de [start, end) que não estão em covered."""
+    missing = []
+    cursor = start
+    for s, e in covered:
+        if e <= cursor or s >= end:
+            continue
+        if s > cursor:
+            missing.append((cursor, min(s, end)))
+        cursor = max(cursor, e)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class MarketDataStore:
+    """
+    Store incremental de barras por (ticker, intervalo).
+
+    Cada ticker tem um único arquivo {ticker}_{interval} (csv ou formato
+    binário, ver src/data/storage.py) e um arquivo .json com os intervalos
+    [início, fim) já cobertos. Um pedido de período
+    busca só as partes que faltam e as funde com o que já está salvo.
+    As últimas `overlap` barras salvas são sempre buscadas de novo para
+    detectar barras revisadas (ex.: o último pregão baixado ainda aberto).
+    Se o 'Adj Close' mudou na barra mais antiga da sobreposição, o ajuste
+    (dividendos/splits) se propagou para trás e todo o histórico é rebaixado.
+
+    Parâmetros:
+    -----------
+    dir: str
+        Pasta do store (ex: data/raw)
+    overlap: int
+        Número de barras re-buscadas a cada atualização
+    rtol: float
+        Tolerância relativa para considerar uma barra revisada
+    format: str
+        'csv', 'npy', 'parquet' ou 'feather'. Caches CSV existentes são
+        convertidos automaticamente para o formato binário na primeira leitura
+    """
+
+    def __init__(self, dir: str = 'data/raw', overlap: int = 5, rtol: float = 1e-8,
+                 format: str = 'csv'):
+        self.dir = dir
+        self.overlap = overlap
+        self.rtol = rtol
+        self.format = format
+        self._migrated = set()
+        os.makedirs(dir, exist_ok=True)
+
+    # ==== arquivos ====
+
+    def _base(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.dir, f"{_safe_name(ticker)}_{interval}")
+
+    def path(self, ticker: str, interval: str) -> str:
+        return frame_path(self._base(ticker, interval), self.format)
+
+    def _meta_path(self, ticker: str, interval: str) -> str:
+        return self._base(ticker, interval) + '.json'
+
+    def _read(self, ticker, interval, columns=None, mmap=True) -> Optional[pd.DataFrame]:
+        with stage('read') as s:
+            return s.out(load_frame(self._base(ticker, interval), self.format, columns=columns, mmap=mmap))
+
+    def _write(self, ticker, interval, data: pd.DataFrame):
+        data.index.name = 'Date'
+        with stage('write', data):
+            save_frame(data, self._base(ticker, interval), self.format)
+
+    def covered(self, ticker: str, interval: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        path = self._meta_path(ticker, interval)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            spans = json.load(f)['covered']
+        return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in spans]
+
+    def _spans(self, ticker, interval, tz):
+        """covered() no fuso tz dos dados salvos."""
+        return [(_to_tz(s, tz), _to_tz(e, tz)) for s, e in self.covered(ticker, interval)]
+
+    def _tz(self, ticker, interval):
+        """Fuso do índice salvo (None se sem fuso ou sem dados)."""
+        data = self._read(ticker, interval, columns=[])
+        return None if data is None else data.index.tz
+
+    def _write_covered(self, ticker, interval, spans):
+        with open(self._meta_path(ticker, interval), 'w') as f:
+            json.dump({'ticker': ticker, 'interval': interval,
+                       'covered': [[s.isoformat(), e.isoformat()] for s, e in _merge_spans(spans)]}, f)
+
+    # ==== lógica incremental ====
+
+    def missing_spans(self, ticker: str, start, end, interval: str = '1d'):
+        """Intervalos [início, fim) de [start, end) que ainda não estão no store."""
+        tz = self._tz(ticker, interval)
+        return _subtract_spans(_to_tz(start, tz), _to_tz(end, tz), self._spans(ticker, interval, tz))
+
+    def migrate_legacy(self, ticker: str, interval: str = '1d'):
+        """
+        Incorpora (e remove) os caches antigos {ticker}_{start}_{end}.csv,
+        para que não fiquem acumulados na pasta. Só olha a pasta uma vez por
+        (ticker, intervalo) em cada instância.
+        """
+        if (ticker, interval) in self._migrated:
+            return
+        self._migrated.add((ticker, interval))
+        pattern = os.path.join(self.dir, f"{_safe_name(ticker)}_????-??-??_????-??-??.csv")
+        legacy = sorted(glob.glob(pattern))
+        if not legacy:
+            return
+
+        data = self._read(ticker, interval, mmap=False)
+        spans = self.covered(ticker, interval)
+        for file_path in legacy:
+            stem = os.path.basename(file_path)[:-4]
+            start, end = stem.rsplit('_', 2)[1:]
+            old = pd.read_csv(file_path, parse_dates=['Date']).set_index('Date')
+            data = old if data is None else pd.concat([old, data])
+            spans.append((pd.Timestamp(start), pd.Timestamp(end)))
+
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        self._write(ticker, interval, data)
+        self._write_covered(ticker, interval, [(_to_tz(s, data.index.tz), _to_tz(e, data.index.tz))
+                                               for s, e in spans])
+        for file_path in legacy:
+            os.remove(file_path)
+        print(f"Migrou {len(legacy)} cache(s) antigo(s) de {ticker} para {self.path(ticker, interval)}")
+
+    def _revised(self, old: pd.DataFrame, new: pd.DataFrame) -> pd.Index:
+        """Datas presentes nos dois frames cujos valores mudaram."""
+        common = old.index.intersection(new.index)
+        cols = old.columns.intersection(new.columns)
+        if len(common) == 0 or len(cols) == 0:
+            return common[:0]
+        a = old.loc[common, cols].to_numpy(dtype=float)
+        b = new.loc[common, cols].to_numpy(dtype=float)
+        same = np.isclose(a, b, rtol=self.rtol, atol=0.0, equal_nan=True).all(axis=1)
+        return common[~same]
+
+    def _fetched_span(self, s, e, part: pd.DataFrame, interval: str, cover_requested: bool = False):
+        """
+        Trecho [s, e) realmente coberto por part: vai até a última barra
+        retornada mais um intervalo, não até o fim pedido (a fonte pode ainda
+        não ter as barras finais, que precisam ser buscadas de novo depois).
+        Com cover_requested, vai até e (limitado ao instante da busca).
+        """
+        last = part.index.max()
+        s, e = _to_tz(s, last.tz), _to_tz(e, last.tz)
+        stop = last + _interval_delta(interval)
+        if cover_requested:
+            stop = max(stop, pd.Timestamp.now(tz=last.tz))
+        return s, max(s, min(e, stop))
+
+    def update(self, ticker: str, start, end, fetch: Callable, interval: str = '1d',
+               cover_requested: bool = False) -> dict:
+        """
+        Garante que [start, end) está no store, buscando só o que falta.
+
+        fetch: função fetch(start, end) -> DataFrame (start inclusivo, end exclusivo).
+            Recebe 'YYYY-MM-DD' em limites de dia sem fuso e Timestamps completos
+            (com o fuso dos dados) nos trechos intradiários
+        start / end: datas ou horários; sem fuso, valem como hora local do fuso
+            dos dados salvos (barras intradiárias do yfinance vêm com fuso)
+        cover_requested: se a fonte respondeu com dados, marca o trecho pedido
+            como coberto até end (ou até agora, se end está no futuro), mesmo
+            que a última observação seja anterior. Para séries esparsas (as
+            mensais do SGS), cujo último valor fica semanas antes de end
+
+        Retorna:
+        --------
+        dict com 'fetched_spans', 'rows_fetched', 'revised' e 'full_refresh'.
+        """
+        self.migrate_legacy(ticker, interval)
+        # sem memory-map: o arquivo vai ser reescrito (no Windows um mmap aberto bloqueia a troca)
+        data = self._read(ticker, interval, mmap=False)
+        # sem dados salvos, vale o fuso de quem pediu
+        tz = pd.Timestamp(start).tz if data is None else data.index.tz
+        start, end = _to_tz(start, tz), _to_tz(end, tz)
+        spans = self._spans(ticker, interval, tz)
+        missing = _subtract_spans(start, end, spans)
+        info = {'fetched_spans': [], 'rows_fetched': 0, 'revised': 0, 'full_refresh': False}
+
+        if data is not None and len(data) and missing:
+            # re-busca as últimas barras salvas antes do trecho novo que encosta nelas
+            last_covered_end = max(e for _, e in spans)
+            tail = data.index[data.index < last_covered_end][-self.overlap:]
+            if len(tail):
+                missing = [(min(s, tail[0]), e) if s == last_covered_end else (s, e)
+                           for s, e in missing]
+
+        if not missing:
+            return info
+
+        # só trechos que retornaram barras contam como cobertos, e só até a última
+        # barra: um trecho vazio (feriado ou falha silenciosa da fonte) ou o fim
+        # ainda não publicado é tentado de novo na próxima vez
+        fetched, new_spans = [], []
+        for s, e in missing:
+            part = fetch(_fetch_arg(s), _fetch_arg(e))
+            info['fetched_spans'].append((s, e))
+            if part is not None and len(part):
+                fetched.append(part)
+                new_spans.append(self._fetched_span(s, e, part, interval, cover_requested))
+        new = pd.concat(fetched) if fetched else None
+
+        if data is not None and new is not None:
+            revised = self._revised(data, new)
+            info['revised'] = len(revised)
+            overlap = data.index.intersection(new.index)
+            if ('Adj Close' in data.columns and len(overlap)
+                    and not np.isclose(data.loc[overlap[0], 'Adj Close'], new.loc[overlap[0], 'Adj Close'],
+                                       rtol=self.rtol, atol=0.0)):
+                # ajuste retroativo: o histórico inteiro mudou de escala
+                info['full_refresh'] = True
+                s_all = min([s for s, _ in spans] + [start])
+                e_all = max([e for _, e in spans] + [end])
+                new = fetch(_fetch_arg(s_all), _fetch_arg(e_all))
+                data = None
+                spans = []
+                new_spans = ([self._fetched_span(s_all, e_all, new, interval, cover_requested)]
+                             if new is not None and len(new) else [])
+
+        if new is not None:
+            info['rows_fetched'] = len(new)
+            data = new if data is None else pd.concat([data, new])
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+            self._write(ticker, interval, data)
+            tz = data.index.tz
+        # primeira carga com fuso: os trechos pedidos sem fuso passam para o fuso dos dados
+        self._write_covered(ticker, interval, [(_to_tz(s, tz), _to_tz(e, tz)) for s, e in spans + new_spans])
+        return info
+
+    def get(self, ticker: str, start, end, interval: str = '1d', columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Lê [start, end) do store (sem buscar nada). Nos formatos binários só as
+        colunas pedidas são abertas, e o recorte de datas é uma fatia (sem cópia no npy).
+        """
+        data = self._read(ticker, interval, columns=columns)
+        if data is None:
+            return None
+        tz = data.index.tz
+        lo, hi = data.index.searchsorted([_to_tz(start, tz), _to_tz(end, tz)])
+        return data.iloc[lo:hi]
+
+    def iter_chunks(self, ticker: str, start, end, interval: str = '1d', chunk_rows: int = 100_000,
+                    columns: Optional[List[str]] = None):
+        """
+        Como get, mas em blocos de até chunk_rows barras (ver storage.iter_frame):
+        o histórico nunca fica inteiro em memória.
+        """
+        for chunk in iter_frame(self._base(ticker, interval), self.format, chunk_rows, columns=columns):
+            if len(chunk) == 0:
+                continue
+            start, end = _to_tz(start, chunk.index.tz), _to_tz(end, chunk.index.tz)
+            if chunk.index[-1] < start:
+                continue
+            if chunk.index[0] >= end:
+                break
+            lo, hi = chunk.index.searchsorted([start, end])
+            yield chunk.iloc[lo:hi]
@@ -4,10 +4,25 @@ from src.features.engineering import (
     create_vol_features, create_market_regimes,
     create_moving_averages, create_diffs
 )
+from src.features.columnar import build_all_features_columnar
+from src.features.cache import StageCache
+from src.utils.memory import compact_dtypes
+from src.utils.profiling import stage, profiled
+from src.constants import BARS_PER_YEAR
 import pandas as pd
 import numpy as np
 from typing import List, Optional, Dict
 
+
+def _stage(cache, name, df, inputs, params, func):
+    '''Executa um estágio, memoizado em disco se houver cache (e medido, se houver Profiler).'''
+    with stage(name, df) as s:
+        if cache is None:
+            return s.out(func(df))
+        return s.out(cache.run(name, df, inputs, params, func))
+
+
+@profiled('build_all_features')
 def build_all_features(
         df: pd.DataFrame,
         target_price_col: str,
@@ -16,17 +31,65 @@ def build_all_features(
         vix_col: str = '^VIX',
         econ_ind: Dict[str, int] = None,
         windows: List[int] = None,
-        lags: List[int] = None
+        lags: List[int] = None,
+        engine: str = 'pandas',
+        cache: Optional[StageCache] = None,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        float32: bool = False,
+        bars_per_year: int = 252,
+        regime_window: Optional[int] = None,
+        regime_quantiles: tuple = (0.25, 0.75)
 )-> pd.DataFrame:
     """
     Aplica TODAS as features ANTES do split.
+
+    engine: 'pandas' (padrão) encadeia as funções create_*; 'columnar' escreve
+    todos os estágios em um único bloco NumPy pré-alocado e monta o DataFrame
+    uma vez só no final (mesmas colunas e valores, sem cópias por estágio).
+
+    cache: StageCache opcional (engine 'pandas'). Cada estágio (logreturns,
+    lags, temporal, volume, vol, corr, mas, regimes, diffs) é memoizado pelo
+    hash das colunas que lê e dos seus parâmetros.
+
+    columns: (engine 'columnar') calcula só as colunas pedidas e suas
+    dependências, ex: as features que sobraram da seleção, na inferência.
+
+    compact: saída com dtypes compactos (flags e calendário em int8). Com
+    float32=True as features contínuas também vão para float32. Ver
+    src/utils/memory.py (memory_report mostra a memória por coluna).
+
+    bars_per_year: frequência das barras (ver BARS_PER_YEAR em src/constants.py),
+    usada para anualizar as vols. Acima do diário entram também as features de
+    hora do dia. regime_window: janela dos percentis dos regimes de vol
+    (padrão: bars_per_year, ou seja, um ano de barras). regime_quantiles:
+    (baixo, alto) que definem *_low_vol_regime e *_high_vol_regime.
     """
+    if engine == 'columnar' and cache is not None:
+        raise ValueError("cache só é suportado com engine='pandas'.")
+    if columns is not None and engine != 'columnar':
+        raise ValueError("columns só é suportado com engine='columnar'.")
+
+    if engine == 'columnar':
+        return build_all_features_columnar(
+            df, target_price_col=target_price_col, exog_price_cols=exog_price_cols,
+            volume_col=volume_col, vix_col=vix_col, econ_ind=econ_ind,
+            windows=windows, lags=lags, columns=columns,
+            compact=compact, float32=float32,
+            bars_per_year=bars_per_year, regime_window=regime_window,
+            regime_quantiles=regime_quantiles
+        )
+    elif engine != 'pandas':
+        raise ValueError(f"engine deve ser 'pandas' ou 'columnar', recebido '{engine}'.")
+
     df = df.copy()
 
     # Validações iniciais
     exog_price_cols = exog_price_cols or []
     windows = windows or [5, 22, 63]
     lags = lags or [1, 5, 22]
+    regime_window = regime_window or bars_per_year
+    intraday = bars_per_year > BARS_PER_YEAR['1d']
 
     # === VALIDAÇÃO: volume NUNCA é preço ===
     if volume_col and volume_col in exog_price_cols:
@@ -37,58 +100,83 @@ def build_all_features(
 
     # 1. Log-retornos
     price_cols = [target_price_col] + (exog_price_cols or [])
-    df = create_logreturns(df, price_cols)
+    df = _stage(cache, 'logreturns', df, price_cols, {'cols': price_cols},
+                lambda d: create_logreturns(d, price_cols))
 
     #renomeando coluna do ln ret do ativo alvo
     df = df.rename(columns={f"{target_price_col}_logreturns": "log_return"})
 
     # 2. Log-volume
     if volume_col is not None and volume_col in df.columns:
-        df = df[df[volume_col] > 0]
-        df['log_volume'] = np.log(df[volume_col])
-        df = df.drop(columns=[volume_col])
+        with stage('log_volume', df) as s:
+            df = df[df[volume_col] > 0]
+            df['log_volume'] = np.log(df[volume_col])
+            df = s.out(df.drop(columns=[volume_col]))
 
     # 3. Lags (só em log-retornos e log-volume)
     lag_cols = [f'{col}_logreturns' for col in exog_price_cols]
     if 'log_volume' in df.columns:
         lag_cols.append('log_volume')
     lag_cols = [col for col in lag_cols if col in df.columns]
-    df = create_lags(df, lag_cols, lags)
+    df = _stage(cache, 'lags', df, lag_cols, {'lags': lags},
+                lambda d: create_lags(d, lag_cols, lags))
     
     # 4. Temporais
-    df = create_temp_features(df)
+    df = _stage(cache, 'temporal', df, [], {'intraday': intraday},
+                lambda d: create_temp_features(d, intraday=intraday))
     
     # 5. Volume features
     if 'log_volume' in df.columns:
-        df = create_volume_features(df, 'log_volume')
+        df = _stage(cache, 'volume', df, ['log_volume'], {},
+                    lambda d: create_volume_features(d, 'log_volume'))
     
     # 6. Vol features
     logreturn_cols = [f"{col}_logreturns" for col in exog_price_cols]
     logreturn_cols = [col for col in logreturn_cols if col in df.columns]
-    df = create_vol_features(df, 'log_return', logreturn_cols, windows)
+    asset_cols = ['log_return'] + logreturn_cols
+    vol_params = {'windows': windows, 'regime_window': regime_window, 'bars_per_year': bars_per_year,
+                  'regime_quantiles': list(regime_quantiles)}
+    df = _stage(cache, 'vol', df, asset_cols, vol_params,
+                lambda d: create_vol_features(d, 'log_return', logreturn_cols, windows,
+                                              regime_window=regime_window, regime_quantiles=regime_quantiles,
+                                              bars_per_year=bars_per_year))
     
     # 7. Correlações dinâmicas
-    df = create_dynamic_corr(df, 'log_return', logreturn_cols, windows)
+    df = _stage(cache, 'corr', df, asset_cols, {'windows': windows},
+                lambda d: create_dynamic_corr(d, 'log_return', logreturn_cols, windows))
     
     # 8. MAs
     ma_cols = ["log_return"] + logreturn_cols
-    df = create_moving_averages(df, ma_cols, windows)
+    df = _stage(cache, 'mas', df, ma_cols, {'windows': windows},
+                lambda d: create_moving_averages(d, ma_cols, windows))
     
     # 9. Regimes
     if vix_col in df.columns:
-        df = create_market_regimes(df, vix_col)
+        df = _stage(cache, 'regimes', df, [vix_col, 'VIX_logreturns'], {},
+                    lambda d: create_market_regimes(d, vix_col))
     
-    # 10 Diffs
+    # 10 Diffs e 11 Events (um estágio só: os eventos saem da diff da selic)
     if econ_ind:
-        df = create_diffs(df, econ_ind, lags)
-    
+        econ_cols = [econ_ind] if isinstance(econ_ind, str) else list(econ_ind)
+        df = _stage(cache, 'diffs', df, econ_cols, {'lags': lags},
+                    lambda d: _diffs_and_events(d, econ_ind, lags))
+
+    with stage('dropna', df) as s:
+        df = df.dropna()
+        df = df.reset_index()
+        df = s.out(df.reset_index(drop=True))
+
+    return compact_dtypes(df, float32=float32) if compact else df
+
+
+def _diffs_and_events(df, econ_ind, lags):
+    # 10 Diffs
+    df = create_diffs(df, econ_ind, lags)
+
     # 11 Events
     if 'selic' in econ_ind:
         df['selic_event'] = (df['diff_1_selic'] != 0).astype(int)
         df.drop(columns = 'diff_1_selic',inplace=True)
         df = create_lags(df, 'selic_event', lags)
 
-    df = df.dropna()
-    df = df.reset_index()
-
-    return df.reset_index(drop=True)
\ No newline at end of file
+    return df
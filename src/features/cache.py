@@ -0,0 +1,118 @@
+import pandas as pd
+import os
+import json
+import time
+import hashlib
+from typing import Callable, List, Optional
+
+# Mudou a lógica de algum estágio? Incremente para invalidar o cache antigo.
+CACHE_VERSION = 1
+
+
+class StageCache:
+    """
+    Cache em disco, endereçado por conteúdo, dos estágios de build_all_features.
+
+    A chave de um estágio é o hash do nome do estágio, dos parâmetros e do
+    conteúdo (índice + valores) das colunas que ele lê. Assim, num sweep de
+    `windows` ou `lags`, só os estágios que dependem do que mudou são
+    recalculados; os demais são lidos do disco.
+
+    Parâmetros:
+    -----------
+    dir: str
+        Pasta do cache
+    max_bytes: int
+        Tamanho máximo do cache; acima disso os itens menos usados recentemente
+        são removidos
+    """
+
+    def __init__(self, dir: str = 'data/cache/features', max_bytes: int = 2 * 1024 ** 3):
+        self.dir = dir
+        self.max_bytes = max_bytes
+        self.stats = {}
+        os.makedirs(dir, exist_ok=True)
+
+    def _count(self, stage, field, value=1):
+        entry = self.stats.setdefault(stage, {'hits': 0, 'misses': 0,
+                                              'compute_seconds': 0.0, 'load_seconds': 0.0})
+        entry[field] += value
+
+    def key(self, stage: str, df: pd.DataFrame, inputs: List[str], params: dict) -> str:
+        h = hashlib.sha256()
+        h.update(json.dumps([stage, CACHE_VERSION, params], sort_keys=True, default=str).encode())
+        h.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+        for col in inputs:
+            h.update(f'{col}:{df[col].dtype}'.encode())
+            h.update(pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes())
+        return h.hexdigest()
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.dir, f'{stage}-{key[:40]}.pkl')
+
+    def get(self, stage: str, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(stage, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            cached = pd.read_pickle(path)
+        except Exception as e:
+            print(f'Cache corrompido em {path}: {e}')
+            os.remove(path)
+            return None
+        os.utime(path)  # marca como usado recentemente (LRU)
+        return cached
+
+    def put(self, stage: str, key: str, data: pd.DataFrame):
+        path = self._path(stage, key)
+        tmp = path + '.tmp'
+        data.to_pickle(tmp)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Remove os itens menos usados até o cache caber em max_bytes."""
+        entries = [e for e in os.scandir(self.dir) if e.name.endswith('.pkl')]
+        total = sum(e.stat().st_size for e in entries)
+        if total <= self.max_bytes:
+            return
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for entry in os.scandir(self.dir):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+    def run(self, stage: str, df: pd.DataFrame, inputs: List[str], params: dict,
+            func: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Executa func(df) com memoização. O estágio só pode acrescentar colunas;
+        no acerto, as colunas salvas são anexadas a df na mesma ordem.
+        """
+        key = self.key(stage, df, inputs, params)
+        t0 = time.perf_counter()
+        cached = self.get(stage, key)
+        if cached is not None and cached.index.equals(df.index):
+            self._count(stage, 'hits')
+            self._count(stage, 'load_seconds', time.perf_counter() - t0)
+            return pd.concat([df, cached], axis=1)
+
+        out = func(df)
+        self._count(stage, 'misses')
+        self._count(stage, 'compute_seconds', time.perf_counter() - t0)
+        new_cols = [col for col in out.columns if col not in df.columns]
+        self.put(stage, key, out[new_cols])
+        return out
+
+    def report(self) -> pd.DataFrame:
+        """Acertos/erros por estágio, tempo gasto e tamanho atual do cache."""
+        report = pd.DataFrame.from_dict(self.stats, orient='index')
+        if len(report):
+            report['hit_rate'] = report['hits'] / (report['hits'] + report['misses'])
+        report.attrs['bytes'] = sum(e.stat().st_size for e in os.scandir(self.dir)
+                                    if e.name.endswith('.pkl'))
+        return report
@@ -0,0 +1,524 @@
+import pandas as pd
+import numpy as np
+from itertools import combinations
+from collections import namedtuple
+from typing import List, Optional, Dict
+
+from src.constants import BARS_PER_YEAR
+from src.features.rolling import rolling_corr_pairs, rolling_quantile_flags
+from src.utils.memory import compact_dtypes
+from src.utils.profiling import stage
+
+# Uma receita descreve um grupo de colunas de saída: quais colunas ela lê
+# (inputs), quais ela escreve (outputs), o dtype e a função que calcula os
+# valores a partir do bloco. A função devolve um array (n,) ou (n, len(outputs)).
+Recipe = namedtuple('Recipe', ['outputs', 'inputs', 'dtype', 'func'])
+
+FLAG_DTYPE = np.dtype(int)  # mesmo dtype de .astype(int) no modo pandas
+
+
+def _shift(x, k):
+    """Equivalente NumPy de Series.shift(k) para arrays float."""
+    out = np.full(len(x), np.nan)
+    if k == 0:
+        out[:] = x
+    elif k > 0:
+        out[k:] = x[:-k]
+    else:
+        out[:k] = x[-k:]
+    return out
+
+
+def _as_list(value, empty_msg):
+    if isinstance(value, str):
+        if len(value) == 0:
+            raise ValueError(empty_msg)
+        return [value]
+    if len(value) == 0:
+        raise ValueError(empty_msg)
+    return list(value)
+
+
+class FeatureBlock:
+    """
+    Bloco colunar pré-alocado onde todos os estágios escrevem.
+
+    Cada dtype ganha um único array 2-D em ordem Fortran, de forma que cada
+    coluna é uma fatia contígua. O DataFrame só é montado uma vez, em to_frame.
+
+    Parâmetros:
+    -----------
+    index: DatetimeIndex
+        Índice (já filtrado) das linhas do bloco
+    passthrough: dict
+        Colunas originais que seguem para a saída sem alteração
+    recipes: list
+        Lista de Recipe na ordem em que as colunas devem aparecer
+    dtype_map: dict
+        Troca de dtype na alocação, ex: {FLAG_DTYPE: np.int8} (modo compacto)
+    """
+
+    def __init__(self, index, passthrough, recipes, dtype_map=None):
+        self.index = index
+        self.passthrough = passthrough
+        self.recipes = recipes
+        self.dtype_map = dtype_map or {}
+
+        n = len(index)
+        self._slots = {}
+        widths = {}
+        for recipe in recipes:
+            dtype = np.dtype(self.dtype_map.get(np.dtype(recipe.dtype), recipe.dtype))
+            for name in recipe.outputs:
+                j = widths.get(dtype, 0)
+                self._slots[name] = (dtype, j)
+                widths[dtype] = j + 1
+
+        self._blocks = {dtype: np.empty((n, k), dtype=dtype, order='F')
+                        for dtype, k in widths.items()}
+
+    def __contains__(self, name):
+        return name in self._slots or name in self.passthrough
+
+    def __getitem__(self, name):
+        if name in self._slots:
+            dtype, j = self._slots[name]
+            return self._blocks[dtype][:, j]
+        return self.passthrough[name]
+
+    def series(self, name):
+        """Series sem cópia sobre a coluna, para reaproveitar os kernels do pandas."""
+        return pd.Series(self[name], index=self.index, copy=False)
+
+    def write(self, recipe, values):
+        values = np.asarray(values)
+        if values.ndim == 1:
+            values = values[:, None]
+        for k, name in enumerate(recipe.outputs):
+            self[name][:] = values[:, k]
+
+    def compute(self, precomputed=None):
+        """
+        Calcula todas as receitas em ordem.
+
+        precomputed: dict opcional {coluna: array} com colunas já calculadas
+            em outro bloco com o mesmo índice; receitas cujas saídas estão
+            todas ali são copiadas em vez de recalculadas.
+        """
+        precomputed = precomputed or {}
+        for recipe in self.recipes:
+            if all(name in precomputed for name in recipe.outputs):
+                values = np.column_stack([precomputed[name] for name in recipe.outputs])
+            else:
+                values = recipe.func(self)
+            self.write(recipe, values)
+        return self
+
+    def independent_of(self, roots):
+        """
+        Receitas que não dependem (nem indiretamente) das colunas em roots.
+        Ex: com roots = preço e volume do ativo principal, sobram as features
+        só de exógenas, calendário e indicadores.
+        """
+        tainted = set(roots)
+        recipes = []
+        for recipe in self.recipes:
+            if tainted.intersection(recipe.inputs):
+                tainted.update(recipe.outputs)
+            else:
+                recipes.append(recipe)
+        return recipes
+
+    def columns(self):
+        """Ordem final das colunas, reproduzindo a semântica de atribuição do pandas."""
+        order = list(self.passthrough)
+        seen = set(order)
+        for recipe in self.recipes:
+            for name in recipe.outputs:
+                if name not in seen:
+                    order.append(name)
+                    seen.add(name)
+        return order
+
+    def prune(self, columns):
+        """
+        Novo bloco só com as receitas de que `columns` precisa, direta ou
+        indiretamente (ex: log_return_vol_ratio_5_63 puxa log_return_vol_5 e
+        log_return_vol_63, que puxam log_return). As receitas formam um DAG
+        pelas colunas de inputs/outputs; o resto nem é alocado.
+        """
+        known = set(self.passthrough)
+        for recipe in self.recipes:
+            known.update(recipe.outputs)
+        unknown = [name for name in columns if name not in known]
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {unknown}")
+
+        # de trás para frente: cada coluna pendente vem do último produtor antes do consumidor
+        needed = set(columns) - set(self.passthrough)
+        keep = []
+        for recipe in reversed(self.recipes):
+            if needed.intersection(recipe.outputs):
+                keep.append(recipe)
+                needed.difference_update(recipe.outputs)
+                needed.update(name for name in recipe.inputs if name not in self.passthrough)
+        return FeatureBlock(self.index, self.passthrough, keep[::-1], self.dtype_map)
+
+    def nbytes(self):
+        return sum(block.nbytes for block in self._blocks.values())
+
+    def to_frame(self, dropna=True, columns=None):
+        """
+        Monta o DataFrame final (equivalente a df.dropna().reset_index()).
+        columns: só essas colunas, nessa ordem (o dropna também só olha para elas).
+        """
+        names = self.columns() if columns is None else list(columns)
+        keep = np.ones(len(self.index), dtype=bool)
+        if dropna:
+            for name in names:
+                keep &= ~pd.isna(self[name])
+
+        index_name = self.index.name if self.index.name is not None else 'index'
+        parts = [pd.DataFrame({index_name: self.index[keep]})]
+        passthrough = [name for name in names if name not in self._slots]
+        if passthrough:
+            parts.append(pd.DataFrame({name: self[name][keep] for name in passthrough}))
+
+        # um DataFrame por dtype direto do bloco (uma cópia só, já no layout do pandas);
+        # concat e a seleção final de colunas não copiam de novo (copy-on-write)
+        for dtype, values in self._blocks.items():
+            cols = [name for name in names if name in self._slots and self._slots[name][0] == dtype]
+            if cols:
+                rows = values.T[np.ix_([self._slots[name][1] for name in cols], keep)]
+                parts.append(pd.DataFrame(rows.T, columns=cols, copy=False))
+
+        return pd.concat(parts, axis=1)[[index_name] + names]
+
+
+# ==== Receitas por estágio (mesma ordem e nomes de build_all_features) ====
+
+def _logreturn_recipes(df, price_cols, target_price_col, keep):
+    recipes = []
+    for col in price_cols:
+        if (np.any(df[col].isnull()) or np.any(df[col] == 0)):
+            raise ValueError(f'A coluna {col} apresenta zeros ou nulos.')
+        name = 'log_return' if col == target_price_col else f'{col}_logreturns'
+
+        def func(block, col=col):
+            full = df[col]
+            values = np.log(full / full.shift(1)).to_numpy()
+            return values if keep is None else values[keep]
+
+        recipes.append(Recipe((name,), (col,), np.float64, func))
+    return recipes
+
+
+def _lag_recipes(cols, lags, source=None):
+    recipes = []
+    for col in cols:
+        outputs = tuple(f'{col}_lag_{lag}' for lag in lags)
+
+        def func(block, col=col):
+            x = block[col] if source is None else source(block)
+            return np.column_stack([_shift(np.asarray(x, dtype=float), lag) for lag in lags])
+
+        recipes.append(Recipe(outputs, (col,), np.float64, func))
+    return recipes
+
+
+def _temp_recipes(index, intraday=False):
+    month = np.asarray(index.month)
+    cal_dtype = month.dtype
+    recipes = [
+        Recipe(('month',), (), cal_dtype, lambda block: month),
+        Recipe(('weekday',), (), cal_dtype, lambda block: np.asarray(index.weekday)),
+        Recipe(('quarter',), (), cal_dtype, lambda block: np.asarray(index.quarter)),
+        Recipe(('is_month_end',), (), FLAG_DTYPE,
+               lambda block: np.asarray(index.is_month_end).astype(int)),
+        Recipe(('month_sin',), (), np.float64, lambda block: np.sin(2 * np.pi * month / 12)),
+        Recipe(('month_cos',), (), np.float64, lambda block: np.cos(2 * np.pi * month / 12)),
+    ]
+    if intraday:
+        minute = np.asarray(index.hour * 60 + index.minute)
+        recipes += [
+            Recipe(('minute_of_day',), (), cal_dtype, lambda block: minute),
+            Recipe(('tod_sin',), (), np.float64, lambda block: np.sin(2 * np.pi * minute / 1440)),
+            Recipe(('tod_cos',), (), np.float64, lambda block: np.cos(2 * np.pi * minute / 1440)),
+        ]
+    return recipes
+
+
+def _volume_recipes(log_volume_col):
+    windows = [5, 21]
+    momentum_windows = [3, 5]
+    col = log_volume_col
+    diff_col = f'{col}_diff_1'
+
+    recipes = [Recipe((diff_col,), (col,), np.float64,
+                      lambda block: block.series(col).diff().to_numpy())]
+    for w in windows:
+        recipes.append(Recipe((f'{col}_ewm_{w}',), (col,), np.float64,
+                              lambda block, w=w: block.series(col).ewm(span=w).mean().to_numpy()))
+    for w in windows:
+        recipes.append(Recipe((f'{col}_buzz_{w}',), (col, f'{col}_ewm_{w}'), np.float64,
+                              lambda block, w=w: block[col] - block[f'{col}_ewm_{w}']))
+    for w in momentum_windows:
+        recipes.append(Recipe((f'{col}_momentum_{w}',), (diff_col,), np.float64,
+                              lambda block, w=w: block.series(diff_col).rolling(w).sum().to_numpy()))
+    for w in windows:
+        recipes.append(Recipe((f'{col}_volatility_{w}',), (diff_col,), np.float64,
+                              lambda block, w=w: block.series(diff_col).rolling(w).std().to_numpy()))
+
+    buzz = f'{col}_buzz_{max(windows)}'
+    recipes.append(Recipe(('volume_spike',), (buzz,), FLAG_DTYPE,
+                          lambda block: (block[buzz] > np.log(2.0)).astype(int)))
+    return recipes
+
+
+def _vol_recipes(target, feat, windows, regime_window=252, regime_quantiles=(0.25, 0.75),
+                 bars_per_year=252):
+    all_columns = [target] + feat
+    recipes = []
+
+    # 1. Vol do ativo principal e exógenas
+    for asset in all_columns:
+        for w in windows:
+            recipes.append(Recipe(
+                (f'{asset}_vol_{w}',), (asset,), np.float64,
+                lambda block, asset=asset, w=w:
+                    (block.series(asset).ewm(span=w, min_periods=w).std() * np.sqrt(bars_per_year)).to_numpy()))
+
+    # 2. Razões de vol
+    if len(windows) >= 2:
+        short_window = min(windows)
+        long_window = max(windows)
+        for asset in all_columns:
+            short_col = f'{asset}_vol_{short_window}'
+            long_col = f'{asset}_vol_{long_window}'
+            recipes.append(Recipe(
+                (f'{asset}_vol_ratio_{short_window}_{long_window}',), (short_col, long_col), np.float64,
+                lambda block, s=short_col, l=long_col: block[s] / block[l]))
+
+    # 3. Vol relativa (spreads)
+    for f in feat:
+        for w in windows:
+            a, b = f'{target}_vol_{w}', f'{f}_vol_{w}'
+            recipes.append(Recipe((f'vol_spread_{target}_{f}_{w}',), (a, b), np.float64,
+                                  lambda block, a=a, b=b: block[a] - block[b]))
+
+    # 4. Vol correlations
+    if len(windows) >= 1:
+        vol_window = max(windows)
+        for f in feat:
+            a, b = f'{target}_vol_{vol_window}', f'{f}_vol_{vol_window}'
+            recipes.append(Recipe(
+                (f'vol_corr_{target}_{f}_{vol_window}',), (a, b), np.float64,
+                lambda block, a=a, b=b:
+                    block.series(a).rolling(vol_window).corr(block.series(b)).to_numpy()))
+
+    # 5. Regimes de volatilidade: um grupo por ativo, para que os das exógenas
+    # não dependam do ativo principal (ver FeatureBlock.independent_of)
+    if len(windows) >= 1:
+        long_window = max(windows)
+        for asset in all_columns:
+            col = f'{asset}_vol_{long_window}'
+            recipes.append(Recipe(
+                (f'{asset}_high_vol_regime', f'{asset}_low_vol_regime'), (col,), FLAG_DTYPE,
+                lambda block, col=col:
+                    rolling_quantile_flags(block[col][:, None], regime_window, regime_quantiles,
+                                           min_periods=int(regime_window * 0.8))[:, 0]))
+
+    return recipes
+
+
+def _corr_recipes(target, feat, windows):
+    # Um grupo por ativo com os pares (ativo, ativos seguintes): cada grupo sai de
+    # uma chamada do kernel vetorizado, e os pares só de exógenas não dependem do alvo
+    cols = [target] + feat
+    recipes = []
+    for i in range(len(cols) - 1):
+        group = cols[i:]
+        pairs = [(0, j) for j in range(1, len(group))]
+        outputs = tuple(f'corr_{group[0]}_{group[j]}_{w}' for _, j in pairs for w in windows)
+
+        def func(block, group=group, pairs=pairs):
+            X = np.column_stack([block[col] for col in group])
+            corr = rolling_corr_pairs(X, pairs, windows)
+            return corr.reshape(len(block.index), -1)
+
+        recipes.append(Recipe(outputs, tuple(group), np.float64, func))
+    return recipes
+
+
+def _ma_recipes(cols, windows):
+    recipes = []
+    for col in cols:
+        for w in windows:
+            recipes.append(Recipe((f'{col}_ma_{w}',), (col,), np.float64,
+                                  lambda block, col=col, w=w: block.series(col).rolling(w).mean().to_numpy()))
+    for col in cols:
+        for w in windows:
+            ma = f'{col}_ma_{w}'
+            recipes.append(Recipe((f'{col}_above_ma_{w}',), (col, ma), FLAG_DTYPE,
+                                  lambda block, col=col, ma=ma: (block[col] > block[ma]).astype(int)))
+    if len(windows) >= 2:
+        curta = min(windows)
+        longa = max(windows)
+        for col in cols:
+            a, b = f'{col}_ma_{curta}', f'{col}_ma_{longa}'
+            recipes.append(Recipe((f'{col}_spread_ma_{curta}_{longa}',), (a, b), np.float64,
+                                  lambda block, a=a, b=b: block[a] - block[b]))
+    return recipes
+
+
+def _regime_recipes(vix_col, vix_logret_col='VIX_logreturns'):
+    return [
+        Recipe(('vix_regime_low',), (vix_col,), FLAG_DTYPE,
+               lambda block: (block[vix_col] < 15).astype(int)),
+        Recipe(('vix_regime_high',), (vix_col,), FLAG_DTYPE,
+               lambda block: (block[vix_col] > 25).astype(int)),
+        Recipe(('vix_spike',), (vix_col,), FLAG_DTYPE,
+               lambda block: (block.series(vix_col).pct_change() > 0.2).astype(int).to_numpy()),
+        Recipe(('vix_calm_down',), (vix_logret_col,), FLAG_DTYPE,
+               lambda block: (block[vix_logret_col] < -0.15).astype(int)),
+    ]
+
+
+def _diff_recipes(variables, lags):
+    variables = _as_list(variables, 'Lista de variáveis vazia.')
+    recipes = []
+    for var in variables:
+        recipes += _lag_recipes([f'diff_1_{var}'], lags,
+                                source=lambda block, var=var: block.series(var).diff(1).to_numpy())
+        # a receita lê a variável original, não a diferença (que é descartada)
+        recipes[-1] = recipes[-1]._replace(inputs=(var,))
+    return recipes
+
+
+def _selic_event_recipes(lags):
+    def event(block):
+        return (block.series('selic').diff(1) != 0).astype(int).to_numpy()
+
+    recipes = [Recipe(('selic_event',), ('selic',), FLAG_DTYPE, event)]
+    recipes += _lag_recipes(['selic_event'], lags)
+    return recipes
+
+
+def plan_features(
+        df: pd.DataFrame,
+        target_price_col: str,
+        exog_price_cols: Optional[List[str]] = None,
+        volume_col: Optional[str] = None,
+        vix_col: str = '^VIX',
+        econ_ind: Dict[str, int] = None,
+        windows: List[int] = None,
+        lags: List[int] = None,
+        columns: Optional[List[str]] = None,
+        compact: bool = False,
+        bars_per_year: int = 252,
+        regime_window: Optional[int] = None,
+        regime_quantiles: tuple = (0.25, 0.75)
+) -> FeatureBlock:
+    """
+    Planeja (sem calcular) todas as colunas de build_all_features e aloca o bloco.
+    Com `columns`, só o subgrafo necessário para essas colunas (ver FeatureBlock.prune).
+    Com `compact`, flags e campos de calendário já são alocados como int8.
+    bars_per_year / regime_window / regime_quantiles: ver build_all_features.
+
+    Retorna:
+    --------
+    FeatureBlock pronto para compute().
+    """
+    exog_price_cols = exog_price_cols or []
+    windows = windows or [5, 22, 63]
+    lags = lags or [1, 5, 22]
+
+    if volume_col and volume_col in exog_price_cols:
+        raise ValueError(
+            f"volume_col '{volume_col}' não pode estar em exog_price_cols. "
+            "Volume não é preço → não deve ter log-retorno."
+        )
+
+    has_volume = volume_col is not None and volume_col in df.columns
+    keep = (df[volume_col] > 0).to_numpy() if has_volume else None
+    index = df.index if keep is None else df.index[keep]
+
+    passthrough = {}
+    for col in df.columns:
+        if has_volume and col == volume_col:
+            continue
+        values = df[col].to_numpy()
+        passthrough[col] = values if keep is None else values[keep]
+
+    # 1. Log-retornos
+    price_cols = [target_price_col] + exog_price_cols
+    recipes = _logreturn_recipes(df, price_cols, target_price_col, keep)
+
+    # 2. Log-volume
+    if has_volume:
+        recipes.append(Recipe(('log_volume',), (volume_col,), np.float64,
+                              lambda block: np.log(df[volume_col].to_numpy()[keep])))
+
+    # 3. Lags (só em log-retornos e log-volume)
+    lag_cols = [f'{col}_logreturns' for col in exog_price_cols]
+    if has_volume:
+        lag_cols.append('log_volume')
+    recipes += _lag_recipes(lag_cols, lags)
+
+    # 4. Temporais
+    recipes += _temp_recipes(index, intraday=bars_per_year > BARS_PER_YEAR['1d'])
+
+    # 5. Volume features
+    if has_volume:
+        recipes += _volume_recipes('log_volume')
+
+    # 6. Vol features
+    logreturn_cols = _as_list([f'{col}_logreturns' for col in exog_price_cols],
+                              'As features não devem ser uma lista vazia')
+    recipes += _vol_recipes('log_return', logreturn_cols, windows,
+                            regime_window=regime_window or bars_per_year, regime_quantiles=regime_quantiles,
+                            bars_per_year=bars_per_year)
+
+    # 7. Correlações dinâmicas
+    recipes += _corr_recipes('log_return', logreturn_cols, windows)
+
+    # 8. MAs
+    recipes += _ma_recipes(['log_return'] + logreturn_cols, windows)
+
+    # 9. Regimes
+    if vix_col in df.columns:
+        recipes += _regime_recipes(vix_col)
+
+    # 10 Diffs
+    if econ_ind:
+        recipes += _diff_recipes(econ_ind, lags)
+
+    # 11 Events
+    if econ_ind and 'selic' in econ_ind:
+        recipes += _selic_event_recipes(lags)
+
+    # flags 0/1 e calendário (mês, dia da semana, trimestre) cabem em int8
+    dtype_map = {FLAG_DTYPE: np.int8, np.dtype(index.month.dtype): np.int8} if compact else None
+    block = FeatureBlock(index, passthrough, recipes, dtype_map)
+    return block if columns is None else block.prune(columns)
+
+
+def build_all_features_columnar(df: pd.DataFrame, columns: Optional[List[str]] = None,
+                                compact: bool = False, float32: bool = False,
+                                **kwargs) -> pd.DataFrame:
+    """
+    Versão colunar de build_all_features: cada estágio escreve em um bloco
+    NumPy pré-alocado e o DataFrame é montado uma única vez no final.
+    Mesmas colunas, mesma ordem e mesmos valores do modo pandas.
+
+    columns: calcula só essas colunas e o que elas exigem. O dropna passa a
+    olhar só para elas, então podem sobrar mais linhas que no build completo.
+    compact / float32: ver src/utils/memory.py::compact_dtypes.
+    """
+    with stage('plan', df):
+        block = plan_features(df, columns=columns, compact=compact, **kwargs)
+    with stage('compute', df):
+        block.compute()
+    with stage('to_frame') as s:
+        frame = s.out(block.to_frame(columns=columns))
+    return compact_dtypes(frame, float32=float32) if compact else frame
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from itertools import combinations
+from src.features.rolling import rolling_corr_pairs, rolling_quantile_flags
 
 def create_lags(df, tickers, lags):
     """
@@ -78,12 +79,14 @@ def create_logreturns(df,tickers):
             
     return df_copy
 
-def create_temp_features(df):
+def create_temp_features(df, intraday=False):
     """
     Parâmetros:
     ----------
     df: DataFrame
         DataFrame com os dados que vamos operar
+    intraday: bool
+        Acrescenta a hora do dia (minute_of_day e seno/cosseno do ciclo de 24h)
     
     Retorna:
     --------
@@ -98,6 +101,11 @@ def create_temp_features(df):
     df_copy['is_month_end'] = df_copy.index.is_month_end.astype(int)
     df_copy['month_sin'] = np.sin(2 * np.pi * df.index.month / 12)
     df_copy['month_cos'] = np.cos(2 * np.pi * df.index.month / 12)
+    if intraday:
+        minute = df.index.hour * 60 + df.index.minute
+        df_copy['minute_of_day'] = minute
+        df_copy['tod_sin'] = np.sin(2 * np.pi * minute / 1440)
+        df_copy['tod_cos'] = np.cos(2 * np.pi * minute / 1440)
     
     return df_copy
 
@@ -178,23 +186,40 @@ def create_dynamic_corr(df,feature_principal,features,windows):
             raise ValueError('As features não devem ser uma lista vazia')
         feat = features
     
-    # Correlações dinâmicas entre feature_principal e outras features
-    for f in feat:
-        for w in windows:
-            df_copy[f'corr_{ticker[0]}_{f}_{w}'] = df_copy[ticker[0]].rolling(w).corr(df_copy[f])
-    
-    # Correlações entre os ativos em features:
-    combinacoes = [list(x) for x in list(combinations(feat,2))]
-    
-    for comb in combinacoes:
-        for w in windows:
-            df_copy[f'corr_{comb[0]}_{comb[1]}_{w}'] = df_copy[comb[0]].rolling(w).corr(df_copy[comb[1]])
+    # Correlações dinâmicas entre feature_principal e outras features, e entre
+    # os ativos em features: todos os pares numa chamada do kernel vetorizado
+    # (mesmo resultado de rolling(w).corr, ver rolling_corr_pairs)
+    cols = [ticker[0]] + feat
+    pairs = [(0, j) for j in range(1, len(cols))]
+    pairs += list(combinations(range(1, len(cols)), 2))
+    corr = rolling_corr_pairs(df_copy[cols].to_numpy(dtype=float), pairs, windows)
+    new_cols = {}
+    for p, (i, j) in enumerate(pairs):
+        for k, w in enumerate(windows):
+            new_cols[f'corr_{cols[i]}_{cols[j]}_{w}'] = corr[:, p, k]
+
+    # Colunas já existentes são sobrescritas no lugar; as novas entram de uma vez (sem fragmentar)
+    for name in [c for c in new_cols if c in df_copy.columns]:
+        df_copy[name] = new_cols.pop(name)
+    df_copy = pd.concat([df_copy, pd.DataFrame(new_cols, index=df_copy.index)], axis=1)
     
     return df_copy
 
 
 
-def create_vol_features(df, feature_principal, features, windows):
+def create_vol_features(df, feature_principal, features, windows,
+                        regime_window=252, regime_quantiles=(0.25, 0.75), bars_per_year=252):
+    """
+    Volatilidades EWMA, razões, spreads, correlações de vol e regimes de vol.
+
+    regime_window: int
+        Janela (barras) dos percentis móveis dos regimes. 252 = 1 ano de dados
+        para definir o que é "alto/baixo"
+    regime_quantiles: tuple
+        (baixo, alto): percentis que definem *_low_vol_regime e *_high_vol_regime
+    bars_per_year: int
+        Fator de anualização das vols (252 no diário; ver BARS_PER_YEAR)
+    """
     df_copy = df.copy()
     
     # Normalizar feature_principal para lista
@@ -236,7 +261,7 @@ def create_vol_features(df, feature_principal, features, windows):
     # 1 Vol do ativo principal e exógenas
     for asset in all_columns:
         for w in windows:
-            df_copy[f'{asset}_vol_{w}'] = df[asset].ewm(span=w, min_periods=w).std() * np.sqrt(252)
+            df_copy[f'{asset}_vol_{w}'] = df[asset].ewm(span=w, min_periods=w).std() * np.sqrt(bars_per_year)
     
     # 2. Razões de vol (Regime Detection)
     if len(windows) >= 2:
@@ -265,19 +290,17 @@ def create_vol_features(df, feature_principal, features, windows):
             df_copy[f'vol_corr_{ticker[0]}_{f}_{vol_window}'] = (
                 df_copy[f'{ticker[0]}_vol_{vol_window}'].rolling(vol_window).corr(df_copy[f'{f}_vol_{vol_window}']))
     
-    # 5. Regimes de volatilidade (percentis fixos )
-    for asset in all_columns:
-        if len(windows) >= 1:
-            long_window = max(windows)
-            vol_column = f'{asset}_vol_{long_window}'
-            rolling_quantile_window = 252 # Usa 1 ano de dados para definir o que é "alto/baixo"
-            
-            # Percentis dinâmicos
-            vol_75th_rolling = df_copy[vol_column].rolling(window=rolling_quantile_window, min_periods=int(rolling_quantile_window*0.8)).quantile(0.75) # 0.8 indica que podemos executar o cálculo com 80% dos dados necessários
-            vol_25th_rolling = df_copy[vol_column].rolling(window=rolling_quantile_window, min_periods=int(rolling_quantile_window*0.8)).quantile(0.25)
-            
-            df_copy[f'{asset}_high_vol_regime'] = (df_copy[vol_column] > vol_75th_rolling).astype(int)
-            df_copy[f'{asset}_low_vol_regime'] = (df_copy[vol_column] < vol_25th_rolling).astype(int)
+    # 5. Regimes de volatilidade (percentis móveis)
+    # Os dois percentis de cada ativo saem de um único posto móvel (ver rolling_quantile_flags)
+    if len(windows) >= 1:
+        long_window = max(windows)
+        vol_columns = [f'{asset}_vol_{long_window}' for asset in all_columns]
+        flags = rolling_quantile_flags(df_copy[vol_columns].to_numpy(dtype=float), regime_window, regime_quantiles,
+                                       min_periods=int(regime_window*0.8)) # 0.8 indica que podemos executar o cálculo com 80% dos dados necessários
+
+        for j, asset in enumerate(all_columns):
+            df_copy[f'{asset}_high_vol_regime'] = flags[:, j, 0]
+            df_copy[f'{asset}_low_vol_regime'] = flags[:, j, 1]
             
             
     return df_copy       
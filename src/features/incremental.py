@@ -0,0 +1,408 @@
+import pandas as pd
+import numpy as np
+from itertools import combinations, islice
+from collections import deque
+from typing import List, Optional, Dict
+
+from src.constants import BARS_PER_YEAR
+from src.features.columnar import plan_features
+from src.features.rolling import SortedWindow
+
+
+class _EWMMean:
+    """Recursão de ewm(span).mean() do pandas (adjust=True, ignore_na=False)."""
+
+    def __init__(self, span, min_periods=0):
+        alpha = 2.0 / (span + 1.0)
+        self.old_wt_factor = 1.0 - alpha
+        self.min_periods = max(min_periods, 1)
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = x == x
+        self.nobs += is_obs
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_obs:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + x) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif is_obs:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else np.nan
+
+
+class _EWMStd:
+    """Recursão de ewm(span).std() do pandas (adjust=True, bias=False)."""
+
+    def __init__(self, span, min_periods=0):
+        alpha = 2.0 / (span + 1.0)
+        self.old_wt_factor = 1.0 - alpha
+        self.min_periods = max(min_periods, 1)
+        self.mean = np.nan
+        self.cov = 0.0
+        self.sum_wt = 1.0
+        self.sum_wt2 = 1.0
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        is_obs = x == x
+        self.nobs += is_obs
+        if self.mean == self.mean:
+            f = self.old_wt_factor
+            self.sum_wt *= f
+            self.sum_wt2 *= f * f
+            self.old_wt *= f
+            if is_obs:
+                old_mean = self.mean
+                if self.mean != x:
+                    self.mean = (self.old_wt * old_mean + x) / (self.old_wt + 1.0)
+                self.cov = ((self.old_wt * (self.cov + (old_mean - self.mean) ** 2))
+                            + ((x - self.mean) ** 2)) / (self.old_wt + 1.0)
+                self.sum_wt += 1.0
+                self.sum_wt2 += 1.0
+                self.old_wt += 1.0
+        elif is_obs:
+            self.mean = x
+
+        if self.nobs < self.min_periods:
+            return np.nan
+        numerator = self.sum_wt * self.sum_wt
+        denominator = numerator - self.sum_wt2
+        if denominator <= 0:
+            return np.nan
+        var = (numerator / denominator) * self.cov
+        return np.sqrt(var) if var > 0 else 0.0
+
+
+def _tail(buffer, w):
+    """Últimos w valores do buffer como array, ou None se faltarem dados/NaN."""
+    if len(buffer) < w:
+        return None
+    values = np.fromiter(islice(buffer, len(buffer) - w, None), dtype=float, count=w)
+    if np.isnan(values).any():
+        return None
+    return values
+
+
+def _lag(buffer, lag):
+    return buffer[-1 - lag] if len(buffer) > lag else np.nan
+
+
+def _rolling_corr(a, b, w):
+    x, y = _tail(a, w), _tail(b, w)
+    if x is None or y is None:
+        return np.nan
+    xm = x - x.mean()
+    ym = y - y.mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (xm @ ym) / np.sqrt((xm @ xm) * (ym @ ym))
+
+
+class IncrementalFeatureBuilder:
+    """
+    Versão incremental (uma barra por vez) de build_all_features.
+
+    O histórico é processado uma vez em fit(); depois cada update() recebe
+    uma barra nova e devolve a linha de features em O(janela), mantendo só
+    o estado necessário: médias/desvios EWM, buffers das janelas móveis,
+    janelas ordenadas dos quantis dos regimes e buffers de lags.
+
+    Parâmetros:
+    -----------
+    Os mesmos de build_all_features (exceto df).
+    """
+
+    def __init__(
+            self,
+            target_price_col: str,
+            exog_price_cols: Optional[List[str]] = None,
+            volume_col: Optional[str] = None,
+            vix_col: str = '^VIX',
+            econ_ind: Dict[str, int] = None,
+            windows: List[int] = None,
+            lags: List[int] = None,
+            bars_per_year: int = 252,
+            regime_window: Optional[int] = None,
+            regime_quantiles: tuple = (0.25, 0.75)
+    ):
+        self.params = dict(
+            target_price_col=target_price_col, exog_price_cols=exog_price_cols,
+            volume_col=volume_col, vix_col=vix_col, econ_ind=econ_ind,
+            windows=windows, lags=lags, bars_per_year=bars_per_year, regime_window=regime_window,
+            regime_quantiles=regime_quantiles
+        )
+        self.target_price_col = target_price_col
+        self.exog_price_cols = exog_price_cols or []
+        self.volume_col = volume_col
+        self.vix_col = vix_col
+        self.econ_vars = [] if not econ_ind else ([econ_ind] if isinstance(econ_ind, str) else list(econ_ind))
+        self.windows = windows or [5, 22, 63]
+        self.lags = lags or [1, 5, 22]
+        self.bars_per_year = bars_per_year
+        self.regime_window = regime_window or bars_per_year
+        self.regime_quantiles = regime_quantiles
+        self.intraday = bars_per_year > BARS_PER_YEAR['1d']
+
+        self.logreturn_cols = [f'{col}_logreturns' for col in self.exog_price_cols]
+        self.assets = ['log_return'] + self.logreturn_cols
+        self.columns = None
+
+    # ==== estado ====
+
+    def _need(self, name, n):
+        self._buffers_len[name] = max(self._buffers_len.get(name, 0), n)
+
+    def _push(self, name, value):
+        buffer = self._buffers.get(name)
+        if buffer is not None:
+            buffer.append(value)
+
+    def fit(self, df: pd.DataFrame) -> 'IncrementalFeatureBuilder':
+        """
+        Aquece o estado com o histórico completo (uma passada vetorizada).
+        """
+        block = plan_features(df, **self.params)
+        block.compute()
+        self.columns = block.columns()
+        self.passthrough_cols = list(block.passthrough)
+        self.has_volume = 'log_volume' in block
+        self.has_vix = self.vix_col in df.columns
+        max_lag = max(self.lags) + 1
+        long_window = max(self.windows)
+
+        self._buffers_len = {}
+        for col in self.logreturn_cols:
+            self._need(col, max_lag)
+        for col in self.assets:
+            self._need(col, long_window)
+            self._need(f'{col}_vol_{long_window}', long_window)
+        if self.has_volume:
+            self._need('log_volume', max_lag)
+            self._need('log_volume_diff_1', 21)
+        if self.has_vix:
+            self._need(self.vix_col, 2)
+        for var in self.econ_vars:
+            self._need(var, 2)
+            self._need(f'diff_1_{var}', max_lag)
+        if 'selic_event' in block:
+            self._need('selic_event', max_lag)
+
+        # diff_1_<var> não fica no bloco: é recalculada a partir da variável
+        scratch = {f'diff_1_{var}': block.series(var).diff(1).to_numpy() for var in self.econ_vars}
+        self._buffers = {}
+        for name, n in self._buffers_len.items():
+            values = scratch[name] if name in scratch else block[name]
+            self._buffers[name] = deque(np.asarray(values[-n:], dtype=float), maxlen=n)
+
+        # último preço bruto (os log-retornos usam a barra anterior, mesmo se filtrada por volume)
+        self._last_price = {col: df[col].iloc[-1] for col in [self.target_price_col] + self.exog_price_cols}
+
+        # Estados EWM: percorre o histórico uma vez
+        self._volume_ewm = {}
+        if self.has_volume:
+            log_volume = block['log_volume']
+            for w in [5, 21]:
+                state = _EWMMean(w)
+                for x in log_volume:
+                    state.update(x)
+                self._volume_ewm[w] = state
+
+        self._vol_ewm = {}
+        for asset in self.assets:
+            values = block[asset]
+            for w in self.windows:
+                state = _EWMStd(w, min_periods=w)
+                for x in values:
+                    state.update(x)
+                self._vol_ewm[(asset, w)] = state
+
+        # Janelas ordenadas para os regimes de volatilidade
+        self._regime_windows = {}
+        for asset in self.assets:
+            vol = block[f'{asset}_vol_{long_window}']
+            sw = SortedWindow(self.regime_window)
+            for x in vol[-self.regime_window:]:
+                sw.push(x)
+            self._regime_windows[asset] = sw
+
+        return self
+
+    # ==== atualização ====
+
+    def update(self, date, bar) -> Optional[pd.Series]:
+        """
+        Incorpora uma barra nova e devolve a linha de features correspondente.
+
+        Parâmetros:
+        -----------
+        date: Timestamp
+            Data da barra
+        bar: dict ou Series
+            Valores brutos da barra, com as mesmas colunas do df usado em fit()
+
+        Retorna:
+        --------
+        Series com as features (mesma ordem de colunas do build_all_features),
+        ou None se a barra for descartada pelo filtro de volume.
+        """
+        if self.columns is None:
+            raise ValueError('Chame fit() com o histórico antes de update().')
+
+        date = pd.Timestamp(date)
+        windows, lags = self.windows, self.lags
+        row = {}
+
+        # 1. Log-retornos (sobre a sequência bruta, antes do filtro de volume)
+        returns = {}
+        for col in [self.target_price_col] + self.exog_price_cols:
+            price = bar[col]
+            if pd.isnull(price) or price == 0:
+                raise ValueError(f'A coluna {col} apresenta zeros ou nulos.')
+            returns[col] = np.log(price / self._last_price[col])
+            self._last_price[col] = price
+
+        if self.has_volume and not bar[self.volume_col] > 0:
+            return None
+
+        for col in self.passthrough_cols:
+            row[col] = bar[col]
+            self._push(col, bar[col])
+
+        for col in [self.target_price_col] + self.exog_price_cols:
+            name = 'log_return' if col == self.target_price_col else f'{col}_logreturns'
+            row[name] = returns[col]
+            self._push(name, returns[col])
+
+        # 2. Log-volume
+        if self.has_volume:
+            row['log_volume'] = np.log(bar[self.volume_col])
+            self._push('log_volume', row['log_volume'])
+
+        # 3. Lags
+        lag_cols = self.logreturn_cols + (['log_volume'] if self.has_volume else [])
+        for col in lag_cols:
+            for lag in lags:
+                row[f'{col}_lag_{lag}'] = _lag(self._buffers[col], lag)
+
+        # 4. Temporais
+        row['month'] = date.month
+        row['weekday'] = date.weekday()
+        row['quarter'] = date.quarter
+        row['is_month_end'] = int(date.is_month_end)
+        row['month_sin'] = np.sin(2 * np.pi * date.month / 12)
+        row['month_cos'] = np.cos(2 * np.pi * date.month / 12)
+        if self.intraday:
+            minute = date.hour * 60 + date.minute
+            row['minute_of_day'] = minute
+            row['tod_sin'] = np.sin(2 * np.pi * minute / 1440)
+            row['tod_cos'] = np.cos(2 * np.pi * minute / 1440)
+
+        # 5. Volume features
+        if self.has_volume:
+            col = 'log_volume'
+            diff = row[col] - self._buffers[col][-2] if len(self._buffers[col]) > 1 else np.nan
+            row[f'{col}_diff_1'] = diff
+            self._push(f'{col}_diff_1', diff)
+            for w in [5, 21]:
+                row[f'{col}_ewm_{w}'] = self._volume_ewm[w].update(row[col])
+            for w in [5, 21]:
+                row[f'{col}_buzz_{w}'] = row[col] - row[f'{col}_ewm_{w}']
+            diffs = self._buffers[f'{col}_diff_1']
+            for w in [3, 5]:
+                values = _tail(diffs, w)
+                row[f'{col}_momentum_{w}'] = np.nan if values is None else values.sum()
+            for w in [5, 21]:
+                values = _tail(diffs, w)
+                row[f'{col}_volatility_{w}'] = np.nan if values is None else values.std(ddof=1)
+            row['volume_spike'] = int(row[f'{col}_buzz_21'] > np.log(2.0))
+
+        # 6. Vol features
+        target = 'log_return'
+        for asset in self.assets:
+            for w in windows:
+                name = f'{asset}_vol_{w}'
+                row[name] = self._vol_ewm[(asset, w)].update(row[asset]) * np.sqrt(self.bars_per_year)
+                self._push(name, row[name])
+
+        if len(windows) >= 2:
+            short_window, long_window = min(windows), max(windows)
+            for asset in self.assets:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    row[f'{asset}_vol_ratio_{short_window}_{long_window}'] = (
+                        np.float64(row[f'{asset}_vol_{short_window}']) / row[f'{asset}_vol_{long_window}'])
+
+        for f in self.logreturn_cols:
+            for w in windows:
+                row[f'vol_spread_{target}_{f}_{w}'] = row[f'{target}_vol_{w}'] - row[f'{f}_vol_{w}']
+
+        vol_window = max(windows)
+        for f in self.logreturn_cols:
+            row[f'vol_corr_{target}_{f}_{vol_window}'] = _rolling_corr(
+                self._buffers[f'{target}_vol_{vol_window}'], self._buffers[f'{f}_vol_{vol_window}'], vol_window)
+
+        min_periods = int(self.regime_window * 0.8)
+        low_q, high_q = self.regime_quantiles
+        for asset in self.assets:
+            vol = row[f'{asset}_vol_{vol_window}']
+            sw = self._regime_windows[asset]
+            sw.push(vol)
+            high, low = sw.quantiles([high_q, low_q], min_periods)
+            row[f'{asset}_high_vol_regime'] = int(vol > high)
+            row[f'{asset}_low_vol_regime'] = int(vol < low)
+
+        # 7. Correlações dinâmicas
+        pairs = [(target, f) for f in self.logreturn_cols] + list(combinations(self.logreturn_cols, 2))
+        for a, b in pairs:
+            for w in windows:
+                row[f'corr_{a}_{b}_{w}'] = _rolling_corr(self._buffers[a], self._buffers[b], w)
+
+        # 8. MAs
+        for col in self.assets:
+            for w in windows:
+                values = _tail(self._buffers[col], w)
+                row[f'{col}_ma_{w}'] = np.nan if values is None else values.mean()
+        for col in self.assets:
+            for w in windows:
+                row[f'{col}_above_ma_{w}'] = int(row[col] > row[f'{col}_ma_{w}'])
+        if len(windows) >= 2:
+            curta, longa = min(windows), max(windows)
+            for col in self.assets:
+                row[f'{col}_spread_ma_{curta}_{longa}'] = row[f'{col}_ma_{curta}'] - row[f'{col}_ma_{longa}']
+
+        # 9. Regimes
+        if self.has_vix:
+            vix = self._buffers[self.vix_col]
+            row['vix_regime_low'] = int(row[self.vix_col] < 15)
+            row['vix_regime_high'] = int(row[self.vix_col] > 25)
+            pct = vix[-1] / vix[-2] - 1 if len(vix) > 1 else np.nan
+            row['vix_spike'] = int(pct > 0.2)
+            row['vix_calm_down'] = int(row['VIX_logreturns'] < -0.15)
+
+        # 10 Diffs
+        for var in self.econ_vars:
+            values = self._buffers[var]
+            diff = values[-1] - values[-2] if len(values) > 1 else np.nan
+            self._push(f'diff_1_{var}', diff)
+            for lag in lags:
+                row[f'diff_1_{var}_lag_{lag}'] = _lag(self._buffers[f'diff_1_{var}'], lag)
+
+        # 11 Events
+        if 'selic_event' in self._buffers:
+            row['selic_event'] = int(self._buffers['diff_1_selic'][-1] != 0)
+            self._push('selic_event', row['selic_event'])
+            for lag in lags:
+                row[f'selic_event_lag_{lag}'] = _lag(self._buffers['selic_event'], lag)
+
+        return pd.Series([row[name] for name in self.columns], index=self.columns, name=date)
+
+    def update_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Aplica update() a cada barra de df e empilha as linhas retornadas.
+        """
+        rows = [self.update(date, bar) for date, bar in df.iterrows()]
+        rows = [row for row in rows if row is not None]
+        return pd.DataFrame(rows, columns=self.columns)
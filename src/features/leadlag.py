@@ -0,0 +1,146 @@
+import pandas as pd
+import numpy as np
+from scipy import stats
+from typing import List, Optional
+
+from src.features.stationarity import _pool_map
+
+
+def _columns(df, target, columns):
+    if columns is None:
+        columns = [c for c in df.select_dtypes('number').columns if c != target]
+    elif isinstance(columns, str):
+        columns = [columns]
+    data = df[[target] + list(columns)].dropna()
+    if len(data) < 3:
+        raise ValueError("Poucas linhas completas para a análise.")
+    return data[target].to_numpy(dtype=float), data[list(columns)].to_numpy(dtype=float), list(columns)
+
+
+def cross_correlation(df: pd.DataFrame, target: str = 'log_return', columns: Optional[List[str]] = None,
+                      max_lag: int = 22, adjusted: bool = True) -> pd.DataFrame:
+    '''
+    Correlação cruzada do alvo com todas as colunas de uma vez, via FFT.
+
+    corr(k) = corr(coluna_{t-k}, alvo_t): lag positivo = a coluna antecede
+    o alvo em k barras, negativo = o alvo antecede a coluna. Para k >= 0
+    equivale a statsmodels ccf(alvo, coluna)[k] e para k < 0 a
+    ccf(coluna, alvo)[-k]. Usa só as linhas sem NaN em nenhuma coluna.
+
+    Parâmetros:
+    -----------
+    columns: colunas a correlacionar (padrão: todas as numéricas menos target)
+    max_lag: maior defasagem, nos dois sentidos
+    adjusted: divide a soma de cada lag por n - |k| (como o ccf) em vez de n
+
+    Retorna:
+    --------
+    DataFrame indexado por lag (-max_lag..max_lag), uma coluna por feature.
+    '''
+    y, X, columns = _columns(df, target, columns)
+    n = len(y)
+    max_lag = min(max_lag, n - 1)
+
+    y = (y - y.mean()) / y.std()
+    std = X.std(axis=0)
+    std[std == 0] = np.nan  # colunas constantes viram NaN
+    X = (X - X.mean(axis=0)) / std
+
+    # r[k] = sum_t x_t * y_{t+k}: produto no domínio da frequência, com zero-padding
+    # para que os lags positivos e negativos não se sobreponham
+    nfft = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    fy = np.fft.rfft(y, nfft)
+    fx = np.fft.rfft(np.nan_to_num(X), nfft, axis=0)
+    r = np.fft.irfft(np.conj(fx) * fy[:, None], nfft, axis=0)
+
+    lags = np.arange(-max_lag, max_lag + 1)
+    out = r[lags % nfft]
+    out /= (n - np.abs(lags))[:, None] if adjusted else n
+    out[:, np.isnan(std)] = np.nan
+    return pd.DataFrame(out, index=pd.Index(lags, name='lag'), columns=columns)
+
+
+def _lagged(values, lag):
+    '''Colunas values_{t-1..t-lag} nas linhas lag..n-1 (eixo extra para lag no fim).'''
+    n = len(values)
+    return np.stack([values[lag - i:n - i] for i in range(1, lag + 1)], axis=-1)
+
+
+def _granger_lag(y, X, lag):
+    '''
+    Worker: teste F de Granger (ssr_ftest) de cada coluna de X sobre y com `lag` defasagens.
+
+    O modelo restrito (constante + lags de y) é o mesmo para todas as colunas:
+    projeta-se uma vez e, por Frisch-Waugh, o ganho de cada coluna sai de um
+    sistema lag × lag nos resíduos das defasagens dela.
+    '''
+    target = y[lag:]
+    Z = np.column_stack([np.ones(len(target)), _lagged(y, lag)])
+    Q, _ = np.linalg.qr(Z)
+    ry = target - Q @ (Q.T @ target)
+    ssr_r = ry @ ry
+
+    L = _lagged(X, lag)  # (nobs, colunas, lag)
+    nobs, p = L.shape[:2]
+    L = L.reshape(nobs, p * lag)
+    L = (L - Q @ (Q.T @ L)).reshape(nobs, p, lag)
+    XtX = np.einsum('npl,npm->plm', L, L)
+    Xty = np.einsum('npl,n->pl', L, ry)
+    gain = np.einsum('pl,pl->p', Xty, np.einsum('plm,pm->pl', np.linalg.pinv(XtX, hermitian=True), Xty))
+
+    df_denom = nobs - 2 * lag - 1
+    ssr_u = np.maximum(ssr_r - gain, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_stat = (ssr_r - ssr_u) / ssr_u * df_denom / lag
+    return f_stat, stats.f.sf(f_stat, lag, df_denom), df_denom
+
+
+def granger_screen(df: pd.DataFrame, target: str = 'log_return', columns: Optional[List[str]] = None,
+                   max_lag: int = 5, alpha: float = 0.05, best_only: bool = False,
+                   max_workers: Optional[int] = None) -> pd.DataFrame:
+    '''
+    Causalidade de Granger de cada coluna sobre o alvo, para lags 1..max_lag.
+
+    Mesmo teste F que grangercausalitytests(df[[target, coluna]], max_lag)
+    reporta em 'ssr_ftest', mas todas as colunas de uma ordem de lag saem de
+    uma única rodada vetorizada; as ordens de lag rodam em paralelo (um
+    processo por ordem). Usa só as linhas sem NaN em nenhuma coluna.
+
+    Parâmetros:
+    -----------
+    columns: colunas candidatas (padrão: todas as numéricas menos target)
+    alpha: nível para as colunas significant (p) e significant_fdr (q)
+    best_only: mantém só o lag de menor p-valor de cada coluna
+    max_workers: processos (1 = serial)
+
+    Retorna:
+    --------
+    DataFrame ordenado por p-valor: feature, lag, f_stat, p_value, df_num,
+    df_denom, q_value (Benjamini-Hochberg sobre todos os testes),
+    significant e significant_fdr.
+    '''
+    y, X, columns = _columns(df, target, columns)
+    if len(y) <= 3 * max_lag + 1:
+        raise ValueError("Série curta demais para max_lag.")
+
+    jobs = [(y, X, lag) for lag in range(1, max_lag + 1)]
+    parts = []
+    for lag, (f_stat, p_value, df_denom) in zip(range(1, max_lag + 1), _pool_map(_granger_lag, jobs, max_workers)):
+        parts.append(pd.DataFrame({'feature': columns, 'lag': lag, 'f_stat': f_stat, 'p_value': p_value,
+                                   'df_num': lag, 'df_denom': df_denom}))
+    out = pd.concat(parts, ignore_index=True)
+
+    # Benjamini-Hochberg: q_(i) = min_{j >= i} p_(j) * m / j
+    p = out['p_value'].fillna(1.0).to_numpy()
+    order = np.argsort(p)
+    q = p[order] * len(p) / np.arange(1, len(p) + 1)
+    q = np.minimum.accumulate(q[::-1])[::-1]
+    out['q_value'] = np.empty(len(p))
+    out.loc[order, 'q_value'] = np.minimum(q, 1.0)
+    out['significant'] = out['p_value'] <= alpha
+    out['significant_fdr'] = out['q_value'] <= alpha
+
+    out = out.sort_values(['p_value', 'lag'], kind='stable', na_position='last')
+    if best_only:
+        out = out.drop_duplicates('feature')
+    return out.reset_index(drop=True)
@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+from bisect import insort, bisect_left
+from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SortedWindow:
+    """
+    Janela deslizante de tamanho fixo que mantém os valores válidos ordenados.
+
+    Inserção e remoção usam busca binária (bisect), então cada passo custa
+    O(log w) comparações + um deslocamento de memória O(w) em C. NaN ocupa
+    posição na janela mas não entra na ordenação, como no rolling do pandas.
+
+    Parâmetros:
+    -----------
+    window: int
+        Tamanho da janela (número de barras)
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._fifo = deque()
+        self._sorted = []
+
+    def __len__(self):
+        """Número de observações válidas (não-NaN) na janela."""
+        return len(self._sorted)
+
+    def push(self, x):
+        self._fifo.append(x)
+        if x == x:
+            insort(self._sorted, x)
+        if len(self._fifo) > self.window:
+            old = self._fifo.popleft()
+            if old == old:
+                del self._sorted[bisect_left(self._sorted, old)]
+
+    def quantile(self, q, min_periods=None):
+        """
+        Quantil com interpolação linear, mesma fórmula do rolling().quantile do pandas.
+        """
+        return self.quantiles([q], min_periods)[0]
+
+    def quantiles(self, qs, min_periods=None):
+        """Vários quantis da mesma janela de uma vez (a ordenação é compartilhada)."""
+        nobs = len(self._sorted)
+        min_periods = self.window if min_periods is None else min_periods
+        if nobs == 0 or nobs < min_periods:
+            return [np.nan] * len(qs)
+
+        out = []
+        for q in qs:
+            idx_with_fraction = q * (nobs - 1)
+            idx = int(idx_with_fraction)
+            vlow = self._sorted[idx]
+            if idx == idx_with_fraction:
+                out.append(vlow)
+            else:
+                vhigh = self._sorted[idx + 1]
+                out.append(vlow + (vhigh - vlow) * (idx_with_fraction - idx))
+        return out
+
+
+def rolling_quantile_flags(X, window, quantiles=(0.25, 0.75), min_periods=None):
+    """
+    Flags x_t < quantil baixo e x_t > quantil alto da janela móvel que termina
+    em t, para todas as colunas de X, sem calcular os quantis.
+
+    Como x_t está na própria janela, a comparação só depende da posição de x_t
+    entre os valores ordenados: com r = quantos valores da janela são menores
+    que x_t, nobs válidos e pos = q * (nobs - 1), x_t > quantil(q) equivale a
+    r > pos (e, do mesmo jeito, x_t < quantil(q) a "quantos são <= x_t" < pos).
+    Os postos saem de um único rolling().rank() do pandas por coluna (skiplist
+    em C, O(n log w)), que serve para quantos níveis forem pedidos. Só quando
+    x_t é vizinho imediato do quantil na ordenação a interpolação linear pode
+    arredondar para o próprio x_t; essas linhas (~1/window delas) são
+    conferidas com o quantil calculado na janela. O resultado é igual, bit a
+    bit, a x > x.rolling(window, min_periods).quantile(q) (e <) do pandas.
+
+    Parâmetros:
+    -----------
+    X: array (n,) ou (n, k)
+        Séries em colunas
+    window: int
+        Tamanho da janela
+    quantiles: tuple
+        (baixo, alto): níveis dos quantis
+    min_periods: int
+        Mínimo de observações válidas na janela (padrão: window)
+
+    Retorna:
+    --------
+    array int (n, k, 2): [..., 0] = acima do quantil alto, [..., 1] = abaixo do baixo.
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, None]
+    n, k = X.shape
+    low_q, high_q = quantiles
+    min_periods = window if min_periods is None else min_periods
+    out = np.zeros((n, k, 2), dtype=int)
+
+    for j in range(k):
+        x = pd.Series(X[:, j])
+        roll = x.rolling(window, min_periods=min_periods)
+        below = roll.rank(method='min').to_numpy() - 1  # valores < x_t
+        valid = x.dropna().to_numpy()
+        if len(np.unique(valid)) < len(valid):
+            upto = roll.rank(method='max').to_numpy()   # valores <= x_t (há empates)
+        else:
+            upto = below + 1
+        nobs = x.rolling(window, min_periods=0).count().to_numpy()
+        ok = ~np.isnan(below)
+
+        for col, q in ((0, high_q), (1, low_q)):
+            # mesma aritmética do pandas para a posição do quantil
+            pos = q * (nobs - 1)
+            idx = np.floor(pos)
+            exact = pos == idx
+            if col == 0:
+                # com interpolação (pos fracionário) o quantil fica entre os vizinhos idx e idx+1
+                flag = np.where(exact, below > idx, below > idx + 1)
+                check = ~exact & (below == idx + 1)
+            else:
+                flag = upto <= idx
+                check = ~exact & (upto == idx + 1)
+            flag &= ok
+            check &= ok
+
+            rows = np.flatnonzero(check)
+            if len(rows):
+                padded = np.concatenate([np.full(window - 1, np.nan), X[:, j]])
+                windows = np.sort(sliding_window_view(padded, window)[rows], axis=1)
+                i = idx[rows].astype(int)
+                vlow = windows[np.arange(len(rows)), i]
+                vhigh = windows[np.arange(len(rows)), i + 1]
+                quantile = vlow + (vhigh - vlow) * (pos[rows] - i)
+                flag[rows] = X[rows, j] > quantile if col == 0 else X[rows, j] < quantile
+            out[:, j, col] = flag
+    return out
+
+
+def rolling_corr_pairs(X, pairs, windows, chunk_size=1_000_000):
+    """
+    Correlações móveis de vários pares e janelas, vetorizadas sobre todos os pares.
+
+    Para cada janela w as linhas são divididas em blocos de w barras: a janela
+    que termina na posição i do bloco b é o sufixo do bloco b-1 (a partir de
+    i+1) mais o prefixo do bloco b (até i). As somas de x, x² e x*y saem de
+    cumsums dentro de cada bloco, sem subtrair prefixos longos, então o erro
+    de arredondamento não cresce com o tamanho da série. Cada par de blocos é
+    centrado na própria média, o que mantém o cancelamento de
+    sum(x²) - sum(x)²/w no nível da variação local. NaN se propaga pelos
+    cumsums exatamente para as janelas que o contêm (min_periods=w, como em
+    a.rolling(w).corr(b) do pandas).
+
+    Parâmetros:
+    -----------
+    X: array (n, k)
+        Séries em colunas
+    pairs: list
+        Lista de pares (i, j) de índices de colunas de X
+    windows: list
+        Janelas das correlações
+    chunk_size: int
+        Elementos por bloco de trabalho (limita a memória temporária)
+
+    Retorna:
+    --------
+    array (n, len(pairs), len(windows)) com as correlações.
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim == 1:
+        X = X[:, None]
+    n, k = X.shape
+    I = np.array([i for i, _ in pairs], dtype=int)
+    J = np.array([j for _, j in pairs], dtype=int)
+    out = np.full((n, len(pairs), len(windows)), np.nan)
+
+    def window_sums(a, w):
+        # a: (blocos, 2w, q) = bloco anterior + bloco atual
+        s = np.cumsum(a[:, w:], axis=1)
+        suffix = np.cumsum(a[:, w - 1:0:-1], axis=1)
+        s[:, :-1] += suffix[:, ::-1]
+        return s
+
+    for m, w in enumerate(windows):
+        if w > n or w < 2:
+            continue
+        # w linhas de NaN na frente: o bloco 0 é o "anterior" do primeiro bloco de dados
+        nb = -(-n // w)
+        Xp = np.full(((nb + 1) * w, k), np.nan)
+        Xp[w:w + n] = X
+        Xp = Xp.reshape(nb + 1, w, k)
+        valid = ~np.isnan(Xp)
+        block_sum = np.where(valid, Xp, 0.0).sum(axis=1)
+        block_count = valid.sum(axis=1)
+        centers = (block_sum[:-1] + block_sum[1:]) / np.maximum(block_count[:-1] + block_count[1:], 1)
+
+        step = max(1, chunk_size // ((len(pairs) + 2 * k) * 2 * w))
+        for b0 in range(1, nb + 1, step):
+            b1 = min(b0 + step, nb + 1)
+            z = np.concatenate([Xp[b0 - 1:b1 - 1], Xp[b0:b1]], axis=1)
+            z -= centers[b0 - 1:b1 - 1, None, :]
+            sx = window_sums(z, w)
+            sxx = window_sums(z * z, w)
+            cov = window_sums(np.take(z, I, axis=2) * np.take(z, J, axis=2), w)
+
+            var = sxx - sx * sx / w
+            with np.errstate(invalid='ignore', divide='ignore'):
+                inv_std = 1.0 / np.sqrt(var)
+            # janelas com variância numericamente nula ficam NaN, como no pandas
+            inv_std[~(var > 1e-12 * sxx)] = np.nan
+            cov -= np.take(sx, I, axis=2) * np.take(sx / w, J, axis=2)
+            cov *= np.take(inv_std, I, axis=2)
+            cov *= np.take(inv_std, J, axis=2)
+
+            rows = slice((b0 - 1) * w, min((b1 - 1) * w, n))
+            out[rows, :, m] = cov.reshape(-1, len(pairs))[:rows.stop - rows.start]
+    return out
@@ -1,5 +1,8 @@
 from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.adfvalues import mackinnonp
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import numpy as np
 
 def adf_series(df, names):
     '''
@@ -38,4 +41,234 @@ def adf_series(df, names):
 
     return dt
 
-    
\ No newline at end of file
+    
+
+# ==== Lote e janelas móveis ====
+# Valores críticos do KPSS (nível) de Kwiatkowski et al. (1992)
+_KPSS_CRIT = np.array([0.347, 0.463, 0.574, 0.739])
+_KPSS_PVALS = np.array([0.10, 0.05, 0.025, 0.01])
+
+
+def _adf_one(name, values, kwargs):
+    stat, p, used_lag, nobs = adfuller(values, **kwargs)[:4]
+    return {'series': name, 'statistic': stat, 'p_value': p, 'lags': used_lag, 'nobs': nobs}
+
+
+def _pool_map(func, jobs, max_workers):
+    if max_workers == 1 or len(jobs) <= 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def adf_batch(df, names=None, alpha=0.05, max_workers=None, **adf_kwargs):
+    '''
+    ADF (adfuller, lag automático por padrão) em várias colunas, em paralelo.
+
+    df: DataFrame com as séries
+    names: colunas a testar (padrão: todas as numéricas)
+    adf_kwargs: repassados ao adfuller (ex: regression='ct', autolag='BIC')
+
+    output: DataFrame tidy, uma linha por série (series, statistic, p_value,
+        lags, nobs, stationary)
+    '''
+    if names is None:
+        names = list(df.select_dtypes('number').columns)
+    elif isinstance(names, str):
+        names = [names]
+
+    jobs = [(name, df[name].dropna().to_numpy(dtype=float), adf_kwargs) for name in names]
+    out = pd.DataFrame(_pool_map(_adf_one, jobs, max_workers))
+    out['stationary'] = out['p_value'] <= alpha
+    return out
+
+
+def _block_pairs(values, window, max_elements=4_000_000):
+    '''
+    Percorre as janelas de `window` linhas (eixo 0) em pares de blocos
+    consecutivos de `window` linhas: toda janela que começa no bloco k cabe
+    no par (k, k+1). Cada par chega como uma linha de um array
+    (pares, 2*window, ...), em lotes de até max_elements valores, para que as
+    somas acumuladas sejam locais ao par (sem a perda de precisão das somas
+    acumuladas globais numa série longa). O fim é completado com zeros; as
+    janelas que tocam nesse enchimento são descartadas por _join_pairs.
+    '''
+    n = len(values)
+    nb = n // window + 1
+    pad = np.zeros((nb * window - n,) + values.shape[1:])
+    blocks = np.concatenate([values, pad]).reshape((nb, window) + values.shape[1:])
+    per = max(1, max_elements // (2 * blocks[0].size))
+    for k0 in range(0, nb - 1, per):
+        k1 = min(k0 + per, nb - 1)
+        yield np.concatenate([blocks[k0:k1], blocks[k0 + 1:k1 + 1]], axis=1)
+
+
+def _join_pairs(parts, n, window):
+    '''Junta os resultados (pares, window, ...) por janela e corta nas n - window + 1 janelas reais.'''
+    out = np.concatenate(parts)
+    return out.reshape((-1,) + out.shape[2:])[:n - window + 1]
+
+
+def _cumsum0(x):
+    '''Soma acumulada ao longo do eixo 1 com um zero na frente: s[:, i] = x[:, :i].sum(1).'''
+    return np.concatenate([np.zeros_like(x[:, :1]), np.cumsum(x, axis=1)], axis=1)
+
+
+def _sums(cum, length, window, offset=0):
+    '''Somas de `length` linhas a partir de offset + 0..window-1, a partir de _cumsum0.'''
+    return cum[:, offset + length:offset + length + window] - cum[:, offset:offset + window]
+
+
+def rolling_adf(y, window, lags=1, regression='c'):
+    '''
+    ADF com lag fixo em todas as janelas móveis de `window` observações.
+
+    A regressão dy_t = [1, t,] y_{t-1}, dy_{t-1..t-lags} é montada uma vez
+    para a série inteira; X'X e X'dy de cada janela saem de somas acumuladas
+    dos produtos externos das linhas, sem refazer a regressão por janela.
+    As somas são locais a pares de blocos (ver _block_pairs) e, com
+    constante, os regressores de cada par são centrados na média do par
+    (a estatística não muda), então a precisão não cai com o tamanho da série.
+    Equivale a adfuller(janela, maxlag=lags, autolag=None, regression=...).
+
+    Retorna:
+    --------
+    DataFrame indexado pelo fim da janela com statistic, p_value, nobs.
+    '''
+    if regression not in ('n', 'c', 'ct'):
+        raise ValueError("regression deve ser 'n', 'c' ou 'ct'.")
+    index = y.index if isinstance(y, pd.Series) else pd.RangeIndex(len(y))
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    m = window - 1 - lags  # observações por regressão
+    if n < window or m <= lags + 3:
+        raise ValueError("Série curta demais para a janela/lags pedidos.")
+
+    dy = np.diff(y)
+    rows = np.arange(lags, n - 1)  # posições em dy com todos os lags disponíveis
+    cols = [y[rows]]  # y_{t-1} (dy[u] = y[u+1] - y[u])
+    cols += [dy[rows - i] for i in range(1, lags + 1)]
+    if regression == 'ct':
+        cols.append(rows / len(rows))
+    # última coluna: dy_t (alvo); a constante entra à parte, sem ser centrada
+    W = np.column_stack(cols + [dy[rows]])
+    k = W.shape[1] - 1 + (regression != 'n')
+
+    parts = []
+    for pair in _block_pairs(W, m):
+        if regression != 'n':
+            # com constante, deslocar regressores e alvo só muda o intercepto
+            pair = pair - pair[:, :m].mean(axis=1, keepdims=True)
+            pair = np.concatenate([pair[..., :-1], np.ones(pair.shape[:2] + (1,)), pair[..., -1:]], axis=2)
+        G = _sums(_cumsum0(pair[..., :, None] * pair[..., None, :]), m, m)
+        parts.append(G)
+    G = _join_pairs(parts, len(rows), m)
+    ZZ, Zy, yy = G[:, :k, :k], G[:, :k, k], G[:, k, k]
+
+    beta = np.linalg.solve(ZZ, Zy[:, :, None])[:, :, 0]
+    ssr = yy - np.einsum('ij,ij->i', beta, Zy)
+    sigma2 = ssr / (m - k)
+    e0 = np.zeros((1, k, 1))
+    e0[0, 0, 0] = 1.0
+    inv00 = np.linalg.solve(ZZ, np.broadcast_to(e0, (len(ZZ), k, 1)))[:, 0, 0]
+    stat = beta[:, 0] / np.sqrt(sigma2 * inv00)
+    p_value = np.array([mackinnonp(s, regression=regression, N=1) for s in stat])
+
+    return pd.DataFrame({'statistic': stat, 'p_value': p_value, 'nobs': m},
+                        index=index[window - 1:])
+
+
+def rolling_kpss(y, window, lags=None):
+    '''
+    KPSS (nível) em todas as janelas móveis de `window` observações.
+
+    Soma dos quadrados das somas parciais e variância de longo prazo
+    (Newey-West com `lags`) vêm de somas acumuladas de y, y², dos produtos
+    y_t·y_{t-l} e das somas parciais, sem recalcular resíduos por janela.
+    As somas são locais a pares de blocos (ver _block_pairs), com y centrado
+    na média de cada par (a estatística é invariante a deslocamento).
+    Equivale a kpss(janela, regression='c', nlags=lags).
+    lags: padrão int(12 * (window / 100) ** 0.25)
+
+    Retorna:
+    --------
+    DataFrame indexado pelo fim da janela com statistic, p_value, lags.
+    '''
+    index = y.index if isinstance(y, pd.Series) else pd.RangeIndex(len(y))
+    y = np.asarray(y, dtype=float)
+    n, T = len(y), window
+    if lags is None:
+        lags = int(12 * (window / 100) ** 0.25)
+    if n < window or lags >= window:
+        raise ValueError("Série curta demais para a janela/lags pedidos.")
+
+    # posições locais ao par: a janela que começa em s cobre s .. s+T-1
+    s = np.arange(T)
+    i = np.arange(1, 2 * T + 1, dtype=float)
+    sum_j = T * (T + 1) / 2
+    sum_j2 = T * (T + 1) * (2 * T + 1) / 6
+    parts = []
+    for Y in _block_pairs(y, T):
+        Y = Y - Y[:, :T].mean(axis=1, keepdims=True)
+        C = _cumsum0(Y)                          # C[:, k] = Y[:, :k].sum()
+        mean = (C[:, T:2 * T] - C[:, :T]) / T
+
+        # S_j = (C[s+j] - C[s]) - j*mean, j = 1..T  =>  soma de S_j² por janela
+        # com somas acumuladas de C, C² e i·C sobre C[:, 1:] (i = posição no par)
+        Cs = C[:, 1:]
+        sum_C = _sums(_cumsum0(Cs), T, T)
+        sum_C2 = _sums(_cumsum0(Cs ** 2), T, T)
+        sum_iC = _sums(_cumsum0(i * Cs), T, T)
+        C0 = C[:, :T]
+        sum_jP = (sum_iC - s * sum_C) - C0 * sum_j  # j = i - s
+        sum_P2 = sum_C2 - 2 * C0 * sum_C + T * C0 ** 2
+        eta = (sum_P2 - 2 * mean * sum_jP + mean ** 2 * sum_j2) / T ** 2
+
+        # variância de longo prazo: autocovariâncias dos resíduos y - mean da janela
+        s_hat = _sums(_cumsum0(Y ** 2), T, T) - T * mean ** 2
+        for l in range(1, lags + 1):
+            cross = _sums(_cumsum0(Y[:, l:] * Y[:, :-l]), T - l, T)
+            head = C[:, T - l:2 * T - l] - C[:, :T]     # y_s .. y_{s+T-1-l}
+            tail = C[:, T:2 * T] - C[:, l:T + l]        # y_{s+l} .. y_{s+T-1}
+            gamma = cross - mean * (head + tail) + (T - l) * mean ** 2
+            s_hat += 2 * (1 - l / (lags + 1)) * gamma
+        parts.append(eta / (s_hat / T))
+    stat = _join_pairs(parts, n, T)
+    p_value = np.interp(stat, _KPSS_CRIT, _KPSS_PVALS)
+
+    return pd.DataFrame({'statistic': stat, 'p_value': p_value, 'lags': lags},
+                        index=index[window - 1:])
+
+
+def _rolling_one(name, series, window, step, adf_lags, kpss_lags, regression, alpha):
+    adf = rolling_adf(series, window, adf_lags, regression).iloc[::step]
+    adf = adf.assign(test='adf', lags=adf_lags, stationary=adf['p_value'] <= alpha)
+    kpss_ = rolling_kpss(series, window, kpss_lags).iloc[::step]
+    kpss_ = kpss_.assign(test='kpss', nobs=window, stationary=kpss_['p_value'] > alpha)
+    out = pd.concat([adf, kpss_])
+    out.index.name = 'end'
+    return out.reset_index().assign(series=name)
+
+
+def rolling_stationarity(df, names=None, window=252, step=1, adf_lags=1, kpss_lags=None,
+                         regression='c', alpha=0.05, max_workers=None):
+    '''
+    ADF e KPSS em janelas móveis para várias colunas (colunas em paralelo).
+
+    step: reporta uma janela a cada `step` (o cálculo é feito para todas)
+    alpha: nível de significância. ADF estacionária se p <= alpha (rejeita
+        raiz unitária); KPSS estacionária se p > alpha (não rejeita)
+
+    output: DataFrame tidy com series, test, end (fim da janela), statistic,
+        p_value, lags, nobs e stationary
+    '''
+    if names is None:
+        names = list(df.select_dtypes('number').columns)
+    elif isinstance(names, str):
+        names = [names]
+
+    jobs = [(name, df[name].dropna(), window, step, adf_lags, kpss_lags, regression, alpha)
+            for name in names]
+    out = pd.concat(_pool_map(_rolling_one, jobs, max_workers), ignore_index=True)
+    return out[['series', 'test', 'end', 'statistic', 'p_value', 'lags', 'nobs', 'stationary']]
@@ -0,0 +1,191 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.constants import BARS_PER_YEAR
+from src.data.panel import Panel
+from src.data.storage import save_frame
+from src.data.store import MarketDataStore
+from src.features.build import build_all_features
+
+
+def bars_per_day(interval: str) -> float:
+    if interval not in BARS_PER_YEAR:
+        raise ValueError(f"Intervalo '{interval}' sem BARS_PER_YEAR; informe bars_per_year.")
+    return BARS_PER_YEAR[interval] / BARS_PER_YEAR['1d']
+
+
+def windows_in_bars(days: List[int], interval: str) -> List[int]:
+    '''Converte janelas em pregões (ex: [5, 22, 63]) para barras do intervalo.'''
+    return [max(1, int(round(d * bars_per_day(interval)))) for d in days]
+
+
+def warmup_bars(windows: List[int], lags: List[int], regime_window: int, tol: float = 1e-16) -> int:
+    '''
+    Barras de histórico que cada bloco precisa carregar do anterior.
+
+    As janelas finitas (médias, correlações, quantis, lags) precisam só das
+    últimas barras; as EWM dependem de todo o passado, mas o peso das barras
+    além de n fica abaixo de (1 - alpha)^n. Com n tal que isso seja < tol, o
+    truncamento some no arredondamento de float64. A cadeia mais longa é
+    log-retorno -> vol EWM -> percentil móvel dos regimes.
+    '''
+    alpha = 2 / (max(list(windows) + [21]) + 1)  # span mais longo (vols e EWM do volume)
+    ewm = int(np.ceil(np.log(tol) / np.log(1 - alpha)))
+    return ewm + regime_window + max(windows) + max(lags) + 2
+
+
+class _Cursor:
+    '''Barras de um ticker lidas em blocos sob demanda, guardando só o necessário para o as-of.'''
+
+    def __init__(self, chunks: Iterator[pd.DataFrame]):
+        self._chunks = chunks
+        self.buffer = None
+        self.done = False
+
+    def until(self, ts) -> pd.DataFrame:
+        '''Lê blocos até cobrir ts (ou acabar o arquivo).'''
+        while not self.done and (self.buffer is None or self.buffer.index[-1] < ts):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.done = True
+            else:
+                self.buffer = chunk if self.buffer is None else pd.concat([self.buffer, chunk])
+        return self.buffer
+
+    def release(self, ts):
+        '''Descarta barras anteriores a ts, mantendo a última <= ts (base do ffill).'''
+        if self.buffer is not None and len(self.buffer):
+            pos = max(self.buffer.index.searchsorted(ts, side='right') - 1, 0)
+            self.buffer = self.buffer.iloc[pos:]
+
+
+def iter_aligned(
+    target_ticker: str,
+    target_name: str,
+    aux_tickers: Dict[str, str],
+    start,
+    end,
+    interval: str = '1m',
+    dir: str = 'data/raw',
+    format: str = 'npy',
+    chunk_rows: int = 100_000,
+    how: str = 'inner'
+) -> Iterator[pd.DataFrame]:
+    """
+    Versão em blocos do alinhamento de build_main_dataset (sem BCB): lê as
+    barras já no store (download_data com o mesmo interval) e devolve o
+    dataset principal em blocos de até chunk_rows barras do ativo principal.
+    Cada exógena é lida sob demanda e só a barra anterior ao bloco fica em
+    memória (base do 'ffill').
+    """
+    if how not in ('inner', 'ffill'):
+        raise ValueError(f"how='{how}' inválido. Use 'inner' ou 'ffill'.")
+    store = MarketDataStore(dir, format=format)
+    fields = {ticker: ['Adj Close'] for ticker in aux_tickers}
+    fields[target_ticker] = ['Adj Close', 'Volume']
+    target = store.iter_chunks(target_ticker, start, end, interval, chunk_rows, fields[target_ticker])
+    cursors = {t: _Cursor(store.iter_chunks(t, start, end, interval, chunk_rows, ['Adj Close']))
+               for t in aux_tickers}
+    columns = {target_name: (target_ticker, 'Adj Close'), 'Volume': (target_ticker, 'Volume')}
+    columns.update({name: (ticker, 'Adj Close') for ticker, name in aux_tickers.items()})
+
+    for chunk in target:
+        chunk = chunk[chunk['Volume'] > 0]
+        if not len(chunk):
+            continue
+        last = chunk.index[-1]
+        frames = {target_ticker: chunk}
+        for ticker, cursor in cursors.items():
+            frames[ticker] = cursor.until(last)
+            if frames[ticker] is None:
+                raise ValueError(f"Sem barras de {ticker} ({interval}) no store.")
+        panel = Panel.from_frames(frames, fields=fields, calendar=chunk.index, how=how)
+        df = panel.to_frame(columns).dropna()
+        for cursor in cursors.values():
+            cursor.release(last)
+        df.index.name = 'Date'
+        if len(df):
+            yield df
+
+
+def stream_features(
+    chunks: Iterator[pd.DataFrame],
+    target_price_col: str,
+    out_base: str,
+    interval: str = '1m',
+    bars_per_year: Optional[int] = None,
+    out_format: str = 'npy',
+    tol: float = 1e-16,
+    **feature_kwargs
+) -> pd.DataFrame:
+    """
+    build_all_features em blocos, com memória constante.
+
+    Cada bloco do dataset principal (ex: de iter_aligned) é processado junto
+    com o histórico que as janelas precisam (warmup_bars linhas válidas do
+    fim do bloco anterior, mais a barra anterior a elas para o log-retorno).
+    As linhas do bloco saem iguais às do build_all_features no histórico
+    inteiro: janelas finitas são exatas e as EWM truncadas diferem menos que
+    tol (relativo). Cada bloco de features é gravado em
+    {out_base}_part{k:05d} assim que fica pronto.
+
+    Parâmetros:
+    -----------
+    interval: intervalo das barras; define bars_per_year (anualização das
+        vols e janela padrão dos regimes) se este não for informado
+    feature_kwargs: argumentos de build_all_features (exog_price_cols,
+        volume_col, windows, lags, regime_window, ...). windows/lags são em
+        barras; windows_in_bars converte janelas em pregões
+
+    Retorna:
+    --------
+    DataFrame por bloco: linhas lidas, linhas de histórico carregadas, linhas
+    gravadas, intervalo de datas, tempo e caminho.
+    """
+    bars_per_year = bars_per_year or BARS_PER_YEAR.get(interval)
+    if bars_per_year is None:
+        raise ValueError(f"Intervalo '{interval}' sem BARS_PER_YEAR; informe bars_per_year.")
+    feature_kwargs.pop('engine', None)
+    windows = feature_kwargs.get('windows') or [5, 22, 63]
+    lags = feature_kwargs.get('lags') or [1, 5, 22]
+    regime_window = feature_kwargs.get('regime_window') or bars_per_year
+    need = warmup_bars(windows, lags, regime_window, tol)
+    volume_col = feature_kwargs.get('volume_col')
+    vix_col = feature_kwargs.get('vix_col', '^VIX')
+
+    os.makedirs(os.path.dirname(out_base) or '.', exist_ok=True)
+    records = []
+    carry, last = None, None
+    for k, chunk in enumerate(chunks):
+        t0 = time.perf_counter()
+        raw = chunk if carry is None else pd.concat([carry, chunk])
+        if vix_col in raw.columns:
+            raw = raw.assign(VIX_logreturns=np.log(raw[vix_col] / raw[vix_col].shift(1)))
+
+        features = build_all_features(raw, target_price_col, engine='columnar',
+                                      bars_per_year=bars_per_year, **feature_kwargs)
+        index_name = features.columns[0]
+        if last is not None:
+            features = features[features[index_name] > last]
+
+        record = {'chunk': k, 'rows_in': len(chunk), 'carry_rows': 0 if carry is None else len(carry),
+                  'rows_out': len(features), 'start': None, 'end': None, 'path': None}
+        if len(features):
+            last = features[index_name].iloc[-1]
+            record.update(start=features[index_name].iloc[0], end=last,
+                          path=save_frame(features.set_index(index_name), f"{out_base}_part{k:05d}", out_format))
+
+        # histórico para o próximo bloco: as últimas `need` barras que passam no filtro
+        # de volume e a barra bruta anterior à primeira delas
+        valid = np.flatnonzero(raw[volume_col].to_numpy() > 0) if volume_col in raw.columns else np.arange(len(raw))
+        first = valid[-need] - 1 if len(valid) > need else 0
+        carry = raw.iloc[max(first, 0):].drop(columns='VIX_logreturns', errors='ignore')
+
+        record['seconds'] = time.perf_counter() - t0
+        records.append(record)
+        print(f"Bloco {k}: {record['rows_out']} linhas" + (f" -> {record['path']}" if record['path'] else ''))
+
+    return pd.DataFrame(records)
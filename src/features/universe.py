@@ -0,0 +1,166 @@
+import pandas as pd
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional
+
+from src.data.download import download_data
+from src.data.bcb import load_bcb_series, align_bcb
+from src.data.panel import Panel
+from src.data.storage import save_frame
+from src.features.columnar import plan_features
+
+# coluna de preço fictícia do bloco compartilhado: as receitas que dependem
+# dela são descartadas, então o valor nunca chega à saída
+_PLACEHOLDER = '__alvo__'
+
+
+def _shared_features(exog: pd.DataFrame, feature_kwargs: dict) -> Dict[str, np.ndarray]:
+    '''
+    Features que só dependem de exógenas/calendário/indicadores, calculadas
+    uma vez no calendário comum das exógenas (união dos pregões de todos os tickers).
+    '''
+    kwargs = dict(feature_kwargs, volume_col=None)
+    kwargs.pop('columns', None)
+    df = exog.assign(**{_PLACEHOLDER: 1.0})
+    block = plan_features(df, target_price_col=_PLACEHOLDER, **kwargs)
+    recipes = block.independent_of([_PLACEHOLDER])
+    for recipe in recipes:
+        block.write(recipe, recipe.func(block))
+    return {col: block[col] for r in recipes for col in r.outputs}
+
+
+def _target_frame(data: pd.DataFrame, target_name: str, exog: pd.DataFrame) -> pd.DataFrame:
+    '''Dataset de um alvo: preço/volume do alvo nas datas em que as exógenas já alinhadas existem.'''
+    data = data[data['Volume'] > 0]
+    pos = exog.index.get_indexer(data.index)
+    on_calendar = pos >= 0
+    df = pd.DataFrame({
+        target_name: data['Adj Close'].to_numpy(dtype=float)[on_calendar],
+        'Volume': data['Volume'].to_numpy(dtype=float)[on_calendar],
+    }, index=data.index[on_calendar])
+    df = pd.concat([df, exog.iloc[pos[on_calendar]].set_axis(df.index)], axis=1)
+    df = df.dropna()
+    df.index.name = 'Date'
+    return df
+
+
+def _build_target(target_name, df, precomputed, feature_kwargs, base, format):
+    '''Worker: features de um alvo reaproveitando as colunas de exógenas já calculadas.'''
+    t0 = time.perf_counter()
+    block = plan_features(df, target_price_col=target_name, **feature_kwargs)
+    block.compute(precomputed=precomputed)
+    features = block.to_frame().set_index(df.index.name)
+    file_path = save_frame(features, base, format)
+    return {'rows': features.shape[0], 'columns': features.shape[1],
+            'path': file_path, 'seconds': time.perf_counter() - t0}
+
+
+def build_universe(
+    targets: Dict[str, str],  # ex: {'PETR4.SA': 'petr4', 'VALE3.SA': 'vale3'}
+    aux_tickers: Dict[str, str],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    dir: str = 'data/raw',
+    indicadores_bcb: Optional[Dict[str, int]] = None,
+    format: str = 'csv',
+    out_dir: str = 'data/processed/universe',
+    feature_kwargs: Optional[dict] = None,
+    how: str = 'inner',
+    max_workers: Optional[int] = None,
+    download_workers: int = 4,
+    source=None,
+    bcb_source=None
+) -> pd.DataFrame:
+    """
+    build_main_dataset + build_all_features para vários alvos de uma vez.
+
+    O que é comum a todos os alvos é feito uma vez só: download das
+    exógenas, alinhamento delas num calendário comum (Panel), séries do BCB
+    e as features que só dependem de exógenas/calendário/indicadores. Estas
+    são calculadas no calendário comum das exógenas e recortadas nas datas de
+    cada alvo: numa data em que o alvo não negociou, os retornos, lags e
+    janelas das exógenas seguem contando as barras delas (num build_all_features
+    só do alvo elas pulariam essa data). As features de cada alvo rodam num
+    pool de processos e cada dataset é salvo em {out_dir}/{nome}_features
+    assim que fica pronto.
+
+    Parâmetros:
+    -----------
+    targets: dict
+        {ticker: nome da coluna de preço}
+    feature_kwargs: dict
+        Argumentos de build_all_features exceto target_price_col. Padrão:
+        exog_price_cols = nomes das exógenas, volume_col = 'Volume' e
+        econ_ind = nomes dos indicadores do BCB
+    how: alinhamento das exógenas ('inner' ou 'ffill'; ver src/data/panel.py)
+    max_workers: processos do pool (None = número de CPUs)
+
+    Retorna:
+    --------
+    DataFrame por alvo com status, linhas, colunas, colunas compartilhadas,
+    tempo e caminho salvo (ou erro).
+    """
+    if how not in ('inner', 'ffill'):
+        raise ValueError(f"how='{how}' inválido. Use 'inner' ou 'ffill'.")
+
+    feature_kwargs = dict(feature_kwargs or {})
+    feature_kwargs.setdefault('exog_price_cols', list(aux_tickers.values()))
+    feature_kwargs.setdefault('volume_col', 'Volume')
+    feature_kwargs.setdefault('econ_ind', list(indicadores_bcb or []))
+
+    # 1. Download único de alvos + exógenas
+    data_dict = download_data(list(targets) + list(aux_tickers), start, end, dir=dir,
+                              format=format, source=source, max_workers=download_workers)
+
+    # 2. Exógenas (e BCB) alinhadas uma vez no calendário de todos os tickers
+    frames = {t: data_dict[t] for t in aux_tickers if t in data_dict}
+    missing = [t for t in aux_tickers if t not in frames]
+    if missing:
+        raise ValueError(f"Exógenas sem dados: {missing}")
+    calendar = np.unique(np.concatenate([data.index.to_numpy() for data in data_dict.values()]))
+    panel = Panel.from_frames(frames, fields=['Adj Close'], calendar=calendar, how=how)
+    exog = panel.to_frame({name: (ticker, 'Adj Close') for ticker, name in aux_tickers.items()})
+    if indicadores_bcb:
+        series = load_bcb_series(indicadores_bcb, start, end, dir=os.path.join(dir, 'bcb'),
+                                 source=bcb_source, format=format)
+        exog = exog.join(align_bcb(exog.index, series), how='left')
+
+    # 3. Features de exógenas uma vez, no calendário comum
+    try:
+        shared = _shared_features(exog, feature_kwargs)
+    except Exception as e:
+        raise ValueError(f"Erro nas features das exógenas: {type(e).__name__}: {e}") from e
+
+    # 4. Datasets por alvo, com as colunas compartilhadas recortadas nas datas do alvo
+    os.makedirs(out_dir, exist_ok=True)
+    records, jobs = {}, {}
+    for ticker, name in targets.items():
+        records[name] = {'ticker': ticker, 'status': None, 'rows': 0, 'columns': 0,
+                         'shared_columns': 0, 'seconds': 0.0, 'path': None, 'error': None}
+        if ticker not in data_dict:
+            records[name].update(status='error', error='sem dados')
+            continue
+        df = _target_frame(data_dict[ticker], name, exog)
+        pos = exog.index.get_indexer(df.index)
+        records[name]['shared_columns'] = len(shared)
+        jobs[name] = (df, {col: values[pos] for col, values in shared.items()})
+
+    # 5. Features por alvo em paralelo, salvando conforme terminam
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_build_target, name, df, precomputed, feature_kwargs,
+                            os.path.join(out_dir, f"{name}_features"), format): name
+            for name, (df, precomputed) in jobs.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                records[name].update(status='ok', **future.result())
+                print(f"{name}: {records[name]['rows']} linhas salvas em {records[name]['path']}")
+            except Exception as e:
+                print(f"Erro em {name}: {e}")
+                records[name].update(status='error', error=f"{type(e).__name__}: {e}")
+
+    return pd.DataFrame.from_dict(records, orient='index')
@@ -0,0 +1,143 @@
+import pandas as pd
+import numpy as np
+import time
+import warnings
+from typing import List, Optional, Tuple
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from src.constants import PMDARIMA_AUTO, ARIMAX_ORDER, REFIT_EVERY, TRAIN_SIZE
+
+
+def select_order(y: np.ndarray, X: Optional[np.ndarray] = None, auto: bool = PMDARIMA_AUTO) -> Tuple[int, int, int]:
+    '''
+    Ordem (p, d, q) do ARIMAX: auto_arima do pmdarima se auto=True,
+    senão ARIMAX_ORDER de src/constants.py.
+    '''
+    if not auto:
+        return tuple(ARIMAX_ORDER)
+    import pmdarima as pm
+
+    model = pm.auto_arima(y, X=X, seasonal=False, suppress_warnings=True, error_action='ignore')
+    return tuple(model.order)
+
+
+def _fit(y, X, order, start_params=None):
+    model = SARIMAX(y, exog=X, order=order)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # avisos de convergência a cada reajuste
+        return model.fit(start_params=start_params, disp=False)
+
+
+class WalkForwardARIMAX:
+    """
+    Previsão walk-forward um passo à frente com ARIMAX (SARIMAX do statsmodels).
+
+    A cada passo o modelo prevê y_t com as exógenas de t - feature_lag (colunas
+    derivadas do próprio alvo em t não vazam para a previsão) e, depois de ver y_t,
+    o filtro de Kalman é estendido só com a nova observação (results.extend),
+    mantendo os parâmetros. Reajuste completo (todos os dados até t, partindo
+    dos parâmetros anteriores) só a cada `refit_every` passos.
+
+    Parâmetros:
+    -----------
+    order: tuple
+        (p, d, q). Padrão: select_order no treino (PMDARIMA_AUTO / ARIMAX_ORDER)
+    refit_every: int
+        Passos entre reajustes completos. 1 = reajusta todo dia (mais lento)
+    train_size: float
+        Fração inicial usada no primeiro ajuste
+    order_search: OrderSearch
+        Se informado (e order=None), a ordem é rebuscada a cada reajuste,
+        partindo da vencedora anterior (ver src/models/order_search.py).
+        run() recomeça a busca (reset) e fecha o pool dela ao terminar
+    feature_lag: int
+        Defasagem aplicada às exógenas (como em HybridForecaster)
+    """
+
+    def __init__(self, order: Optional[Tuple[int, int, int]] = None,
+                 refit_every: int = REFIT_EVERY, train_size: float = TRAIN_SIZE,
+                 order_search=None, feature_lag: int = 1):
+        if refit_every < 1:
+            raise ValueError("refit_every deve ser >= 1.")
+        if feature_lag < 1:
+            raise ValueError("feature_lag deve ser >= 1 (exógenas de t vazam o alvo de t).")
+        self.order = order
+        self.refit_every = refit_every
+        self.train_size = train_size
+        self.order_search = order_search if order is None else None
+        self.feature_lag = feature_lag
+        self.results = None
+
+    def run(self, df: pd.DataFrame, target: str = 'log_return',
+            exog_cols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Roda o walk-forward no trecho de teste de df (saída de build_all_features).
+
+        exog_cols: regressores, sempre defasados em feature_lag barras. Padrão:
+            as colunas '*_logreturns' (como arimax_cols do HybridForecaster);
+            [] = ARIMA sem exógenas. Com todas as colunas numéricas o modelo
+            fica não identificável (médias móveis, lags e flags colineares)
+
+        Retorna:
+        --------
+        DataFrame do trecho de teste com y_true, y_pred e refit (True nos passos
+        com reajuste). Em .attrs: order, fit_seconds e update_seconds.
+        """
+        if exog_cols is None:
+            exog_cols = [c for c in df.columns if c.endswith('_logreturns') and c != target]
+        k = self.feature_lag
+        y = df[target].to_numpy(dtype=float)[k:]
+        X = df[exog_cols].to_numpy(dtype=float)[:len(df) - k] if exog_cols else None
+        index = df.index[k:]
+        n_train = int(len(y) * self.train_size)
+        if n_train < 1 or n_train >= len(y):
+            raise ValueError("train_size deixa treino ou teste vazio.")
+
+        if self.order_search is None:
+            return self._run(y, X, index, n_train)
+        self.order_search.reset()
+        try:
+            return self._run(y, X, index, n_train)
+        finally:
+            self.order_search.close()
+
+    def _run(self, y, X, index, n_train):
+        def exog(a, b):
+            return None if X is None else X[a:b]
+
+        if self.order_search is not None:
+            order = self.order_search.search(y[:n_train], exog(0, n_train))
+        else:
+            order = self.order or select_order(y[:n_train], exog(0, n_train))
+        fit_seconds = update_seconds = 0.0
+
+        t0 = time.perf_counter()
+        results = _fit(y[:n_train], exog(0, n_train), order)
+        fit_seconds += time.perf_counter() - t0
+
+        n_test = len(y) - n_train
+        y_pred = np.empty(n_test)
+        refit = np.zeros(n_test, dtype=bool)
+        for i, t in enumerate(range(n_train, len(y))):
+            y_pred[i] = results.forecast(steps=1, exog=exog(t, t + 1))[0]
+
+            t0 = time.perf_counter()
+            if (i + 1) % self.refit_every == 0:
+                start_params = results.params
+                if self.order_search is not None:
+                    new_order = self.order_search.search(y[:t + 1], exog(0, t + 1))
+                    if new_order != order:
+                        order, start_params = new_order, None
+                results = _fit(y[:t + 1], exog(0, t + 1), order, start_params=start_params)
+                fit_seconds += time.perf_counter() - t0
+                refit[i] = True
+            else:
+                # só filtra a nova observação, parâmetros fixos
+                results = results.extend(y[t:t + 1], exog=exog(t, t + 1))
+                update_seconds += time.perf_counter() - t0
+
+        self.order = order
+        self.results = results
+        out = pd.DataFrame({'y_true': y[n_train:], 'y_pred': y_pred, 'refit': refit},
+                           index=index[n_train:])
+        out.attrs.update(order=order, fit_seconds=fit_seconds, update_seconds=update_seconds)
+        return out
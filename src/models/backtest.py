@@ -0,0 +1,177 @@
+import pandas as pd
+import numpy as np
+from itertools import product
+from typing import Dict, List, Optional, Sequence
+
+from src.constants import B3_COSTS
+
+SIZINGS = ('sign', 'long_only', 'linear', 'vol_target')
+
+
+def _sizes(forecast, returns, sizing, bars_per_year, target_vol, max_leverage, min_periods):
+    '''
+    Posição "cheia" de cada regra (antes do limiar), uma coluna por regra.
+
+    A previsão da barra t é feita no fechamento de t-1, então pode ser usada
+    inteira na barra t; o retorno realizado só entra defasado (vol_target).
+    '''
+    sign = np.sign(forecast)
+    cols = []
+    for rule in sizing:
+        if rule == 'sign':
+            cols.append(sign)
+        elif rule == 'long_only':
+            cols.append((forecast > 0).astype(float))
+        elif rule == 'linear':
+            # previsão em desvios-padrão das previsões até aqui, limitada a ±max_leverage
+            scale = pd.Series(forecast).expanding(min_periods).std().to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cols.append(np.nan_to_num(np.clip(forecast / scale, -max_leverage, max_leverage)))
+        elif rule == 'vol_target':
+            vol = pd.Series(returns).ewm(span=min_periods, min_periods=min_periods).std().shift(1)
+            vol = vol.to_numpy() * np.sqrt(bars_per_year)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cols.append(np.nan_to_num(sign * np.minimum(target_vol / vol, max_leverage)))
+        else:
+            raise ValueError(f"sizing '{rule}' inválido. Use um de {SIZINGS}.")
+    return np.column_stack(cols)
+
+
+def _regime_masks(df, index, regimes):
+    '''
+    Máscara "pode operar" por filtro de regime: None = sempre, 'col' =
+    só com col == 1, '~col' = só com col == 0. O regime é o do fechamento
+    anterior (conhecido quando a posição é montada).
+    '''
+    masks = []
+    for regime in regimes:
+        if regime is None:
+            masks.append(np.ones(len(index), dtype=bool))
+            continue
+        if df is None:
+            raise ValueError("Filtros de regime exigem o DataFrame de features em regimes_df.")
+        col = regime.lstrip('~')
+        if col not in df.columns:
+            raise ValueError(f"Coluna de regime '{col}' não encontrada.")
+        active = df[col].reindex(index).shift(1).fillna(0).to_numpy() > 0
+        masks.append(~active if regime.startswith('~') else active)
+    return np.column_stack(masks)
+
+
+def backtest_grid(
+    forecast: pd.Series,
+    returns: pd.Series,
+    thresholds: Sequence[float] = (0.0,),
+    sizing: Sequence[str] = ('sign',),
+    costs: Optional[List[Dict[str, float]]] = None,
+    regimes: Sequence[Optional[str]] = (None,),
+    regimes_df: Optional[pd.DataFrame] = None,
+    bars_per_year: int = 252,
+    risk_free: float = 0.0,
+    target_vol: float = 0.15,
+    max_leverage: float = 1.0,
+    min_periods: int = 21,
+    curves: bool = False
+) -> pd.DataFrame:
+    """
+    Backtest de todas as combinações (limiar × regra de posição × custos ×
+    filtro de regime) numa única passada vetorizada.
+
+    As posições de todas as configurações formam uma matriz (barras ×
+    configurações); giro, custos, retornos, curva de capital e drawdown são
+    operações sobre essa matriz inteira, sem laço por configuração.
+
+    A previsão de forecast[t] é a do log_return da barra t (feita em t-1),
+    como sai de HybridForecaster.predict / WalkForwardARIMAX. A posição da
+    barra t é a regra de sizing aplicada onde |forecast[t]| > limiar (e o
+    regime permite), zero fora disso.
+
+    Parâmetros:
+    -----------
+    forecast, returns: Series
+        Previsões e log-retornos realizados, mesmo índice (é usada a interseção)
+    thresholds: limiares sobre |previsão|
+    sizing: regras de posição
+        'sign' (±1), 'long_only' (1 ou 0), 'linear' (previsão / desvio das
+        previsões até t, limitada a ±max_leverage), 'vol_target' (±target_vol
+        / vol anualizada EWM dos retornos até t-1, limitada a max_leverage)
+    costs: lista de dicts com fee_bps, brokerage_bps, slippage_bps (por lado,
+        sobre o valor negociado) e borrow_rate (ao ano, sobre a posição
+        vendida). Padrão: [B3_COSTS]
+    regimes: filtros de regime (None, 'col' ou '~col'), ex:
+        [None, 'vix_regime_high', '~log_return_high_vol_regime']
+    regimes_df: DataFrame (ex: saída de build_all_features indexada por data)
+        com as colunas de regime
+    bars_per_year: barras por ano para anualizar (252 = diário)
+    risk_free: taxa livre de risco ao ano, descontada no Sharpe
+    curves: guarda as curvas de capital em .attrs['equity']
+
+    Retorna:
+    --------
+    DataFrame com uma linha por configuração: parâmetros, total_return,
+    ann_return, ann_vol, sharpe, max_drawdown, turnover (anual), exposure,
+    hit_rate e n_trades. Ordenado por sharpe.
+    """
+    costs = [dict(B3_COSTS)] if costs is None else [dict(B3_COSTS, **c) for c in costs]
+    index = forecast.index.intersection(returns.index)
+    f = forecast.loc[index].to_numpy(dtype=float)
+    r = returns.loc[index].to_numpy(dtype=float)
+    if np.isnan(f).any() or np.isnan(r).any():
+        raise ValueError("forecast e returns não podem ter NaN no período comum.")
+    T = len(index)
+    if T < 2:
+        raise ValueError("Período comum curto demais para o backtest.")
+
+    thresholds = np.asarray(thresholds, dtype=float)
+    sizes = _sizes(f, r, list(sizing), bars_per_year, target_vol, max_leverage, min_periods)  # (T, S)
+    masks = _regime_masks(regimes_df, index, list(regimes))                                   # (T, R)
+    trade = np.abs(f)[:, None] > thresholds[None, :]                                           # (T, L)
+
+    # posições: (T, L, S, R) -> (T, L*S*R)
+    P = (trade[:, :, None, None] * sizes[:, None, :, None] * masks[:, None, None, :])
+    P = P.reshape(T, -1)
+
+    dP = np.abs(np.diff(P, axis=0, prepend=0.0))
+    gross = P * np.expm1(r)[:, None]
+    per_side = np.array([(c['fee_bps'] + c['brokerage_bps'] + c['slippage_bps']) / 1e4 for c in costs])
+    borrow = np.array([c['borrow_rate'] / bars_per_year for c in costs])
+    # custos: (T, C, M) com M configurações de custo
+    cost = dP[:, :, None] * per_side + np.maximum(-P, 0)[:, :, None] * borrow
+    net = (gross[:, :, None] - cost).reshape(T, -1)
+
+    equity = np.cumprod(1 + net, axis=0)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=0)
+    drawdown = equity / peak - 1
+
+    years = T / bars_per_year
+    excess = net - risk_free / bars_per_year
+    std = net.std(axis=0, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, excess.mean(axis=0) / std * np.sqrt(bars_per_year), np.nan)
+    total = equity[-1] - 1
+    ann_return = np.sign(equity[-1]) * np.abs(equity[-1]) ** (1 / years) - 1
+
+    # métricas que não dependem do custo: calculadas em (T, C) e repetidas por M
+    M = len(costs)
+    turnover = np.repeat(dP.sum(axis=0) / years, M)
+    exposure = np.repeat(np.abs(P).mean(axis=0), M)
+    n_trades = np.repeat((dP > 0).sum(axis=0), M)
+    active = P != 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit = np.repeat((active & (gross > 0)).sum(axis=0) / active.sum(axis=0), M)
+
+    params = list(product(thresholds, sizing, regimes, range(M)))
+    report = pd.DataFrame({
+        'threshold': [p[0] for p in params],
+        'sizing': [p[1] for p in params],
+        'regime': [p[2] or 'all' for p in params],
+        'costs': [p[3] for p in params],
+        'total_return': total, 'ann_return': ann_return,
+        'ann_vol': std * np.sqrt(bars_per_year), 'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=0), 'turnover': turnover,
+        'exposure': exposure, 'hit_rate': hit, 'n_trades': n_trades,
+    })
+    report.attrs['costs'] = costs
+    if curves:
+        report.attrs['equity'] = pd.DataFrame(equity, index=index)
+    return report.sort_values('sharpe', ascending=False, na_position='last')
@@ -0,0 +1,226 @@
+import pandas as pd
+import numpy as np
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from xgboost import XGBRegressor
+from src.constants import XGB_PARAMS, TRAIN_SIZE
+from src.models.arimax import select_order
+
+
+def time_series_folds(n: int, n_folds: int = 5, train_size: float = TRAIN_SIZE) -> List[Tuple[int, int, int]]:
+    '''
+    Folds de janela expansiva: o trecho final (1 - train_size) é dividido em
+    n_folds blocos contíguos; cada fold treina em tudo antes do seu bloco.
+
+    Retorna:
+    --------
+    Lista de (fim_treino, início_teste, fim_teste) em posições.
+    '''
+    start = int(n * train_size)
+    if start < 1 or start >= n:
+        raise ValueError("train_size deixa treino ou teste vazio.")
+    edges = np.linspace(start, n, n_folds + 1).astype(int)
+    return [(int(a), int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _fit_arimax(y, X, order, start_params=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return SARIMAX(y, exog=X, order=order).fit(start_params=start_params, disp=False)
+
+
+def _fit_fold(paths, arimax_idx, order, xgb_params, fold):
+    '''
+    Worker: ajusta ARIMAX + XGBoost nos resíduos para um fold.
+    A matriz de features é aberta por memory-map (somente leitura, sem cópia por fold).
+    '''
+    X = np.load(paths['X'], mmap_mode='r')
+    y = np.load(paths['y'], mmap_mode='r')
+    train_end, test_start, test_end = fold
+
+    y_train, y_test = np.asarray(y[:train_end]), np.asarray(y[test_start:test_end])
+    Xa = X[:, arimax_idx] if len(arimax_idx) else None
+    arimax = _fit_arimax(y_train, None if Xa is None else Xa[:train_end], order)
+
+    # previsões um passo à frente no teste com os parâmetros do treino
+    test = arimax.extend(y_test, exog=None if Xa is None else Xa[test_start:test_end])
+    arimax_pred = np.asarray(test.fittedvalues)
+
+    xgb = XGBRegressor(**xgb_params)
+    xgb.fit(X[:train_end], np.asarray(arimax.resid))
+    hybrid_pred = arimax_pred + xgb.predict(X[test_start:test_end])
+    return arimax_pred, hybrid_pred
+
+
+class HybridForecaster:
+    """
+    Híbrido ARIMAX + XGBoost: o ARIMAX modela log_return com poucas exógenas
+    e o XGBoost aprende os resíduos do ARIMAX a partir da matriz de features.
+
+    As features de t-1 explicam o retorno de t (feature_lag=1), para que
+    colunas derivadas do próprio log_return de t não vazem para a previsão.
+
+    Parâmetros:
+    -----------
+    order: tuple
+        (p, d, q) do ARIMAX. Padrão: select_order no treino do primeiro fold
+    xgb_params: dict
+        Parâmetros do XGBRegressor (padrão XGB_PARAMS)
+    arimax_cols: list
+        Exógenas do ARIMAX. Padrão: colunas *_logreturns
+    n_folds / train_size: ver time_series_folds
+    max_workers: processos para treinar os folds em paralelo (1 = serial)
+    feature_lag: defasagem aplicada às features
+    """
+
+    def __init__(self, order: Optional[Tuple[int, int, int]] = None,
+                 xgb_params: Optional[dict] = None,
+                 arimax_cols: Optional[List[str]] = None,
+                 n_folds: int = 5, train_size: float = TRAIN_SIZE,
+                 max_workers: Optional[int] = None, feature_lag: int = 1):
+        self.order = order
+        self.xgb_params = dict(xgb_params or XGB_PARAMS)
+        self.arimax_cols = arimax_cols
+        self.n_folds = n_folds
+        self.train_size = train_size
+        self.max_workers = max_workers
+        self.feature_lag = feature_lag
+        self.arimax = None
+        self.xgb = None
+
+    def _matrix(self, df, target, feature_cols):
+        '''Alvo e matriz de features (float64, ordem C) já defasada.'''
+        if feature_cols is None:
+            feature_cols = [c for c in df.select_dtypes('number').columns if c != target]
+        arimax_cols = self.arimax_cols
+        if arimax_cols is None:
+            arimax_cols = [c for c in feature_cols if c.endswith('_logreturns')]
+        missing = [c for c in arimax_cols if c not in feature_cols]
+        if missing:
+            raise ValueError(f"arimax_cols fora de feature_cols: {missing}")
+
+        k = self.feature_lag
+        X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=float)[:len(df) - k])
+        y = df[target].to_numpy(dtype=float)[k:]
+        index = df.index[k:]
+        arimax_idx = [feature_cols.index(c) for c in arimax_cols]
+        return y, X, index, feature_cols, arimax_idx
+
+    def cross_validate(self, df: pd.DataFrame, target: str = 'log_return',
+                       feature_cols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Treina e avalia os folds (em paralelo). A matriz de features é gravada
+        uma vez num .npy temporário que os processos abrem por memory-map.
+
+        Retorna:
+        --------
+        DataFrame das linhas de teste com fold, y_true, arimax e hybrid.
+        Em .attrs['metrics']: RMSE do ARIMAX e do híbrido por fold.
+        """
+        y, X, index, feature_cols, arimax_idx = self._matrix(df, target, feature_cols)
+        folds = time_series_folds(len(y), self.n_folds, self.train_size)
+        Xa = X[:, arimax_idx] if arimax_idx else None
+        order = self.order or select_order(y[:folds[0][0]], None if Xa is None else Xa[:folds[0][0]])
+
+        workers = self.max_workers or os.cpu_count() or 1
+        xgb_params = dict(self.xgb_params)
+        # evita processos × threads do XGBoost disputando os mesmos núcleos
+        xgb_params.setdefault('n_jobs', max(1, (os.cpu_count() or 1) // min(workers, len(folds))))
+
+        tmp = tempfile.mkdtemp(prefix='hybrid_')
+        try:
+            paths = {'X': os.path.join(tmp, 'X.npy'), 'y': os.path.join(tmp, 'y.npy')}
+            np.save(paths['X'], X)
+            np.save(paths['y'], y)
+            if workers == 1 or len(folds) == 1:
+                results = [_fit_fold(paths, arimax_idx, order, xgb_params, fold) for fold in folds]
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, len(folds))) as executor:
+                    futures = [executor.submit(_fit_fold, paths, arimax_idx, order, xgb_params, fold)
+                               for fold in folds]
+                    results = [future.result() for future in futures]
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        parts, metrics = [], []
+        for k, ((_, a, b), (arimax_pred, hybrid_pred)) in enumerate(zip(folds, results)):
+            part = pd.DataFrame({'fold': k, 'y_true': y[a:b], 'arimax': arimax_pred,
+                                 'hybrid': hybrid_pred}, index=index[a:b])
+            parts.append(part)
+            metrics.append({'fold': k, 'train_rows': a, 'test_rows': b - a,
+                            'rmse_arimax': np.sqrt(np.mean((part['y_true'] - part['arimax']) ** 2)),
+                            'rmse_hybrid': np.sqrt(np.mean((part['y_true'] - part['hybrid']) ** 2))})
+
+        self.order = order
+        out = pd.concat(parts)
+        out.attrs['metrics'] = pd.DataFrame(metrics).set_index('fold')
+        return out
+
+    def fit(self, df: pd.DataFrame, target: str = 'log_return',
+            feature_cols: Optional[List[str]] = None) -> 'HybridForecaster':
+        """Ajuste final em todo o df (para prever dados novos com predict)."""
+        y, X, index, feature_cols, arimax_idx = self._matrix(df, target, feature_cols)
+        Xa = X[:, arimax_idx] if arimax_idx else None
+        self.order = self.order or select_order(y, Xa)
+        self.arimax = _fit_arimax(y, Xa, self.order)
+        self.xgb = XGBRegressor(**self.xgb_params)
+        self.xgb.fit(X, np.asarray(self.arimax.resid))
+        # resíduos do híbrido no treino (para simulação; os do cross_validate são fora da amostra)
+        self.resid = pd.Series(np.asarray(self.arimax.resid) - self.xgb.predict(X), index=index, name='resid')
+        self.target = target
+        self.feature_cols = feature_cols
+        self.arimax_idx = arimax_idx
+        # últimas feature_lag linhas de features: explicam as primeiras linhas novas
+        self._last_features = df[feature_cols].to_numpy(dtype=float)[len(df) - self.feature_lag:]
+        return self
+
+    def predict(self, df_new: pd.DataFrame) -> pd.Series:
+        """
+        Previsões um passo à frente para as linhas de df_new, que devem vir logo
+        após as do fit; o filtro do ARIMAX é estendido com os valores observados.
+        """
+        if self.arimax is None:
+            raise ValueError("Chame fit antes de predict.")
+        X_new = df_new[self.feature_cols].to_numpy(dtype=float)
+        X_new = np.vstack([self._last_features, X_new])[:len(df_new)]
+        Xa = X_new[:, self.arimax_idx] if self.arimax_idx else None
+        extended = self.arimax.extend(df_new[self.target].to_numpy(dtype=float), exog=Xa)
+        pred = np.asarray(extended.fittedvalues) + self.xgb.predict(X_new)
+        return pd.Series(pred, index=df_new.index, name='hybrid')
+
+    # ==== uso online (uma barra por vez) ====
+
+    def forecast_next(self) -> float:
+        """
+        Previsão do próximo retorno com o estado atual (após fit ou o último
+        observe), sem precisar de dados novos.
+        """
+        if self.arimax is None:
+            raise ValueError("Chame fit antes de forecast_next.")
+        if self.feature_lag < 1:
+            raise ValueError("forecast_next exige feature_lag >= 1.")
+        x = self._last_features[:1]
+        Xa = x[:, self.arimax_idx] if self.arimax_idx else None
+        return float(np.asarray(self.arimax.forecast(1, exog=Xa))[0] + self.xgb.predict(x)[0])
+
+    def observe(self, y: float, features) -> 'HybridForecaster':
+        """
+        Incorpora a barra recém-fechada: y (alvo observado) e a linha de
+        features da barra (array ou Series com feature_cols). O filtro do
+        ARIMAX é estendido em uma observação, sem reestimar parâmetros.
+        """
+        if self.arimax is None:
+            raise ValueError("Chame fit antes de observe.")
+        if isinstance(features, pd.Series):
+            features = features[self.feature_cols]
+        row = np.asarray(features, dtype=float).reshape(1, -1)
+        x = self._last_features[:1]
+        Xa = x[:, self.arimax_idx] if self.arimax_idx else None
+        self.arimax = self.arimax.extend(np.array([y], dtype=float), exog=Xa)
+        self._last_features = np.vstack([self._last_features[1:], row])
+        return self
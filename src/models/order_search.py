@@ -0,0 +1,216 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+import hashlib
+import warnings
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+
+def _score(y, X, order, criterion):
+    '''Worker: ajusta um candidato e devolve (critério, segundos). Falha => inf.'''
+    t0 = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            results = SARIMAX(y, exog=X, order=order).fit(disp=False)
+        value = getattr(results, criterion)
+        if not np.isfinite(value):
+            value = np.inf
+    except Exception:
+        value = np.inf
+    return value, time.perf_counter() - t0
+
+
+class OrderSearch:
+    """
+    Busca de ordem (p, d, q) por AIC/BIC para janelas walk-forward.
+
+    A primeira janela avalia a grade inteira; as seguintes partem da ordem
+    vencedora anterior e só avaliam a vizinhança dela (±radius em p e q),
+    andando para o melhor vizinho até a vencedora ficar no centro. Os
+    candidatos de cada rodada são ajustados em paralelo num pool de
+    processos (feche com close() ou use `with OrderSearch(...) as search`).
+
+    A ordem vencedora de cada janela fica memoizada (em memória e em
+    {cache_dir}/orders.json) pelo hash dos valores da janela e pela ordem de
+    partida. Numa janela expansiva o hash é incremental: se o começo da
+    janela é igual à janela anterior, só as linhas novas são hasheadas.
+    Rodar de novo o mesmo walk-forward sai todo do cache; dados revisados ou
+    janelas móveis de mesmo tamanho geram outras chaves.
+
+    Parâmetros:
+    -----------
+    max_p, max_q: int
+        Limites da grade
+    d: int
+        Ordem de integração fixa (log-retornos já são estacionários). AIC
+        não é comparável entre d diferentes, então d não entra na busca
+    criterion: str
+        'aic' ou 'bic'
+    radius: int
+        Tamanho da vizinhança em torno da ordem anterior
+    max_workers: int
+        Processos do pool (1 = sem pool)
+    cache_dir: str
+        Pasta do cache em disco (None = só em memória)
+    """
+
+    def __init__(self, max_p: int = 3, max_q: int = 3, d: int = 0, criterion: str = 'aic',
+                 radius: int = 1, max_workers: Optional[int] = None,
+                 cache_dir: Optional[str] = 'data/cache/orders'):
+        if criterion not in ('aic', 'bic'):
+            raise ValueError("criterion deve ser 'aic' ou 'bic'.")
+        self.max_p = max_p
+        self.max_q = max_q
+        self.d = d
+        self.criterion = criterion
+        self.radius = radius
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.last = None
+        self._window = None  # (y, X, hash de y, hash de X) da última janela hasheada
+        self.history = []
+        self._executor = None
+        self._memo = {}
+        if cache_dir and os.path.exists(self._cache_path()):
+            with open(self._cache_path()) as f:
+                self._memo = {k: tuple(v) for k, v in json.load(f).items()}
+
+    # ==== pool / cache ====
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _cache_path(self):
+        return os.path.join(self.cache_dir, 'orders.json')
+
+    def _save_cache(self):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._cache_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._memo, f)
+        os.replace(tmp, self._cache_path())
+
+    def _hashes(self, y, X):
+        """Hashes de y e X, estendendo os da janela anterior quando ela é prefixo desta."""
+        y = np.ascontiguousarray(y, dtype=float)
+        X = None if X is None else np.ascontiguousarray(X, dtype=float)
+        start, hy, hX = 0, hashlib.sha256(), hashlib.sha256()
+        if self._window is not None:
+            y0, X0, hy0, hX0 = self._window
+            n0 = len(y0)
+            if (len(y) >= n0 and (X is None) == (X0 is None)
+                    and (X is None or X.shape[1:] == X0.shape[1:])
+                    and np.array_equal(y[:n0], y0) and (X is None or np.array_equal(X[:n0], X0))):
+                start, hy, hX = n0, hy0.copy(), hX0.copy()
+        hy.update(y[start:].tobytes())
+        if X is not None:
+            hX.update(X[start:].tobytes())
+        self._window = (y, X, hy, hX)
+        return hy.hexdigest(), None if X is None else f"{X.shape[1]}:{hX.hexdigest()}"
+
+    def key(self, y, X=None) -> str:
+        """Chave do memo: hash dos valores da janela (y, X), configuração e ordem de partida."""
+        y_hash, X_hash = self._hashes(y, X)
+        start = None if self.last is None else list(self.last)
+        settings = [self.max_p, self.max_q, self.d, self.criterion, self.radius, start]
+        return hashlib.sha256(json.dumps([settings, y_hash, X_hash]).encode()).hexdigest()
+
+    def reset(self):
+        """Esquece a ordem anterior: a próxima janela parte da grade inteira."""
+        self.last = None
+
+    # ==== busca ====
+
+    def grid(self):
+        return [(p, self.d, q) for p, q in product(range(self.max_p + 1), range(self.max_q + 1))]
+
+    def _neighbours(self, order):
+        p0, _, q0 = order
+        r = self.radius
+        return [(p, self.d, q)
+                for p in range(max(0, p0 - r), min(self.max_p, p0 + r) + 1)
+                for q in range(max(0, q0 - r), min(self.max_q, q0 + r) + 1)]
+
+    def _evaluate(self, y, X, orders):
+        if self.max_workers == 1 or len(orders) == 1:
+            return [_score(y, X, order, self.criterion) for order in orders]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        futures = [self._executor.submit(_score, y, X, order, self.criterion) for order in orders]
+        return [future.result() for future in futures]
+
+    def search(self, y, X=None) -> Tuple[int, int, int]:
+        """
+        Ordem vencedora para a janela (y, X). Registra em history o número de
+        candidatos avaliados, o tempo gasto e a estimativa de tempo poupado
+        em relação à busca na grade inteira.
+        """
+        y = np.asarray(y, dtype=float)
+        X = None if X is None else np.asarray(X, dtype=float)
+        t0 = time.perf_counter()
+        key = self.key(y, X)
+        grid_size = len(self.grid())
+
+        if key in self._memo:
+            best = self._memo[key]
+            self.history.append({'order': best, 'source': 'cache', 'evaluated': 0,
+                                 'grid': grid_size, 'fit_seconds': 0.0,
+                                 'seconds': time.perf_counter() - t0, 'saved_seconds': np.nan})
+            self.last = best
+            return best
+
+        scores = {}
+        fit_seconds = 0.0
+        candidates = self.grid() if self.last is None else self._neighbours(self.last)
+        while True:
+            todo = [order for order in candidates if order not in scores]
+            for order, (value, seconds) in zip(todo, self._evaluate(y, X, todo)):
+                scores[order] = value
+                fit_seconds += seconds
+            best = min(scores, key=scores.get)
+            if self.last is None or not todo:
+                break
+            # a vencedora saiu do centro: recentra a vizinhança nela
+            candidates = self._neighbours(best)
+
+        if not np.isfinite(scores[best]):
+            raise ValueError("Nenhuma ordem candidata convergiu.")
+
+        mean_fit = fit_seconds / len(scores)
+        self.history.append({'order': best, 'source': 'grid' if self.last is None else 'neighbourhood',
+                             'evaluated': len(scores), 'grid': grid_size, 'fit_seconds': fit_seconds,
+                             'seconds': time.perf_counter() - t0,
+                             'saved_seconds': (grid_size - len(scores)) * mean_fit})
+        self.last = best
+        self._memo[key] = best
+        self._save_cache()
+        return best
+
+    def report(self) -> pd.DataFrame:
+        """Uma linha por janela buscada. Em .attrs: total de tempo poupado (estimado)."""
+        report = pd.DataFrame(self.history)
+        if len(report):
+            # janelas vindas do cache pouparam a grade inteira ao tempo médio por ajuste
+            fitted = report[report['evaluated'] > 0]
+            mean_fit = fitted['fit_seconds'].sum() / max(fitted['evaluated'].sum(), 1)
+            cached = report['source'] == 'cache'
+            report.loc[cached, 'saved_seconds'] = report.loc[cached, 'grid'] * mean_fit
+            report.attrs['saved_seconds'] = report['saved_seconds'].sum()
+            report.attrs['exhaustive_seconds'] = (report['grid'] * mean_fit).sum()
+        return report
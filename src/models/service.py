@@ -0,0 +1,298 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+import pickle
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from src.features.incremental import IncrementalFeatureBuilder
+from src.models.hybrid import HybridForecaster
+
+BUNDLE_VERSION = 1
+
+
+def save_bundle(path: str, forecaster: HybridForecaster, builder: IncrementalFeatureBuilder):
+    """
+    Grava o modelo ajustado e o estado de features num único arquivo.
+
+    A gravação é atômica (arquivo temporário + os.replace): um serviço que
+    esteja observando path nunca lê um arquivo pela metade.
+
+    Parâmetros:
+    -----------
+    forecaster: HybridForecaster já ajustado (fit)
+    builder: IncrementalFeatureBuilder aquecido com o mesmo histórico do fit
+    """
+    if forecaster.arimax is None or builder.columns is None:
+        raise ValueError("forecaster e builder precisam estar ajustados.")
+    missing = [c for c in forecaster.feature_cols + [forecaster.target] if c not in builder.columns]
+    if missing:
+        raise ValueError(f"Colunas do modelo ausentes no builder: {missing}")
+    bundle = {'version': BUNDLE_VERSION, 'created': time.time(),
+              'forecaster': forecaster, 'builder': builder}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_bundle(path: str) -> dict:
+    with open(path, 'rb') as f:
+        bundle = pickle.load(f)
+    if bundle.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Versão de bundle incompatível em {path}.")
+    return bundle
+
+
+class _State:
+    '''Tudo o que uma previsão precisa, trocado de uma vez no reload.'''
+
+    def __init__(self, bundle, mtime):
+        self.forecaster = bundle['forecaster']
+        self.builder = bundle['builder']
+        self.created = bundle['created']
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.last_date = None
+        self.next_forecast = self.forecaster.forecast_next()
+
+
+class ForecastService:
+    """
+    Serviço de previsão em memória para o híbrido ARIMAX + XGBoost.
+
+    Um único load() lê o bundle de save_bundle (modelo ajustado, estado do
+    IncrementalFeatureBuilder e layout de colunas); daí em diante cada barra
+    nova custa um update incremental das features, uma extensão do filtro
+    do ARIMAX e uma predição do XGBoost, sem reler CSVs nem reajustar nada.
+
+    Se o arquivo do bundle mudar no disco (modelo retreinado), o novo estado
+    é carregado por inteiro fora do lock e trocado numa única atribuição:
+    as chamadas em andamento terminam com o estado antigo e as seguintes já
+    usam o novo. Barras recebidas depois do retreino devem ser reenviadas
+    via update se o bundle novo não as incluir.
+
+    Parâmetros:
+    -----------
+    path: str
+        Caminho do bundle
+    poll_seconds: float
+        Intervalo da checagem de arquivo novo em segundo plano (None = só
+        com reload_if_changed manual)
+    latency_window: int
+        Quantas latências recentes guardar por endpoint para as métricas
+    """
+
+    def __init__(self, path: str, poll_seconds: Optional[float] = 5.0, latency_window: int = 10000):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.latency_window = latency_window
+        self.reloads = 0
+        self.errors = 0
+        self._state = None
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._latency = {}
+        self._counts = {}
+        self._stop = threading.Event()
+        self._watcher = None
+        self._server = None
+
+    # ==== carga / reload ====
+
+    def load(self) -> 'ForecastService':
+        mtime = os.stat(self.path).st_mtime_ns
+        state = _State(load_bundle(self.path), mtime)
+        with self._lock:
+            self._state = state
+        if self.poll_seconds and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name='forecast-reload', daemon=True)
+            self._watcher.start()
+        return self
+
+    def reload_if_changed(self) -> bool:
+        """Recarrega se o bundle no disco for diferente do carregado. Retorna se recarregou."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if self._state is not None and mtime == self._state.mtime:
+            return False
+        try:
+            state = _State(load_bundle(self.path), mtime)
+        except Exception as e:
+            print(f"Erro ao recarregar {self.path}: {e}")
+            self.errors += 1
+            return False
+        with self._lock:
+            self._state = state
+            self.reloads += 1
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.reload_if_changed()
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.load() if self._state is None else self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _current(self):
+        if self._state is None:
+            raise ValueError("Chame load() antes de prever.")
+        return self._state
+
+    def _timed(self, endpoint, t0):
+        seconds = time.perf_counter() - t0
+        with self._metrics_lock:
+            if endpoint not in self._latency:
+                self._latency[endpoint] = deque(maxlen=self.latency_window)
+                self._counts[endpoint] = 0
+            self._latency[endpoint].append(seconds)
+            self._counts[endpoint] += 1
+        return seconds * 1e3
+
+    # ==== API ====
+
+    def predict_next(self) -> dict:
+        """Previsão do próximo retorno com o estado atual (já calculada, custo ~0)."""
+        t0 = time.perf_counter()
+        state = self._current()
+        out = {'date': None if state.last_date is None else str(state.last_date),
+               'forecast': state.next_forecast, 'model_created': state.created}
+        out['latency_ms'] = self._timed('predict_next', t0)
+        return out
+
+    def _ingest(self, state, date, bar):
+        row = state.builder.update(date, bar)
+        if row is None:
+            # barra descartada pelo filtro de volume: o estado de preços avançou, a previsão não muda
+            return None
+        forecaster = state.forecaster
+        forecaster.observe(row[forecaster.target], row)
+        state.last_date = row.name
+        state.next_forecast = forecaster.forecast_next()
+        return state.next_forecast
+
+    def update(self, date, bar) -> dict:
+        """
+        Incorpora a barra fechada (valores brutos, mesmas colunas do dataset
+        principal) e devolve a previsão para a barra seguinte.
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            state = self._current()
+            forecast = self._ingest(state, date, bar)
+            out = {'date': str(pd.Timestamp(date)), 'forecast': forecast,
+                   'skipped': forecast is None, 'model_created': state.created}
+        out['latency_ms'] = self._timed('update', t0)
+        return out
+
+    def predict_batch(self, bars: pd.DataFrame) -> pd.Series:
+        """
+        Incorpora várias barras em sequência (índice = datas) e devolve a
+        previsão feita ao fim de cada uma (NaN nas descartadas por volume).
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            state = self._current()
+            forecasts = [self._ingest(state, date, bar) for date, bar in bars.iterrows()]
+        out = pd.Series([np.nan if f is None else f for f in forecasts], index=bars.index, name='forecast')
+        out.attrs['latency_ms'] = self._timed('predict_batch', t0)
+        return out
+
+    def metrics(self) -> dict:
+        """Contagem e percentis de latência (ms) por endpoint, mais o estado do modelo."""
+        endpoints = {}
+        with self._metrics_lock:
+            latency = {endpoint: list(values) for endpoint, values in self._latency.items()}
+        for endpoint, values in latency.items():
+            ms = np.asarray(values) * 1e3
+            endpoints[endpoint] = {'count': self._counts[endpoint], 'mean_ms': float(ms.mean()),
+                                   'p50_ms': float(np.percentile(ms, 50)),
+                                   'p95_ms': float(np.percentile(ms, 95)),
+                                   'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+        state = self._state
+        return {'endpoints': endpoints, 'reloads': self.reloads, 'reload_errors': self.errors,
+                'model_created': None if state is None else state.created,
+                'loaded_at': None if state is None else state.loaded_at}
+
+    # ==== HTTP ====
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8765, block: bool = True):
+        """
+        Endpoint HTTP local (JSON):
+
+            GET  /predict  -> predict_next()
+            POST /update   {"date": "...", "bar": {...}} -> update()
+            POST /batch    {"bars": [{"date": "...", ...}, ...]} -> predict_batch()
+            GET  /metrics  -> metrics()
+
+        Com block=False o servidor roda numa thread e serve() retorna o
+        endereço (host, porta); close() encerra.
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def _handle(self, routes):
+                route = routes.get(self.path.split('?')[0])
+                if route is None:
+                    return self._reply(404, {'error': f'rota desconhecida: {self.path}'})
+                try:
+                    self._reply(200, route())
+                except (ValueError, KeyError) as e:
+                    self._reply(400, {'error': f'{type(e).__name__}: {e}'})
+
+            def do_GET(self):
+                self._handle({'/predict': service.predict_next, '/metrics': service.metrics})
+
+            def do_POST(self):
+                def update():
+                    payload = self._body()
+                    return service.update(payload['date'], payload['bar'])
+
+                def batch():
+                    bars = pd.DataFrame(self._body()['bars'])
+                    bars = bars.set_index(pd.to_datetime(bars.pop('date')))
+                    out = service.predict_batch(bars)
+                    return {'dates': [str(d) for d in out.index],
+                            'forecast': [None if np.isnan(f) else f for f in out],
+                            'latency_ms': out.attrs['latency_ms']}
+
+                self._handle({'/update': update, '/batch': batch})
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        if block:
+            self._server.serve_forever()
+            return None
+        threading.Thread(target=self._server.serve_forever, name='forecast-http', daemon=True).start()
+        return self._server.server_address
@@ -0,0 +1,186 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional, Sequence, Union
+
+FAN_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def stationary_bootstrap_indices(n: int, n_paths: int, horizon: int, mean_block: float,
+                                 rng: np.random.Generator) -> np.ndarray:
+    '''
+    Índices do bootstrap estacionário (Politis & Romano, 1994) para n_paths × horizon.
+
+    Cada passo começa um bloco novo com probabilidade 1/mean_block (em
+    posição uniforme) ou continua o bloco atual na posição seguinte, com
+    volta circular ao fim da amostra. Tudo vetorizado: a posição de início
+    do bloco corrente de cada passo sai de um máximo acumulado.
+    '''
+    new_block = rng.random((n_paths, horizon)) < 1.0 / mean_block
+    new_block[:, 0] = True
+    steps = np.arange(horizon)
+    block_start = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    starts = rng.integers(0, n, (n_paths, horizon))
+    first = np.take_along_axis(starts, block_start, axis=1)
+    return (first + steps - block_start) % n
+
+
+def _regime_pool(resid, regimes_df, condition):
+    '''Resíduos das datas em que as colunas de regime têm os valores pedidos (None = valor atual).'''
+    if not condition:
+        return resid, {}
+    if regimes_df is None:
+        raise ValueError("condition exige regimes_df com as colunas de regime.")
+    regimes = regimes_df.reindex(resid.index)
+    state = {}
+    mask = np.ones(len(resid), dtype=bool)
+    for col, value in condition.items():
+        if col not in regimes_df.columns:
+            raise ValueError(f"Coluna de regime '{col}' não encontrada.")
+        if value is None:
+            value = regimes_df[col].dropna().iloc[-1].item()
+        state[col] = value
+        mask &= (regimes[col] == state[col]).to_numpy()
+    if mask.sum() < 2:
+        raise ValueError(f"Menos de 2 resíduos no regime {state}.")
+    return resid[mask], state
+
+
+def simulate_paths(
+    resid: pd.Series,
+    horizon: int = 21,
+    n_paths: int = 10000,
+    mean_block: float = 5.0,
+    drift: Union[float, Sequence[float]] = 0.0,
+    regimes_df: Optional[pd.DataFrame] = None,
+    condition: Optional[Dict[str, Optional[int]]] = None,
+    quantiles: Sequence[float] = FAN_QUANTILES,
+    var_levels: Sequence[float] = (0.01, 0.05),
+    chunk_size: int = 5000,
+    bins: int = 4096,
+    price: Optional[float] = None,
+    seed: Optional[int] = 42
+) -> pd.DataFrame:
+    """
+    Monte Carlo de trajetórias de log-retorno por bootstrap estacionário dos
+    resíduos do modelo, em blocos de chunk_size trajetórias.
+
+    Cada bloco gera uma matriz (chunk_size × horizon) de log-retornos
+    (drift + resíduos reamostrados), acumula e é descartado depois de
+    alimentar os agregados; a memória não cresce com n_paths:
+    - quantis do fan chart: histograma por passo (limites fixados pelo
+      primeiro bloco com folga de 50% de cada lado; valores fora caem nas
+      pontas), erro máximo de um bin (.attrs['bin_width'])
+    - VaR/ES: exatos, guardando por passo só as k = ceil(max(var_levels) *
+      n_paths) piores trajetórias até ali
+    - média e desvio: somas acumuladas
+
+    Parâmetros:
+    -----------
+    resid: Series
+        Resíduos do modelo (ex: HybridForecaster.resid no treino, ou
+        y_true - hybrid do cross_validate, fora da amostra)
+    mean_block: tamanho médio dos blocos (preserva dependência de curto prazo
+        e agrupamento de volatilidade)
+    drift: log-retorno esperado por passo (escalar ou um valor por passo,
+        ex: forecast_next() no primeiro passo)
+    regimes_df / condition: reamostra só resíduos de datas no regime pedido,
+        ex: {'vix_regime_high': 1} ou {'log_return_high_vol_regime': None}
+        (None = o regime da última linha de regimes_df)
+    var_levels: níveis do VaR/ES (cauda esquerda)
+    price: se informado, o fan chart sai também em preço (price × (1 + retorno))
+
+    Retorna:
+    --------
+    DataFrame indexado pelo passo (1..horizon) com os quantis do retorno
+    acumulado simples, mean e std (e price_q* se price). Em .attrs:
+    'risk' (VaR_/ES_ por nível e passo, perdas positivas), 'regime',
+    'n_paths', 'bin_width'.
+    """
+    resid = resid.dropna()
+    pool, state = _regime_pool(resid, regimes_df, condition)
+    values = pool.to_numpy(dtype=float)
+    drift = np.broadcast_to(np.asarray(drift, dtype=float), (horizon,))
+    rng = np.random.default_rng(seed)
+
+    k = int(np.ceil(max(var_levels) * n_paths))
+    worst = np.empty((0, horizon))
+    total = np.zeros(horizon)
+    total_sq = np.zeros(horizon)
+    counts = edges = None
+    steps = np.arange(horizon)
+
+    done = 0
+    while done < n_paths:
+        m = min(chunk_size, n_paths - done)
+        idx = stationary_bootstrap_indices(len(values), m, horizon, mean_block, rng)
+        cum = np.cumsum(values[idx] + drift, axis=1)  # log-retorno acumulado
+
+        if edges is None:
+            lo, hi = cum.min(axis=0), cum.max(axis=0)
+            pad = 0.5 * np.maximum(hi - lo, 1e-12)
+            edges = np.linspace(lo - pad, hi + pad, bins + 1, axis=1)  # (horizon, bins + 1)
+            counts = np.zeros((horizon, bins), dtype=np.int64)
+        width = edges[:, 1] - edges[:, 0]
+        b = np.clip(((cum - edges[:, 0]) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((b + steps * bins).ravel(), minlength=horizon * bins).reshape(horizon, bins)
+
+        simple = np.expm1(cum)
+        total += simple.sum(axis=0)
+        total_sq += (simple ** 2).sum(axis=0)
+        worst = np.concatenate([worst, cum])
+        if len(worst) > k:
+            worst = np.partition(worst, k - 1, axis=0)[:k]
+        done += m
+
+    # quantis pelo histograma acumulado (interpolação linear dentro do bin)
+    cdf = np.cumsum(counts, axis=1) / n_paths
+    fan = {}
+    for q in quantiles:
+        j = np.minimum((cdf < q).sum(axis=1), bins - 1)
+        below = np.where(j > 0, cdf[steps, j - 1], 0.0)
+        inside = (q - below) / np.maximum(cdf[steps, j] - below, 1e-300)
+        fan[f'q{q:g}'] = np.expm1(edges[steps, j] + np.clip(inside, 0, 1) * width)
+    out = pd.DataFrame(fan, index=pd.RangeIndex(1, horizon + 1, name='step'))
+    out['mean'] = total / n_paths
+    out['std'] = np.sqrt(np.maximum(total_sq / n_paths - out['mean'] ** 2, 0) * n_paths / max(n_paths - 1, 1))
+    if price is not None:
+        for q in quantiles:
+            out[f'price_q{q:g}'] = price * (1 + out[f'q{q:g}'])
+
+    worst = np.sort(np.expm1(worst), axis=0)
+    risk = {}
+    for level in var_levels:
+        n_tail = max(int(np.ceil(level * n_paths)), 1)
+        risk[f'VaR_{level:g}'] = -worst[n_tail - 1]
+        risk[f'ES_{level:g}'] = -worst[:n_tail].mean(axis=0)
+    out.attrs['risk'] = pd.DataFrame(risk, index=out.index)
+    out.attrs['regime'] = state
+    out.attrs['n_paths'] = n_paths
+    out.attrs['bin_width'] = width
+    return out
+
+
+def plot_fan(fan: pd.DataFrame, ax=None, price: bool = False, title: Optional[str] = None):
+    '''
+    Fan chart da saída de simulate_paths: faixas entre quantis simétricos
+    (mais claras para fora) e a mediana.
+    '''
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, 5))
+    prefix = 'price_q' if price else 'q'
+    levels = sorted(float(c[len(prefix):]) for c in fan.columns
+                    if c.startswith(prefix) and (price or not c.startswith('price')))
+    pairs = [(lo, hi) for lo in levels for hi in levels if lo < 0.5 and np.isclose(lo + hi, 1)]
+    for i, (lo, hi) in enumerate(sorted(pairs)):
+        ax.fill_between(fan.index, fan[f'{prefix}{lo:g}'], fan[f'{prefix}{hi:g}'],
+                        color='C0', alpha=0.15 + 0.2 * i, label=f'{lo:.0%}-{hi:.0%}')
+    if 0.5 in levels:
+        ax.plot(fan.index, fan[f'{prefix}0.5'], color='C0', label='mediana')
+    ax.set_xlabel('passos à frente')
+    ax.set_ylabel('preço' if price else 'retorno acumulado')
+    if title:
+        ax.set_title(title)
+    ax.legend(loc='upper left')
+    return ax
@@ -0,0 +1,226 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import xgboost as xgb
+from src.constants import XGB_PARAMS, TRAIN_SIZE
+from src.models.arimax import select_order
+from src.models.hybrid import HybridForecaster, time_series_folds, _fit_arimax
+
+# Estado de cada processo do pool: matriz por memory-map e DMatrix quantizadas por fold
+_STATE = {}
+
+# nomes do XGBRegressor -> nomes do xgb.train
+_ALIASES = {'learning_rate': 'eta', 'random_state': 'seed', 'n_jobs': 'nthread'}
+
+
+def _init_worker(paths, folds, max_bin, nthread):
+    _STATE.clear()
+    _STATE.update(X=np.load(paths['X'], mmap_mode='r'), paths=paths, folds=folds,
+                  max_bin=max_bin, nthread=nthread, dm={})
+
+
+def _fold_matrices(k):
+    '''DMatrix de treino (quantizada) e validação do fold k, criadas uma vez por processo.'''
+    if k not in _STATE['dm']:
+        X = _STATE['X']
+        train_end, test_start, test_end = _STATE['folds'][k]
+        labels = np.load(_STATE['paths'][f'labels_{k}'])
+        dtrain = xgb.QuantileDMatrix(X[:train_end], labels[:train_end], max_bin=_STATE['max_bin'],
+                                     nthread=_STATE['nthread'])
+        dvalid = xgb.QuantileDMatrix(X[test_start:test_end], labels[train_end:], ref=dtrain,
+                                     nthread=_STATE['nthread'])
+        _STATE['dm'][k] = (dtrain, dvalid, labels[train_end:])
+    return _STATE['dm'][k]
+
+
+def _evaluate(config, rounds):
+    '''Worker: treina a configuração com `rounds` árvores em todos os folds.'''
+    t0 = time.perf_counter()
+    params = {_ALIASES.get(k, k): v for k, v in config.items() if k != 'n_estimators'}
+    params.update(objective='reg:squarederror', nthread=_STATE['nthread'], max_bin=_STATE['max_bin'])
+    fold_rmse = []
+    for k in range(len(_STATE['folds'])):
+        dtrain, dvalid, y_valid = _fold_matrices(k)
+        booster = xgb.train(params, dtrain, num_boost_round=rounds)
+        pred = booster.predict(dvalid)
+        fold_rmse.append(float(np.sqrt(np.mean((y_valid - pred) ** 2))))
+    return fold_rmse, time.perf_counter() - t0
+
+
+class XGBSearch:
+    """
+    Busca de hiperparâmetros do XGBoost em folds walk-forward com successive halving.
+
+    Cada fold tem sua QuantileDMatrix de treino construída uma única vez por
+    processo (a matriz de features é gravada uma vez e aberta por memory-map)
+    e reaproveitada por todos os trials. As configurações começam com poucas
+    árvores; a cada rodada só o melhor 1/eta (RMSE médio nos folds) segue com
+    eta vezes mais árvores, até max_rounds. Cada avaliação é gravada num JSONL:
+    uma busca interrompida retoma de onde parou.
+
+    Parâmetros:
+    -----------
+    space: dict
+        {parâmetro: lista de valores}, ex: {'max_depth': [3, 5, 7],
+        'learning_rate': [0.03, 0.1]}. Demais parâmetros vêm de XGB_PARAMS;
+        o número de árvores é controlado por min_rounds/max_rounds/eta
+    n_configs: int
+        Sorteia n_configs combinações da grade (None = grade inteira)
+    target: str
+        'residual' (resíduos do ARIMAX, como no híbrido) ou 'raw' (log_return)
+    n_folds / train_size: ver time_series_folds
+    max_workers: processos (1 = serial)
+    log_path: JSONL com os resultados
+    """
+
+    def __init__(self, space: Dict[str, list], min_rounds: int = 25, max_rounds: int = 400,
+                 eta: int = 3, n_configs: Optional[int] = None, target: str = 'residual',
+                 order=None, arimax_cols: Optional[List[str]] = None,
+                 n_folds: int = 3, train_size: float = TRAIN_SIZE, max_bin: int = 256,
+                 max_workers: Optional[int] = None, seed: int = 42,
+                 log_path: str = 'data/cache/xgb_search.jsonl'):
+        if target not in ('residual', 'raw'):
+            raise ValueError("target deve ser 'residual' ou 'raw'.")
+        if eta < 2:
+            raise ValueError("eta deve ser >= 2.")
+        self.space = space
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.n_configs = n_configs
+        self.target = target
+        self.order = order
+        self.arimax_cols = arimax_cols
+        self.n_folds = n_folds
+        self.train_size = train_size
+        self.max_bin = max_bin
+        self.max_workers = max_workers
+        self.seed = seed
+        self.log_path = log_path
+
+    def configs(self) -> List[dict]:
+        base = {k: v for k, v in XGB_PARAMS.items() if k != 'n_estimators'}
+        keys = list(self.space)
+        grid = [dict(base, **dict(zip(keys, values))) for values in product(*self.space.values())]
+        if self.n_configs is not None and self.n_configs < len(grid):
+            rng = np.random.default_rng(self.seed)
+            grid = [grid[i] for i in sorted(rng.choice(len(grid), self.n_configs, replace=False))]
+        return grid
+
+    def rungs(self) -> List[int]:
+        rounds, r = [], self.min_rounds
+        while r < self.max_rounds:
+            rounds.append(r)
+            r *= self.eta
+        return rounds + [self.max_rounds]
+
+    def _load_log(self, data_key):
+        done = {}
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record['data'] == data_key:
+                        done[(json.dumps(record['config'], sort_keys=True), record['rounds'])] = record
+        return done
+
+    def _labels(self, y, X, arimax_idx, folds):
+        '''Alvo de treino + validação de cada fold (resíduos do ARIMAX ajustado no treino do fold).'''
+        if self.target == 'raw':
+            return [y[:b] for a, _, b in folds]
+        Xa = X[:, arimax_idx] if arimax_idx else None
+        order = self.order or select_order(y[:folds[0][0]], None if Xa is None else Xa[:folds[0][0]])
+        labels = []
+        for a, _, b in folds:
+            arimax = _fit_arimax(y[:a], None if Xa is None else Xa[:a], order)
+            test = arimax.extend(y[a:b], exog=None if Xa is None else Xa[a:b])
+            labels.append(np.concatenate([np.asarray(arimax.resid), y[a:b] - np.asarray(test.fittedvalues)]))
+        return labels
+
+    def run(self, df: pd.DataFrame, target: str = 'log_return',
+            feature_cols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Roda (ou retoma) a busca.
+
+        Retorna:
+        --------
+        DataFrame com uma linha por (configuração, rodada): rounds, rmse médio,
+        rmse por fold, tempo e se veio do log. Em .attrs['best_params'] os
+        parâmetros vencedores no formato de XGB_PARAMS.
+        """
+        hybrid = HybridForecaster(arimax_cols=self.arimax_cols)
+        y, X, _, feature_cols, arimax_idx = hybrid._matrix(df, target, feature_cols)
+        folds = time_series_folds(len(y), self.n_folds, self.train_size)
+
+        h = hashlib.sha256()
+        h.update(json.dumps([feature_cols, folds, self.target, self.max_bin]).encode())
+        h.update(X.tobytes())
+        h.update(y.tobytes())
+        data_key = h.hexdigest()[:16]
+        done = self._load_log(data_key)
+
+        configs = self.configs()
+        workers = min(self.max_workers or os.cpu_count() or 1, len(configs))
+        nthread = max(1, (os.cpu_count() or 1) // workers)
+        tmp = tempfile.mkdtemp(prefix='xgb_search_')
+        executor = None
+        rows = []
+        try:
+            paths = {'X': os.path.join(tmp, 'X.npy')}
+            np.save(paths['X'], X)
+            for k, labels in enumerate(self._labels(y, X, arimax_idx, folds)):
+                paths[f'labels_{k}'] = os.path.join(tmp, f'labels_{k}.npy')
+                np.save(paths[f'labels_{k}'], labels)
+
+            if workers > 1:
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                               initargs=(paths, folds, self.max_bin, nthread))
+            else:
+                _init_worker(paths, folds, self.max_bin, nthread)
+
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            alive = configs
+            for rung, rounds in enumerate(self.rungs()):
+                keys = [(json.dumps(c, sort_keys=True), rounds) for c in alive]
+                todo = [c for c, key in zip(alive, keys) if key not in done]
+                if executor is not None:
+                    results = list(executor.map(_evaluate, todo, [rounds] * len(todo)))
+                else:
+                    results = [_evaluate(c, rounds) for c in todo]
+
+                with open(self.log_path, 'a') as f:
+                    for config, (fold_rmse, seconds) in zip(todo, results):
+                        record = {'data': data_key, 'config': config, 'rounds': rounds,
+                                  'rmse': float(np.mean(fold_rmse)), 'fold_rmse': fold_rmse,
+                                  'seconds': seconds}
+                        f.write(json.dumps(record) + '\n')
+                        done[(json.dumps(config, sort_keys=True), rounds)] = dict(record, resumed=False)
+
+                scored = [(done[key]['rmse'], i) for i, key in enumerate(keys)]
+                for config, key in zip(alive, keys):
+                    record = done[key]
+                    rows.append({'rung': rung, 'rounds': rounds, 'config': config,
+                                 'rmse': record['rmse'], 'fold_rmse': record['fold_rmse'],
+                                 'seconds': record['seconds'], 'resumed': record.get('resumed', True)})
+                keep = max(1, int(np.ceil(len(alive) / self.eta)))
+                alive = [alive[i] for _, i in sorted(scored)[:keep]]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            # no caminho serial o estado fica neste processo: solta o memory-map
+            # (antes de apagar o arquivo) e as QuantileDMatrix
+            _STATE.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        report = pd.DataFrame(rows)
+        best = report[report['rung'] == report['rung'].max()].sort_values('rmse').iloc[0]
+        report.attrs['best_params'] = dict(best['config'], n_estimators=int(best['rounds']))
+        return report
@@ -0,0 +1,49 @@
+import pandas as pd
+import numpy as np
+
+# calendário e flags 0/1 cabem em int8
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def compact_dtypes(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    '''
+    Converte as colunas para o menor dtype que guarda os valores sem perda.
+
+    Inteiros (flags 0/1, mês, dia da semana, trimestre, ...) vão para o menor
+    int que comporta o intervalo de valores (int8 na maioria). Com float32=True
+    as colunas contínuas vão para float32 (perde precisão: ~7 dígitos).
+    Colunas de data e booleanas ficam como estão.
+
+    Retorna:
+    --------
+    Novo DataFrame com os dtypes compactos.
+    '''
+    dtypes = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            values = df[col].to_numpy()
+            lo, hi = (values.min(), values.max()) if len(values) else (0, 0)
+            for int_type in _INT_TYPES:
+                info = np.iinfo(int_type)
+                if info.min <= lo and hi <= info.max:
+                    if np.dtype(int_type) != dtype:
+                        dtypes[col] = int_type
+                    break
+        elif float32 and dtype == np.float64:
+            dtypes[col] = np.float32
+    return df.astype(dtypes) if dtypes else df
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Memória por coluna (dtype, bytes e % do total), da maior para a menor.
+    Em .attrs: total_bytes e bytes_by_dtype.
+    '''
+    nbytes = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': nbytes})
+    report['share'] = report['bytes'] / max(report['bytes'].sum(), 1)
+    report = report.sort_values('bytes', ascending=False)
+    report.attrs['total_bytes'] = int(report['bytes'].sum() + df.index.memory_usage(deep=True))
+    report.attrs['bytes_by_dtype'] = report.groupby('dtype')['bytes'].sum().to_dict()
+    return report
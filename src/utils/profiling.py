@@ -0,0 +1,182 @@
+import pandas as pd
+import json
+import time
+import threading
+import tracemalloc
+import functools
+
+# Profiler ativo (None = instrumentação desligada: stage() devolve um no-op)
+_ACTIVE = None
+
+
+class _NullStage:
+    '''Estágio vazio usado quando não há profiler ativo.'''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def out(self, data):
+        return data
+
+
+_NULL = _NullStage()
+
+
+def _shape(data):
+    shape = getattr(data, 'shape', None)
+    if shape is None:
+        return None, None
+    return shape[0], (shape[1] if len(shape) > 1 else 1)
+
+
+class _Stage:
+    def __init__(self, profiler, name, data):
+        self.profiler = profiler
+        self.name = name
+        self.rows_in, self.cols_in = _shape(data)
+        self.rows_out = self.cols_out = None
+
+    def out(self, data):
+        '''Registra o formato da saída do estágio e devolve data.'''
+        self.rows_out, self.cols_out = _shape(data)
+        return data
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        self.path = '/'.join([s.name for s in stack] + [self.name])
+        self.peak = 0
+        if self.profiler.memory:
+            # o pico anterior pertence aos estágios de fora: guarda antes de zerar
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in stack:
+                outer.peak = max(outer.peak, peak - outer.base)
+            tracemalloc.reset_peak()
+            self.base = current
+        stack.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        stack = self.profiler._stack()
+        stack.pop()
+        if self.profiler.memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self.base)
+            for outer in stack:
+                outer.peak = max(outer.peak, self.peak + self.base - outer.base)
+        self.profiler._record({
+            'stage': self.path, 'depth': self.path.count('/'),
+            'start': self.t0 - self.profiler.t_start, 'seconds': seconds,
+            'peak_bytes': self.peak if self.profiler.memory else None,
+            'rows_in': self.rows_in, 'cols_in': self.cols_in,
+            'rows_out': self.rows_out, 'cols_out': self.cols_out,
+            'thread': threading.current_thread().name,
+            'error': None if exc_type is None else exc_type.__name__,
+        })
+        return False
+
+
+def stage(name, data=None):
+    '''
+    Marca um estágio do pipeline. Sem profiler ativo não faz nada.
+
+    Uso:
+        with stage('logreturns', df) as s:
+            df = s.out(create_logreturns(df, cols))
+    '''
+    if _ACTIVE is None:
+        return _NULL
+    return _Stage(_ACTIVE, name, data)
+
+
+def profiled(name):
+    '''Decorador: a função inteira vira um estágio (formato da saída se for um DataFrame).'''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE is None:
+                return func(*args, **kwargs)
+            data = args[0] if args and hasattr(args[0], 'shape') else None
+            with _Stage(_ACTIVE, name, data) as s:
+                return s.out(func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class Profiler:
+    """
+    Coleta tempo, pico de memória e linhas/colunas de entrada e saída de cada
+    estágio marcado com stage()/profiled() em download_data,
+    build_main_dataset e build_all_features.
+
+    Uso:
+        with Profiler(memory=True) as prof:
+            df = build_main_dataset(...)
+            feats = build_all_features(df, ...)
+        print(prof.summary())
+        prof.to_json('perfil.json')
+
+    Parâmetros:
+    -----------
+    memory: bool
+        Mede o pico de memória com tracemalloc (deixa a execução mais lenta).
+        Com downloads em paralelo o pico dos estágios por ticker se mistura
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._previous = None
+        self._started_tracemalloc = False
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _record(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def __enter__(self):
+        global _ACTIVE
+        self._previous, _ACTIVE = _ACTIVE, self
+        self.t_start = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIVE
+        _ACTIVE = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    def report(self) -> pd.DataFrame:
+        """Uma linha por execução de estágio, na ordem de início."""
+        report = pd.DataFrame(self.records)
+        return report.sort_values('start', kind='stable', ignore_index=True) if len(report) else report
+
+    def to_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({'memory': self.memory, 'stages': self.records}, f, indent=1)
+
+    def summary(self) -> str:
+        """Tabela legível agregada por estágio (chamadas, tempo total, pico, formatos)."""
+        report = self.report()
+        if report.empty:
+            return 'Nenhum estágio registrado.'
+        agg = report.groupby('stage', sort=False).agg(
+            calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+            peak_mib=('peak_bytes', 'max'), rows_in=('rows_in', 'last'), cols_in=('cols_in', 'last'),
+            rows_out=('rows_out', 'last'), cols_out=('cols_out', 'last'))
+        agg['peak_mib'] = agg['peak_mib'] / 2 ** 20
+        return agg.to_string(float_format=lambda x: f'{x:.4f}')
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from src.models.arimax import WalkForwardARIMAX
+
+
+def test_exog_is_lagged():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2020-01-01', periods=300, name='Date')
+    y = rng.normal(0, 0.01, len(index))
+    # coluna derivada do próprio alvo em t: sem defasagem, a previsão seria perfeita
+    df = pd.DataFrame({'log_return': y, 'echo': 2 * y}, index=index)
+
+    out = WalkForwardARIMAX(order=(1, 0, 0), refit_every=100, train_size=0.8).run(df, exog_cols=['echo'])
+
+    assert out.index[0] == index[1 + int(299 * 0.8)]
+    r2 = 1 - ((out['y_true'] - out['y_pred']) ** 2).sum() / ((out['y_true'] - out['y_true'].mean()) ** 2).sum()
+    assert r2 < 0.2
+
+
+def test_default_exog_is_logreturns_only():
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range('2020-01-01', periods=200, name='Date')
+    df = pd.DataFrame({'log_return': rng.normal(0, 0.01, len(index)),
+                       'a_logreturns': rng.normal(0, 0.01, len(index)),
+                       'b_logreturns': rng.normal(0, 0.01, len(index)),
+                       'a_ma_5': rng.normal(size=len(index)),
+                       'month': index.month}, index=index)
+
+    model = WalkForwardARIMAX(order=(1, 0, 0), refit_every=100, train_size=0.8)
+    model.run(df)
+    # depois do extend o modelo guarda só a última barra (exógenas de t - 1)
+    np.testing.assert_array_equal(model.results.model.exog,
+                                  df[['a_logreturns', 'b_logreturns']].to_numpy()[-2:-1])
+
+    model.run(df, exog_cols=[])
+    assert model.results.model.exog is None
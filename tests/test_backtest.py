@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.backtest import backtest_grid
+
+
+def _stats(net):
+    equity, peak, drawdown = 1.0, 1.0, 0.0
+    for x in net:
+        equity *= 1 + x
+        peak = max(peak, equity)
+        drawdown = min(drawdown, equity / peak - 1)
+    mean = sum(net) / len(net)
+    std = math.sqrt(sum((x - mean) ** 2 for x in net) / (len(net) - 1))
+    return equity - 1, drawdown, mean / std * 2     # sqrt(4 barras por ano)
+
+
+def test_two_configs_by_hand():
+    index = pd.bdate_range('2024-01-01', periods=4)
+    forecast = pd.Series([0.01, -0.02, 0.005, 0.03], index=index)
+    returns = pd.Series([0.01, 0.02, -0.01, 0.005], index=index)
+    # 10 bps por lado; aluguel de 4% ao ano = 1% por barra vendida com 4 barras por ano
+    costs = [{'fee_bps': 10.0, 'brokerage_bps': 0.0, 'slippage_bps': 0.0, 'borrow_rate': 0.04}]
+
+    report = backtest_grid(forecast, returns, thresholds=(0.0, 0.015), costs=costs,
+                           bars_per_year=4, curves=True)
+    assert len(report) == 2
+    report = report.set_index('threshold')
+
+    g = [math.expm1(0.01), math.expm1(0.02), math.expm1(-0.01), math.expm1(0.005)]
+    # limiar 0: posições +1, -1, +1, +1 (giro 1, 2, 2, 0)
+    net_all = [g[0] - 0.001, -g[1] - 0.002 - 0.01, g[2] - 0.002, g[3]]
+    # limiar 0.015: só as barras 1 e 3 operam: 0, -1, 0, +1 (giro 0, 1, 1, 1)
+    net_big = [0.0, -g[1] - 0.001 - 0.01, -0.001, g[3] - 0.001]
+
+    cases = ((0.0, net_all, 5, 1.0), (0.015, net_big, 3, 0.5))
+    for k, (threshold, net, turnover, exposure) in enumerate(cases):
+        total, drawdown, sharpe = _stats(net)
+        row = report.loc[threshold]
+        assert row['total_return'] == pytest.approx(total, rel=1e-12)
+        assert row['ann_return'] == pytest.approx(total, rel=1e-12)   # exatamente um ano
+        assert row['max_drawdown'] == pytest.approx(drawdown, rel=1e-12)
+        assert row['sharpe'] == pytest.approx(sharpe, rel=1e-12)
+        assert (row['turnover'], row['exposure'], row['n_trades'], row['hit_rate']) == (turnover, exposure, 3, 0.5)
+        # curvas na ordem da grade (antes de ordenar por sharpe)
+        np.testing.assert_allclose(report.attrs['equity'][k], np.cumprod([1 + x for x in net]), rtol=1e-12)
+
+
+def test_regime_filter_uses_previous_close():
+    index = pd.bdate_range('2024-01-01', periods=4)
+    forecast = pd.Series(0.01, index=index)
+    returns = pd.Series(0.01, index=index)
+    regimes_df = pd.DataFrame({'calm': [1, 0, 1, 1]}, index=index)
+    free = [{'fee_bps': 0.0, 'slippage_bps': 0.0, 'borrow_rate': 0.0}]
+
+    report = backtest_grid(forecast, returns, regimes=[None, 'calm', '~calm'], regimes_df=regimes_df,
+                           costs=free, bars_per_year=4).set_index('regime')
+    # vale o regime de t-1 (a barra 0, sem histórico, conta como 0):
+    # 'calm' opera nas barras 1 e 3, '~calm' nas barras 0 e 2
+    assert report.loc['all', 'exposure'] == 1.0
+    assert report.loc['calm', 'exposure'] == 0.5
+    assert report.loc['~calm', 'exposure'] == 0.5
+    assert report.loc['calm', 'total_return'] == pytest.approx(math.exp(0.02) - 1, rel=1e-12)
+
+    with pytest.raises(ValueError):
+        backtest_grid(forecast, returns, regimes=['calm'])
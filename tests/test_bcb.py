@@ -0,0 +1,42 @@
+import pandas as pd
+
+from src.data.bcb import load_bcb_series
+from src.data.sources import CSVSGSSource
+
+
+class _CountingSource(CSVSGSSource):
+    """CSVSGSSource que registra cada busca."""
+
+    def __init__(self, dir):
+        super().__init__(dir)
+        self.calls = []
+
+    def fetch(self, code, start, end):
+        self.calls.append((code, start, end))
+        return super().fetch(code, start, end)
+
+
+def _monthly_csv(dir, code=433, last='2022-09-01'):
+    index = pd.date_range('2020-01-01', last, freq='MS', name='Date')
+    pd.DataFrame({'value': range(len(index))}, index=index, dtype=float).to_csv(dir / f'{code}.csv')
+
+
+def test_monthly_series_not_refetched(tmp_path):
+    _monthly_csv(tmp_path)
+    source = _CountingSource(str(tmp_path))
+    kwargs = dict(start='2020-01-01', end='2022-10-20', dir=str(tmp_path / 'store'),
+                  source=source, max_workers=1)
+
+    first = load_bcb_series({'ipca': 433}, **kwargs)
+    assert len(source.calls) == 1
+    # última observação (1º de setembro) fica semanas antes de end: nada a buscar de novo
+    second = load_bcb_series({'ipca': 433}, **kwargs)
+    assert len(source.calls) == 1
+    pd.testing.assert_series_equal(first['ipca'], second['ipca'])
+
+    # end maior: busca só o trecho novo (com a sobreposição das últimas observações)
+    _monthly_csv(tmp_path, last='2022-11-01')
+    third = load_bcb_series({'ipca': 433}, **{**kwargs, 'end': '2022-12-01'})
+    assert len(source.calls) == 2
+    assert pd.Timestamp(source.calls[1][2]) == pd.Timestamp('2022-12-01')
+    assert third['ipca'].index[-1] == pd.Timestamp('2022-11-01')
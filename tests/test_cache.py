@@ -0,0 +1,30 @@
+import pandas as pd
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.features.cache import StageCache
+
+
+def test_stage_cache_hits_and_sweep(tmp_path):
+    df, kwargs = make_market(800, n_assets=2, seed=4)
+    expected = build_all_features(df, **kwargs)
+
+    cache = StageCache(str(tmp_path))
+    first = build_all_features(df, cache=cache, **kwargs)
+    pd.testing.assert_frame_equal(first, expected)
+    assert cache.report()['hits'].sum() == 0
+
+    # mesma chamada: tudo sai do disco, mesmo resultado
+    cache = StageCache(str(tmp_path))
+    second = build_all_features(df, cache=cache, **kwargs)
+    pd.testing.assert_frame_equal(second, expected)
+    report = cache.report()
+    assert report['misses'].sum() == 0 and report['hits'].sum() == len(report)
+
+    # sweep de lags: só o estágio de lags e os que leem suas colunas são recalculados
+    cache = StageCache(str(tmp_path))
+    swept = build_all_features(df, cache=cache, **dict(kwargs, lags=[2, 3]))
+    pd.testing.assert_frame_equal(swept, build_all_features(df, **dict(kwargs, lags=[2, 3])))
+    report = cache.report()
+    assert report.loc['lags', 'misses'] == 1
+    assert report.loc['logreturns', 'hits'] == 1 and report.loc['temporal', 'hits'] == 1
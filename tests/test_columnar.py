@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.features.columnar import plan_features
+
+
+@pytest.mark.parametrize('compact', [False, True])
+@pytest.mark.parametrize('extra', [
+    {},
+    {'regime_quantiles': (0.1, 0.9), 'regime_window': 120},
+])
+def test_columnar_matches_pandas(compact, extra):
+    df, kwargs = make_market(1500, n_assets=3, seed=3)
+    kwargs.update(extra, compact=compact)
+
+    expected = build_all_features(df, engine='pandas', **kwargs)
+    got = build_all_features(df, engine='columnar', **kwargs)
+
+    assert list(got.columns) == list(expected.columns)
+    pd.testing.assert_series_equal(got.dtypes, expected.dtypes)
+    pd.testing.assert_frame_equal(got, expected, check_exact=True)
+
+
+def test_requested_columns_match_full_build():
+    df, kwargs = make_market(1500, n_assets=3, seed=3)
+    full = build_all_features(df, engine='columnar', **kwargs).set_index('Date')
+    columns = ['log_return_vol_ratio_5_63', 'asset_1_logreturns_lag_5', 'month']
+
+    block = plan_features(df, columns=columns, **kwargs)
+    assert len(block.recipes) < len(plan_features(df, **kwargs).recipes)
+    assert 'log_return_vol_5' in block.columns() and 'VIX_logreturns_vol_22' not in block.columns()
+
+    got = build_all_features(df, engine='columnar', columns=columns, **kwargs).set_index('Date')
+    assert list(got.columns) == columns
+    # o dropna só olha para as colunas pedidas: sobram linhas do começo
+    assert len(got) > len(full) and full.index.isin(got.index).all()
+    pd.testing.assert_frame_equal(got.loc[full.index], full[columns], check_exact=True)
+
+    with pytest.raises(ValueError, match='desconhecidas'):
+        build_all_features(df, engine='columnar', columns=['nao_existe'], **kwargs)
@@ -0,0 +1,58 @@
+import threading
+
+import pandas as pd
+
+from src.data.download import download_data
+from src.data.sources import CSVSource
+
+
+class _FlakySource(CSVSource):
+    """CSVSource que falha nas primeiras `failures[ticker]` chamadas de cada ticker."""
+
+    def __init__(self, dir, failures):
+        super().__init__(dir)
+        self.failures = dict(failures)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker, start, end, **kwargs):
+        with self._lock:
+            self.calls.append(ticker)
+            if self.failures.get(ticker, 0) > 0:
+                self.failures[ticker] -= 1
+                raise ConnectionError('timeout')
+        return super().fetch(ticker, start, end, **kwargs)
+
+
+def _fixture(source, ticker):
+    """Barras diárias até o fim do trecho pedido nos testes."""
+    index = pd.bdate_range('2024-01-01', '2024-02-29', name='Date')
+    pd.DataFrame({'Close': range(len(index)), 'Volume': 100.0}, index=index,
+                 dtype=float).to_csv(source.path(ticker))
+
+
+def test_retries_and_report(tmp_path):
+    source = _FlakySource(str(tmp_path), {'AAA': 1, 'BBB': 5})
+    for ticker in ('AAA', 'BBB', '^CCC'):
+        _fixture(source, ticker)
+    kwargs = dict(start='2024-01-01', end='2024-03-01', dir=str(tmp_path / 'raw'), source=source,
+                  max_workers=3, retries=2, backoff=0.0, return_report=True)
+
+    data, report = download_data(['AAA', 'BBB', '^CCC'], **kwargs)
+
+    assert sorted(data) == ['AAA', '^CCC']
+    assert len(data['AAA']) == 44
+    assert report.loc['AAA', 'status'] == 'download' and report.loc['AAA', 'attempts'] == 2
+    assert report.loc['^CCC', 'status'] == 'download' and report.loc['^CCC', 'attempts'] == 1
+    # 1 tentativa + 2 novas, depois desiste
+    assert report.loc['BBB', 'status'] == 'error' and report.loc['BBB', 'attempts'] == 3
+    assert report.loc['BBB', 'error'].startswith('ConnectionError')
+
+    # segunda execução: o que foi salvo vem do store sem chamar a fonte
+    source.calls.clear()
+    source.failures = {}
+    data, report = download_data(['AAA', '^CCC'], **kwargs)
+    assert source.calls == []
+    assert report['status'].tolist() == ['cache', 'cache']
+    pd.testing.assert_frame_equal(data['AAA'], pd.read_csv(source.path('AAA'), parse_dates=['Date'],
+                                                           index_col='Date'), check_freq=False)
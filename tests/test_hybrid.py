@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.hybrid import HybridForecaster
+
+XGB = {'n_estimators': 50, 'max_depth': 2, 'learning_rate': 0.1, 'random_state': 0}
+
+
+def _frame(n=600, seed=0):
+    """Retorno com parte linear (ARIMAX) e parte não linear em x de t-1 (só o XGBoost pega)."""
+    rng = np.random.default_rng(seed)
+    a = rng.normal(0, 0.01, n)
+    x = rng.normal(size=n)
+    y = rng.normal(0, 0.002, n)
+    y[1:] += 0.3 * a[:-1] + 0.01 * np.sign(x[:-1])
+    index = pd.bdate_range('2020-01-01', periods=n, name='Date')
+    return pd.DataFrame({'log_return': y, 'a_logreturns': a, 'x': x}, index=index)
+
+
+def test_cross_validate_residual_model_helps():
+    out = HybridForecaster(order=(1, 0, 0), xgb_params=XGB, n_folds=3, train_size=0.6,
+                           max_workers=1).cross_validate(_frame())
+
+    metrics = out.attrs['metrics']
+    assert len(metrics) == 3 and metrics['test_rows'].sum() == len(out)
+    assert out.index.is_monotonic_increasing and not out.index.has_duplicates
+    assert (metrics['rmse_hybrid'] < 0.8 * metrics['rmse_arimax']).all()
+
+
+def test_parallel_folds_match_serial():
+    df = _frame(400)
+    kwargs = dict(order=(1, 0, 0), xgb_params=dict(XGB, n_jobs=1), n_folds=2, train_size=0.6)
+    serial = HybridForecaster(max_workers=1, **kwargs).cross_validate(df)
+    parallel = HybridForecaster(max_workers=2, **kwargs).cross_validate(df)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_online_updates_match_predict():
+    df = _frame(300)
+    train, new = df.iloc[:250], df.iloc[250:260]
+    batch = HybridForecaster(order=(1, 0, 0), xgb_params=XGB).fit(train).predict(new)
+
+    online = HybridForecaster(order=(1, 0, 0), xgb_params=XGB).fit(train)
+    preds = []
+    for _, row in new.iterrows():
+        preds.append(online.forecast_next())
+        online.observe(row['log_return'], row)
+    np.testing.assert_allclose(preds, batch.to_numpy(), rtol=1e-6, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        HybridForecaster().predict(new)
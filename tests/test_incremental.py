@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.features.incremental import IncrementalFeatureBuilder
+
+WARMUP = 600
+N_ROWS = 700
+
+
+@pytest.mark.parametrize('extra', [
+    {},
+    {'regime_quantiles': (0.1, 0.9), 'regime_window': 120},
+])
+def test_update_matches_full_rebuild(extra):
+    df, kwargs = make_market(N_ROWS, n_assets=3, seed=1)
+    kwargs.update(extra)
+
+    full = build_all_features(df, **kwargs).set_index('Date')
+
+    builder = IncrementalFeatureBuilder(**kwargs).fit(df.iloc[:WARMUP])
+    rows = {}
+    for date, bar in df.iloc[WARMUP:].iterrows():
+        row = builder.update(date, bar)
+        if row is None:
+            # descartada pelo filtro de volume, como no rebuild
+            assert bar['Volume'] <= 0
+        else:
+            rows[date] = row
+    rows = pd.DataFrame(rows.values(), index=pd.DatetimeIndex(list(rows), name='Date'))
+
+    expected = full.loc[full.index > df.index[WARMUP - 1]]
+    assert len(expected) > 50
+    assert list(rows.columns) == list(full.columns)
+    pd.testing.assert_index_equal(rows.index, expected.index)
+
+    flags = [col for col in full.columns if col.endswith('_regime') or col.endswith('_spike')
+             or '_above_ma_' in col or col in ('month', 'weekday', 'quarter', 'is_month_end')]
+    assert any(col.endswith('_high_vol_regime') for col in flags)
+    np.testing.assert_array_equal(rows[flags].to_numpy(dtype=float), expected[flags].to_numpy(dtype=float))
+    np.testing.assert_allclose(rows.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-12)
+
+
+def test_update_frame_matches_full_rebuild():
+    df, kwargs = make_market(N_ROWS, n_assets=2, seed=2)
+    full = build_all_features(df, **kwargs).set_index('Date')
+
+    builder = IncrementalFeatureBuilder(**kwargs).fit(df.iloc[:WARMUP])
+    rows = builder.update_frame(df.iloc[WARMUP:])
+
+    expected = full.loc[full.index > df.index[WARMUP - 1], builder.columns]
+    pd.testing.assert_index_equal(pd.DatetimeIndex(rows.index), pd.DatetimeIndex(expected.index),
+                                  check_names=False)
+    np.testing.assert_allclose(rows.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-12)
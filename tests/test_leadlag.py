@@ -0,0 +1,59 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.stats.multitest import multipletests
+from statsmodels.tsa.stattools import ccf, grangercausalitytests
+
+from src.features.leadlag import cross_correlation, granger_screen
+
+
+def _frame(n=500, seed=0):
+    """a antecede o alvo em 2 barras, b é ruído, c é constante; alguns NaN."""
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=n)
+    y = rng.normal(size=n)
+    y[2:] += 0.6 * a[:-2]
+    df = pd.DataFrame({'log_return': y, 'a': a, 'b': rng.normal(size=n).cumsum(), 'c': 1.0})
+    df.iloc[[3, 250], 1] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('adjusted', [True, False])
+def test_cross_correlation_matches_ccf(adjusted):
+    df = _frame()
+    out = cross_correlation(df, max_lag=10, adjusted=adjusted)
+    data = df.dropna()
+
+    assert list(out.index) == list(range(-10, 11))
+    assert out['c'].isna().all()
+    for col in ('a', 'b'):
+        x, y = data[col].to_numpy(), data['log_return'].to_numpy()
+        lead = ccf(y, x, adjusted=adjusted, fft=False, nlags=11)
+        lag = ccf(x, y, adjusted=adjusted, fft=False, nlags=11)
+        np.testing.assert_allclose(out.loc[0:10, col], lead, rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(out.loc[-10:-1, col][::-1], lag[1:], rtol=1e-10, atol=1e-12)
+    assert out['a'].abs().idxmax() == 2
+
+
+def test_granger_screen_matches_statsmodels():
+    df = _frame().drop(columns='c')
+    out = granger_screen(df, max_lag=4, max_workers=1)
+    data = df.dropna()
+
+    assert len(out) == 8 and out['p_value'].is_monotonic_increasing
+    for col in ('a', 'b'):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = grangercausalitytests(data[['log_return', col]], maxlag=4)
+        for lag in range(1, 5):
+            row = out[(out['feature'] == col) & (out['lag'] == lag)].iloc[0]
+            f_stat, p_value, df_denom, df_num = expected[lag][0]['ssr_ftest']
+            assert row['f_stat'] == pytest.approx(f_stat, rel=1e-8)
+            assert row['p_value'] == pytest.approx(p_value, rel=1e-6, abs=1e-300)
+            assert (row['df_denom'], row['df_num']) == (df_denom, df_num)
+
+    np.testing.assert_allclose(out['q_value'], multipletests(out['p_value'], method='fdr_bh')[1])
+    best = granger_screen(df, max_lag=4, best_only=True, max_workers=1)
+    assert list(best['feature']) == ['a', 'b'] and best['lag'].iloc[0] == 2
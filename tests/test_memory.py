@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.utils.memory import compact_dtypes, memory_report
+
+
+def test_compact_dtypes_smallest_lossless_int():
+    df = pd.DataFrame({'flag': np.array([0, 1, 1], dtype=np.int64),
+                       'year': np.array([2020, 2021, 2022], dtype=np.int64),
+                       'big': np.array([0, 1, 2 ** 40], dtype=np.int64),
+                       'x': [0.1, 0.2, 0.3],
+                       'ok': [True, False, True],
+                       'Date': pd.date_range('2024-01-01', periods=3)})
+
+    out = compact_dtypes(df)
+    assert out.dtypes.to_dict() == {'flag': np.int8, 'year': np.int16, 'big': np.int64,
+                                    'x': np.float64, 'ok': bool, 'Date': df['Date'].dtype}
+    pd.testing.assert_frame_equal(out, df, check_dtype=False)
+    assert compact_dtypes(df, float32=True)['x'].dtype == np.float32
+
+
+def test_compact_build_and_memory_report():
+    df, kwargs = make_market(1000, n_assets=2, seed=5)
+    full = build_all_features(df, **kwargs)
+    compact = build_all_features(df, compact=True, **kwargs)
+    small = build_all_features(df, compact=True, float32=True, **kwargs)
+
+    flags = [c for c in full.columns if c.endswith('_regime') or c in ('month', 'weekday', 'quarter')]
+    assert flags and (compact[flags].dtypes == np.int8).all()
+    pd.testing.assert_frame_equal(compact, full, check_dtype=False, check_exact=True)
+    floats = full.select_dtypes('float64').columns
+    assert (small[floats].dtypes == np.float32).all()
+    np.testing.assert_allclose(small[floats].to_numpy(dtype=float), full[floats].to_numpy(), rtol=1e-6)
+
+    report = memory_report(compact)
+    assert report['bytes'].is_monotonic_decreasing
+    assert np.isclose(report['share'].sum(), 1.0)
+    assert report.loc['month', 'dtype'] == 'int8'
+    sizes = [memory_report(frame).attrs['total_bytes'] for frame in (full, compact, small)]
+    assert sizes[0] > sizes[1] > sizes[2]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from src.models.arimax import WalkForwardARIMAX
+from src.models.order_search import OrderSearch
+
+
+def _frame(n=240):
+    rng = np.random.default_rng(1)
+    e = rng.normal(0, 0.01, n)
+    y = np.empty(n)
+    y[0] = e[0]
+    for t in range(1, n):
+        y[t] = 0.5 * y[t - 1] + e[t]
+    index = pd.bdate_range('2020-01-01', periods=n, name='Date')
+    return pd.DataFrame({'log_return': y, 'x': rng.normal(size=n)}, index=index)
+
+
+def test_run_closes_pool_and_rerun_hits_cache(tmp_path):
+    df = _frame()
+    search = OrderSearch(max_p=1, max_q=1, max_workers=2, cache_dir=str(tmp_path))
+    first = WalkForwardARIMAX(refit_every=20, train_size=0.8, order_search=search).run(df)
+    assert search._executor is None
+    assert all(row['source'] != 'cache' for row in search.history)
+
+    # mesmo walk-forward de novo (outra instância, cache em disco): nenhuma janela reajustada
+    search = OrderSearch(max_p=1, max_q=1, max_workers=2, cache_dir=str(tmp_path))
+    second = WalkForwardARIMAX(refit_every=20, train_size=0.8, order_search=search).run(df)
+    assert [row['source'] for row in search.history] == ['cache'] * len(search.history)
+    assert second.attrs['order'] == first.attrs['order']
+
+
+def test_equal_length_windows_do_not_share_entries(tmp_path):
+    y = _frame(400)['log_return'].to_numpy()
+    search = OrderSearch(max_p=1, max_q=1, max_workers=1, cache_dir=str(tmp_path))
+    # janelas móveis de mesmo tamanho, mesma ordem de partida
+    keys = set()
+    for start in (0, 100, 200):
+        search.reset()
+        keys.add(search.key(y[start:start + 200]))
+    assert len(keys) == 3
+
+    search.reset()
+    search.search(y[:200])
+    assert search.history[-1]['source'] == 'grid'
+
+    # histórico revisado: mesma janela, outra chave
+    revised = y[:200].copy()
+    revised[10] += 0.01
+    search.reset()
+    search.search(revised)
+    assert search.history[-1]['source'] == 'grid'
+
+    # janela original de novo: sai do cache, também com o hash incremental
+    search.reset()
+    search.search(y[:200])
+    assert search.history[-1]['source'] == 'cache'
+
+
+def test_incremental_key_equals_full_hash(tmp_path):
+    y = _frame(300)['log_return'].to_numpy()
+    X = np.random.default_rng(2).normal(size=(300, 2))
+    search = OrderSearch(cache_dir=None)
+    search.key(y[:100], X[:100])
+    incremental = search.key(y[:250], X[:250])
+    assert incremental == OrderSearch(cache_dir=None).key(y[:250], X[:250])
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.panel import Panel
+
+
+def _frames():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2024-01-01', periods=60, name='Date')
+    target = pd.DataFrame({'Adj Close': rng.random(60) + 10, 'Volume': rng.integers(1, 1000, 60)},
+                          index=dates)
+    aux = pd.DataFrame({'Adj Close': rng.random(53) + 5}, index=dates[5:].delete([10, 20]))
+    return {'T': target, 'A': aux}
+
+
+FIELDS = {'T': ['Adj Close', 'Volume'], 'A': ['Adj Close']}
+COLUMNS = {'t': ('T', 'Adj Close'), 'Volume': ('T', 'Volume'), 'a': ('A', 'Adj Close')}
+
+
+def test_inner_matches_join_and_keeps_volume_int():
+    frames = _frames()
+    df = Panel.from_frames(frames, fields=FIELDS, calendar=frames['T'].index).to_frame(COLUMNS)
+
+    expected = (frames['T'].rename(columns={'Adj Close': 't'})[['t', 'Volume']]
+                .join(frames['A']['Adj Close'].rename('a'), how='inner'))
+    pd.testing.assert_frame_equal(df, expected, check_freq=False)
+    assert df['Volume'].dtype == np.int64
+
+
+def test_ffill_matches_reindex():
+    frames = _frames()
+    panel = Panel.from_frames(frames, fields=FIELDS, calendar=frames['T'].index, how='ffill')
+
+    expected = frames['A']['Adj Close'].reindex(frames['T'].index, method='ffill').dropna()
+    pd.testing.assert_series_equal(panel.series('A'), expected.rename('A'), check_freq=False)
+    assert panel.series('T', 'Volume').dtype == np.int64
+
+
+def test_mask_upcasts_only_fields_with_gaps():
+    frames = _frames()
+    panel = Panel.from_frames(frames, fields={'T': ['Volume'], 'A': ['Adj Close', 'Volume']}, how='mask')
+
+    # 'A' não tem Volume: o campo precisa de NaN e vira float
+    assert panel.series('T', 'Volume').dtype == np.float64
+    assert panel.series('A', 'Volume').isna().all()
+    with pytest.raises(KeyError):
+        panel.series('T', 'Adj Close')
+
+
+def test_ffill_preserves_dtypes_of_tickers_with_gaps():
+    frames = _frames()
+    aux = frames['A'].assign(Volume=np.arange(len(frames['A']), dtype=np.int64),
+                             flag=(np.arange(len(frames['A'])) % 2).astype(np.int8),
+                             halted=np.arange(len(frames['A'])) % 3 == 0)
+    frames['A'] = aux
+    panel = Panel.from_frames(frames, fields={'T': ['Volume'], 'A': ['Volume', 'flag', 'halted']},
+                              calendar=frames['T'].index, how='ffill')
+
+    # 'A' tem buracos no calendário, mas o ffill preenche todos: nada vira float
+    expected = aux.reindex(frames['T'].index, method='ffill').dropna()
+    for field, dtype in (('Volume', np.int64), ('flag', np.int8), ('halted', np.bool_)):
+        got = panel.series('A', field)
+        assert got.dtype == dtype
+        pd.testing.assert_series_equal(got, expected[field].astype(dtype).rename('A'), check_freq=False)
+    assert panel.series('T', 'Volume').dtype == np.int64
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.utils import profiling
+from src.utils.profiling import Profiler, profiled, stage
+
+
+@profiled('outer')
+def _pipeline(df):
+    with stage('double', df) as s:
+        df = s.out(pd.concat([df, df]))
+    with stage('alloc') as s:
+        block = np.ones((1000, 1000))
+        s.out(block)
+    return df.iloc[:, :1]
+
+
+def test_stage_records_nesting_shapes_and_memory(tmp_path):
+    df = pd.DataFrame(np.zeros((10, 3)))
+    assert stage('sem_profiler', df).out(df) is df
+
+    with Profiler(memory=True) as prof:
+        _pipeline(df)
+        with pytest.raises(KeyError):
+            with stage('falha'):
+                raise KeyError('x')
+    assert profiling._ACTIVE is None
+
+    report = prof.report().set_index('stage')
+    assert list(report.index) == ['outer', 'outer/double', 'outer/alloc', 'falha']
+    assert report.loc['outer/double', ['rows_in', 'cols_in', 'rows_out', 'cols_out']].tolist() == [10, 3, 20, 3]
+    assert report.loc['outer', ['rows_in', 'cols_in', 'rows_out', 'cols_out']].tolist() == [10, 3, 20, 1]
+    assert report.loc['outer/alloc', 'depth'] == 1
+    # o pico do estágio de fora inclui o de dentro (matriz de 8 MB)
+    assert report.loc['outer/alloc', 'peak_bytes'] > 7.5e6
+    assert report.loc['outer', 'peak_bytes'] >= report.loc['outer/alloc', 'peak_bytes']
+    assert report.loc['falha', 'error'] == 'KeyError'
+
+    path = tmp_path / 'perfil.json'
+    prof.to_json(str(path))
+    with open(path) as f:
+        assert len(json.load(f)['stages']) == 4
+    assert 'outer/double' in prof.summary()
+
+
+def test_build_all_features_stages():
+    df, kwargs = make_market(500, n_assets=2, seed=6)
+    with Profiler() as prof:
+        out = build_all_features(df, **kwargs)
+    report = prof.report()
+    assert report['stage'].iloc[0] == 'build_all_features'
+    stages = set(report['stage'])
+    assert {'build_all_features/logreturns', 'build_all_features/lags'} <= stages
+    assert report.loc[report['stage'] == 'build_all_features', 'rows_out'].item() == len(out)
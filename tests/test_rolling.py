@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.rolling import rolling_corr_pairs, rolling_quantile_flags
+
+
+def _series(n=3000, k=4, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 0.01, (n, k)).cumsum(axis=0) * 0.1 + rng.normal(0, 0.01, (n, k))
+    X[:, 1] += 1e3                      # nível alto: cancelamento em sum(x²)
+    X[500:520, 2] = np.nan              # buraco: NaN nas janelas que o contêm
+    X[1000:1100, 3] = 0.25              # trecho constante: variância zero
+    return X
+
+
+def _exact_corr(x, y, w):
+    """Correlação janela a janela com média centrada (referência exata)."""
+    out = np.full(len(x), np.nan)
+    xs = np.lib.stride_tricks.sliding_window_view(x, w)
+    ys = np.lib.stride_tricks.sliding_window_view(y, w)
+    dx = xs - xs.mean(axis=1, keepdims=True)
+    dy = ys - ys.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[w - 1:] = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+    return out
+
+
+@pytest.mark.parametrize('windows', [[5, 22, 63], [1000]])
+def test_rolling_corr_pairs_matches_pandas(windows):
+    X = _series()
+    pairs = [(0, 1), (0, 2), (1, 3), (2, 3)]
+    corr = rolling_corr_pairs(X, pairs, windows, chunk_size=5_000)
+
+    frame = pd.DataFrame(X)
+    for p, (i, j) in enumerate(pairs):
+        for k, w in enumerate(windows):
+            expected = frame[i].rolling(w).corr(frame[j]).to_numpy()
+            exact = _exact_corr(X[:, i], X[:, j], w)
+            got = corr[:, p, k]
+            # pandas devolve ±inf em janelas de variância zero; o kernel, NaN
+            finite = np.isfinite(expected)
+            np.testing.assert_array_equal(np.isnan(got), ~finite)
+            # pandas acumula somas online e perde ~1e-7 no nível 1e3
+            np.testing.assert_allclose(got[finite], expected[finite], rtol=0, atol=1e-6)
+            np.testing.assert_allclose(got[finite], exact[finite], rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('window,quantiles,min_periods', [
+    (20, (0.25, 0.75), None),
+    (50, (0.1, 0.9), 40),
+    (7, (1 / 3, 2 / 3), 5),
+])
+def test_rolling_quantile_flags_matches_pandas(window, quantiles, min_periods):
+    rng = np.random.default_rng(1)
+    X = rng.lognormal(0, 0.5, (2000, 3))
+    X[:, 1] = np.round(X[:, 1], 1)      # empates
+    X[300:340, 2] = np.nan              # buraco maior que a janela pequena
+    X[::97, 0] = np.nan
+
+    flags = rolling_quantile_flags(X, window, quantiles, min_periods=min_periods)
+
+    low_q, high_q = quantiles
+    for j in range(X.shape[1]):
+        roll = pd.Series(X[:, j]).rolling(window, min_periods=min_periods)
+        high = (X[:, j] > roll.quantile(high_q).to_numpy()).astype(int)
+        low = (X[:, j] < roll.quantile(low_q).to_numpy()).astype(int)
+        np.testing.assert_array_equal(flags[:, j, 0], high)
+        np.testing.assert_array_equal(flags[:, j, 1], low)
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_market
+from src.features.build import build_all_features
+from src.features.incremental import IncrementalFeatureBuilder
+from src.models.hybrid import HybridForecaster
+from src.models.service import ForecastService, load_bundle, save_bundle
+
+WARMUP = 600
+
+
+def _bundle(path, df, kwargs, max_depth):
+    builder = IncrementalFeatureBuilder(**kwargs).fit(df.iloc[:WARMUP])
+    features = build_all_features(df.iloc[:WARMUP], **kwargs).set_index('Date')[builder.columns]
+    xgb_params = {'n_estimators': 20, 'max_depth': max_depth, 'random_state': 0}
+    forecaster = HybridForecaster(order=(1, 0, 0), xgb_params=xgb_params).fit(features)
+    save_bundle(str(path), forecaster, builder)
+    return forecaster
+
+
+def _bump_mtime(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + int(seconds * 1e9)))
+
+
+def test_reload_swaps_state(tmp_path):
+    df, kwargs = make_market(WARMUP + 20, n_assets=2, seed=7)
+    path = tmp_path / 'bundle.pkl'
+    _bundle(path, df, kwargs, max_depth=2)
+    bars = df.iloc[WARMUP:WARMUP + 5]
+
+    with ForecastService(str(path), poll_seconds=None) as service:
+        assert not service.reload_if_changed()
+        # as previsões do serviço são as do próprio modelo atualizado barra a barra
+        reference = load_bundle(str(path))
+        for date, bar in bars.iterrows():
+            out = service.update(date, bar)
+            row = reference['builder'].update(date, bar)
+            if row is None:
+                assert out['skipped']
+                continue
+            reference['forecaster'].observe(row['log_return'], row)
+            assert out['forecast'] == pytest.approx(reference['forecaster'].forecast_next(), rel=1e-12)
+        old = service.predict_next()
+
+        # modelo retreinado: o estado novo entra inteiro, com a previsão dele
+        new = _bundle(path, df, kwargs, max_depth=4)
+        _bump_mtime(path, 1)
+        assert service.reload_if_changed()
+        current = service.predict_next()
+        assert service.reloads == 1
+        assert current['model_created'] > old['model_created']
+        assert current['forecast'] == pytest.approx(new.forecast_next(), rel=1e-12)
+        assert current['date'] is None
+        assert not service.reload_if_changed()
+
+        # bundle corrompido: o estado atual continua servindo
+        path.write_bytes(b'lixo')
+        _bump_mtime(path, 2)
+        assert not service.reload_if_changed()
+        assert service.errors == 1
+        assert service.predict_next()['forecast'] == current['forecast']
+        assert service.metrics()['endpoints']['update']['count'] == len(bars)
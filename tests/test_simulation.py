@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.simulation import simulate_paths, stationary_bootstrap_indices
+
+
+def _resid(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.standard_t(4, n) * 0.01, index=pd.bdate_range('2020-01-01', periods=n))
+
+
+def _all_paths(values, n_paths, horizon, mean_block, chunk_size, drift, seed):
+    """Mesmas trajetórias de simulate_paths (mesma sequência de sorteios por bloco), todas em memória."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, n_paths, chunk_size):
+        m = min(chunk_size, n_paths - start)
+        idx = stationary_bootstrap_indices(len(values), m, horizon, mean_block, rng)
+        parts.append(np.cumsum(values[idx] + drift, axis=1))
+    return np.concatenate(parts)
+
+
+def test_var_es_match_exact_sort():
+    resid = _resid()
+    kwargs = dict(horizon=10, n_paths=203, mean_block=3.0, drift=0.001, chunk_size=37, seed=5)
+    out = simulate_paths(resid, var_levels=(0.01, 0.05, 0.1), **kwargs)
+
+    cum = _all_paths(resid.to_numpy(), kwargs['n_paths'], kwargs['horizon'], kwargs['mean_block'],
+                     kwargs['chunk_size'], kwargs['drift'], kwargs['seed'])
+    simple = np.sort(np.expm1(cum), axis=0)
+    risk = out.attrs['risk']
+    for level in (0.01, 0.05, 0.1):
+        n_tail = int(np.ceil(level * 203))
+        np.testing.assert_allclose(risk[f'VaR_{level:g}'], -simple[n_tail - 1], rtol=1e-12)
+        np.testing.assert_allclose(risk[f'ES_{level:g}'], -simple[:n_tail].mean(axis=0), rtol=1e-12)
+
+    np.testing.assert_allclose(out['mean'], simple.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(out['std'], simple.std(axis=0, ddof=1), rtol=1e-8)
+    # quantis do histograma (inversa da CDF empírica): erro de no máximo um bin, em log-retorno
+    for q in (0.05, 0.5, 0.95):
+        exact = np.quantile(cum, q, axis=0, method='inverted_cdf')
+        assert (np.abs(np.log1p(out[f'q{q:g}']) - exact) <= out.attrs['bin_width'] * 1.0001).all()
+
+
+def test_regime_condition_restricts_pool():
+    resid = _resid()
+    regimes = pd.DataFrame({'calm': (resid > 0).astype(int)}, index=resid.index)
+    regimes.iloc[-1, 0] = 1
+
+    out = simulate_paths(resid, horizon=5, n_paths=500, regimes_df=regimes, condition={'calm': None})
+    assert out.attrs['regime'] == {'calm': 1}
+    # só resíduos positivos: nenhuma trajetória perde
+    assert (out.attrs['risk']['VaR_0.01'] < 0).all()
+
+    with pytest.raises(ValueError):
+        simulate_paths(resid, condition={'calm': 1})
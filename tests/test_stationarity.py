@@ -0,0 +1,33 @@
+import warnings
+
+import numpy as np
+import pytest
+from statsmodels.tsa.stattools import adfuller, kpss
+
+from src.features.stationarity import rolling_adf, rolling_kpss
+
+WINDOW = 252
+
+
+def _random_walk(n, seed=0):
+    return 100 + np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+def test_rolling_kpss_last_window_of_long_random_walk():
+    y = _random_walk(1_000_000)
+    lags = int(12 * (WINDOW / 100) ** 0.25)
+    stat = rolling_kpss(y, WINDOW)['statistic'].to_numpy()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # p-valor fora da tabela
+        for pos in (0, len(y) // 2, len(y) - WINDOW):
+            expected = kpss(y[pos:pos + WINDOW], regression='c', nlags=lags)[0]
+            assert stat[pos] == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize('regression,lags', [('c', 1), ('ct', 2), ('n', 1)])
+def test_rolling_adf_last_window_of_long_random_walk(regression, lags):
+    y = _random_walk(50_000, seed=1)
+    stat = rolling_adf(y, WINDOW, lags, regression)['statistic'].to_numpy()
+    for pos in (0, len(y) - WINDOW):
+        expected = adfuller(y[pos:pos + WINDOW], maxlag=lags, autolag=None, regression=regression)[0]
+        assert stat[pos] == pytest.approx(expected, rel=1e-9, abs=1e-9)
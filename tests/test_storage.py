@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data import storage
+from src.data.storage import frame_path, load_frame, save_frame
+
+
+def _frame(tz):
+    index = pd.date_range('2024-03-01 10:00', periods=50, freq='5min', tz=tz, name='Date')
+    return pd.DataFrame({'Close': np.linspace(1, 2, 50), 'Volume': np.arange(50)},
+                        index=index.as_unit('ns')._with_freq(None))
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC', 'America/Sao_Paulo'])
+def test_npy_roundtrip_keeps_index_tz(tmp_path, tz):
+    df = _frame(tz)
+    save_frame(df, str(tmp_path / 'x'), 'npy')
+    pd.testing.assert_frame_equal(load_frame(str(tmp_path / 'x'), 'npy'), df)
+
+
+def test_failed_migration_keeps_csv(tmp_path, monkeypatch):
+    base = str(tmp_path / 'x')
+    df = _frame(None)
+    df.to_csv(frame_path(base, 'csv'))
+
+    def broken(*args, **kwargs):
+        raise OSError('disco cheio')
+
+    monkeypatch.setattr(storage, 'save_frame', broken)
+    back = load_frame(base, 'npy')
+
+    assert os.path.exists(frame_path(base, 'csv'))
+    assert not os.path.exists(frame_path(base, 'npy'))
+    pd.testing.assert_frame_equal(back, load_frame(base, 'csv'))
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from src.data.store import MarketDataStore
+
+
+def _source(last):
+    """fetch(start, end) com barras diárias em dias úteis só até `last`."""
+    calls = []
+
+    def fetch(s, e):
+        calls.append((s, e))
+        index = pd.bdate_range(s, min(pd.Timestamp(e) - pd.Timedelta(days=1), pd.Timestamp(last)), name='Date')
+        return pd.DataFrame({'Close': range(len(index))}, index=index, dtype=float)
+
+    return fetch, calls
+
+
+def test_update_covers_only_returned_bars(tmp_path):
+    store = MarketDataStore(str(tmp_path), overlap=2)
+    fetch, calls = _source('2024-01-10')
+
+    store.update('X', '2024-01-01', '2024-01-20', fetch)
+    assert store.covered('X', '1d') == [(pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-11'))]
+
+    # as barras que faltavam no fim são buscadas de novo (mais as 2 da sobreposição)
+    fetch, calls = _source('2024-01-19')
+    info = store.update('X', '2024-01-01', '2024-01-20', fetch)
+    assert calls == [('2024-01-09', '2024-01-20')]
+    assert info['rows_fetched'] == 9
+    assert store.get('X', '2024-01-01', '2024-01-20').index[-1] == pd.Timestamp('2024-01-19')
+
+
+def _intraday_source(last, tz='America/Sao_Paulo'):
+    """fetch(start, end) com barras de 5 minutos com fuso (como o yfinance) só até `last`."""
+    calls = []
+
+    def fetch(s, e):
+        calls.append((s, e))
+        s, e = pd.Timestamp(s), pd.Timestamp(e)
+        s = s.tz_localize(tz) if s.tz is None else s
+        e = e.tz_localize(tz) if e.tz is None else e
+        index = pd.date_range(s, min(e - pd.Timedelta(minutes=5), pd.Timestamp(last, tz=tz)),
+                              freq='5min', name='Date')
+        return pd.DataFrame({'Close': range(len(index))}, index=index, dtype=float)
+
+    return fetch, calls
+
+
+def test_update_intraday_tz_aware(tmp_path):
+    tz = 'America/Sao_Paulo'
+    store = MarketDataStore(str(tmp_path), overlap=2, format='npy')
+    fetch, calls = _intraday_source('2024-03-01 12:00')
+    store.update('X', '2024-03-01', '2024-03-02', fetch, interval='5m')
+    assert store.covered('X', '5m') == [(pd.Timestamp('2024-03-01', tz=tz),
+                                         pd.Timestamp('2024-03-01 12:05', tz=tz))]
+
+    # segunda execução: só o resto do dia (mais a sobreposição), com horário completo
+    fetch, calls = _intraday_source('2024-03-01 16:55')
+    info = store.update('X', '2024-03-01', '2024-03-02', fetch, interval='5m')
+    assert calls == [(pd.Timestamp('2024-03-01 11:55', tz=tz), pd.Timestamp('2024-03-02', tz=tz))]
+    assert info['rows_fetched'] == 61
+    assert store.missing_spans('X', '2024-03-01', '2024-03-01 17:00', '5m') == []
+
+    data = store.get('X', '2024-03-01 10:00', '2024-03-01 11:00', interval='5m')
+    assert len(data) == 12 and str(data.index.tz) == tz
+    chunks = list(store.iter_chunks('X', '2024-03-01 10:00', '2024-03-01 17:00', interval='5m', chunk_rows=50))
+    assert len(chunks) > 1
+    assert sum(len(c) for c in chunks) == 7 * 12
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from src.constants import BARS_PER_YEAR
+from src.data.storage import load_frame
+from src.data.store import MarketDataStore
+from src.features.build import build_all_features
+from src.features.streaming import iter_aligned, stream_features
+
+TZ = 'America/Sao_Paulo'
+
+
+def _bars(n, seed, drop=()):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-03-01 10:00', periods=n * 4, freq='5min', tz=TZ, name='Date')
+    index = index[(index.hour >= 10) & (index.hour < 17)][:n]
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    volume = rng.integers(0, 50, n) * 100  # alguns zeros, descartados pelo filtro de volume
+    data = pd.DataFrame({'Adj Close': close, 'Volume': volume}, index=index)
+    return data.drop(index[list(drop)])
+
+
+def _fill(store, ticker, data):
+    def fetch(s, e):
+        s, e = pd.Timestamp(s), pd.Timestamp(e)
+        return data.loc[(data.index >= s) & (data.index < e)]
+    store.update(ticker, data.index[0], data.index[-1] + pd.Timedelta(minutes=5), fetch, interval='5m')
+
+
+def test_stream_features_matches_single_build(tmp_path):
+    store = MarketDataStore(str(tmp_path / 'raw'), format='npy')
+    _fill(store, 'ALVO', _bars(3000, 0))
+    _fill(store, 'X1', _bars(3000, 1, drop=range(500, 520)))
+    _fill(store, 'X2', _bars(3000, 2))
+    aux = {'X1': 'x1', 'X2': 'x2'}
+    args = ('ALVO', 'alvo', aux, '2024-03-01', '2024-06-01')
+    kwargs = {'exog_price_cols': ['x1', 'x2'], 'volume_col': 'Volume', 'windows': [5, 22],
+              'lags': [1, 5], 'regime_window': 100}
+
+    chunks = iter_aligned(*args, interval='5m', dir=str(tmp_path / 'raw'), chunk_rows=700)
+    report = stream_features(chunks, 'alvo', str(tmp_path / 'out' / 'alvo'), interval='5m', **kwargs)
+    assert len(report) > 3
+    streamed = pd.concat([load_frame(path, 'npy') for path in report['path'].dropna().str[:-len('.npy.d')]])
+
+    full = pd.concat(list(iter_aligned(*args, interval='5m', dir=str(tmp_path / 'raw'), chunk_rows=10 ** 6)))
+    assert str(full.index.tz) == TZ
+    expected = build_all_features(full, 'alvo', bars_per_year=BARS_PER_YEAR['5m'], **kwargs).set_index('Date')
+
+    assert list(streamed.columns) == list(expected.columns)
+    pd.testing.assert_index_equal(streamed.index, expected.index)
+    np.testing.assert_allclose(streamed.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-12)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import tuning
+from src.models.tuning import XGBSearch
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 3))
+    y = 0.5 * X[:, 0] - 0.2 * X[:, 1] ** 2 + rng.normal(0, 0.1, n)
+    return pd.DataFrame({'log_return': y, 'a': X[:, 0], 'b': X[:, 1], 'c': X[:, 2]},
+                        index=pd.bdate_range('2020-01-01', periods=n))
+
+
+def _search(tmp_path, **kwargs):
+    space = {'max_depth': [1, 2, 3], 'learning_rate': [0.01, 0.1, 0.3]}
+    return XGBSearch(space, min_rounds=2, max_rounds=18, eta=3, target='raw', n_folds=2,
+                     max_workers=1, log_path=str(tmp_path / 'search.jsonl'), **kwargs)
+
+
+def test_successive_halving(tmp_path):
+    report = _search(tmp_path).run(_frame())
+
+    assert report.groupby('rung')['rounds'].first().tolist() == [2, 6, 18]
+    assert report.groupby('rung').size().tolist() == [9, 3, 1]
+    # cada rodada segue só com o melhor 1/eta da anterior
+    for rung in (0, 1):
+        ranked = report[report['rung'] == rung].sort_values('rmse', kind='stable')
+        survivors = report[report['rung'] == rung + 1]['config'].tolist()
+        keep = len(survivors)
+        assert sorted(map(str, survivors)) == sorted(map(str, ranked['config'].iloc[:keep]))
+    best = report[report['rung'] == 2].iloc[0]
+    assert report.attrs['best_params'] == dict(best['config'], n_estimators=18)
+    assert not tuning._STATE
+
+
+def test_resume_from_log(tmp_path, monkeypatch):
+    df = _frame()
+    first = _search(tmp_path).run(df)
+    assert not first['resumed'].any()
+    with open(tmp_path / 'search.jsonl') as f:
+        assert sum(1 for _ in f) == 13
+
+    # segunda execução: tudo vem do JSONL, nenhum treino
+    def fail(config, rounds):
+        raise AssertionError('avaliação repetida')
+
+    monkeypatch.setattr(tuning, '_evaluate', fail)
+    second = _search(tmp_path).run(df)
+    assert second['resumed'].all()
+    pd.testing.assert_series_equal(first['rmse'], second['rmse'])
+    assert second.attrs['best_params'] == first.attrs['best_params']
+
+    # dados diferentes não reaproveitam o log
+    with pytest.raises(AssertionError, match='avaliação repetida'):
+        _search(tmp_path).run(_frame(seed=1))
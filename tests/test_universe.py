@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_market
+from src.data.sources import CSVSource
+from src.data.storage import load_frame
+from src.features.build import build_all_features
+from src.features.universe import _shared_features, _target_frame, build_universe
+
+
+def _write(source, ticker, close, volume=None):
+    data = pd.DataFrame({'Adj Close': close, 'Close': close,
+                         'Volume': 1000 if volume is None else volume}, index=close.index)
+    data.index.name = 'Date'
+    data.to_csv(source.path(ticker))
+
+
+def test_shared_exog_features_match_single_target_build(tmp_path):
+    df, kwargs = make_market(400, n_assets=2, seed=3)
+    # sem barras de volume zero: o calendário dos alvos é o das exógenas
+    df['Volume'] = df['Volume'].where(df['Volume'] > 0, 1000)
+    source = CSVSource(str(tmp_path))
+    _write(source, 'AAA', df['petr4'], df['Volume'])
+    _write(source, 'BBB', df['petr4'] * 1.5 + 1, df['Volume'])
+    aux = {'X1': 'asset_1', 'X2': 'asset_2'}
+    for ticker, name in aux.items():
+        _write(source, ticker, df[name])
+
+    feature_kwargs = {'windows': [5, 22], 'lags': [1, 5], 'regime_window': 100, 'vix_col': '^VIX'}
+    report = build_universe({'AAA': 'aaa', 'BBB': 'bbb'}, aux, '2000-01-01', '2030-01-01',
+                            dir=str(tmp_path / 'raw'), out_dir=str(tmp_path / 'out'),
+                            feature_kwargs=feature_kwargs, source=source, max_workers=1)
+    assert (report['status'] == 'ok').all()
+
+    exog = df[list(aux.values())]
+    for ticker, name in (('AAA', 'aaa'), ('BBB', 'bbb')):
+        saved = load_frame(str(tmp_path / 'out' / f'{name}_features'))
+        data = pd.read_csv(source.path(ticker), parse_dates=['Date'], index_col='Date')
+        expected = build_all_features(_target_frame(data, name, exog), target_price_col=name,
+                                      exog_price_cols=list(aux.values()), volume_col='Volume',
+                                      **feature_kwargs).set_index('Date')
+        assert list(saved.columns) == list(expected.columns)
+        np.testing.assert_allclose(saved.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-12)
+
+    # regimes e correlações só de exógenas também são compartilhados
+    shared = _shared_features(exog, dict(feature_kwargs, exog_price_cols=list(aux.values())))
+    assert report.loc['aaa', 'shared_columns'] == len(shared)
+    assert {'asset_1_logreturns_high_vol_regime', 'corr_asset_1_logreturns_asset_2_logreturns_22'} <= set(shared)
+    assert not any('log_return_' in col or col.startswith('log_volume') for col in shared)